@@ -0,0 +1,3 @@
+"""
+性能基准 - 合成 CRT 数据上的耗时 / 峰值内存基准（不属于 src 包，在仓库根目录运行）
+"""
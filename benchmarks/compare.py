@@ -0,0 +1,80 @@
+"""
+比较两次基准结果，耗时或峰值内存超过容差的 (用例, 行数) 记为回归
+    
+    python -m benchmarks.compare benchmarks/results/cd2dc1b.json benchmarks/results/HEAD.json
+"""
+import argparse
+import json
+import sys
+from typing import Dict, List, Optional, Sequence, Tuple
+
+METRICS = ("seconds", "peak_mb")
+
+
+def load_results(path: str) -> Dict[Tuple[str, int], Dict[str, float]]:
+    """读取 benchmarks.run 写出的 JSON，按 (用例, 行数) 建索引"""
+    with open(path, encoding="utf-8") as fh:
+        report = json.load(fh)
+    return {(r["case"], int(r["rows"])): r for r in report["results"]}
+
+
+def compare(
+    baseline: Dict[Tuple[str, int], Dict[str, float]],
+    current: Dict[Tuple[str, int], Dict[str, float]],
+    tolerance: float = 0.2,
+    min_seconds: float = 0.05
+) -> List[Dict[str, object]]:
+    """
+    逐项比较两次结果
+    
+    Args:
+        baseline: 基线结果（load_results 的返回值）
+        current: 当前结果
+        tolerance: 允许的相对增幅（0.2 即慢 / 大 20% 以内不算回归）
+        min_seconds: 两次耗时都低于该值时不判定耗时回归（计时噪声）
+    
+    Returns:
+        每个共同 (用例, 行数) 一条记录：各指标的基线值、当前值、比值与是否回归
+    """
+    rows = []
+    for key in sorted(baseline.keys() & current.keys()):
+        record = {"case": key[0], "rows": key[1], "regression": False}
+        for metric in METRICS:
+            old, new = float(baseline[key][metric]), float(current[key][metric])
+            ratio = new / old if old > 0 else float("inf") if new > 0 else 1.0
+            regressed = ratio > 1.0 + tolerance
+            if metric == "seconds" and max(old, new) < min_seconds:
+                regressed = False
+            record[metric] = (old, new, ratio)
+            record["regression"] = record["regression"] or regressed
+        rows.append(record)
+    return rows
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """命令行入口，存在回归时返回 1"""
+    parser = argparse.ArgumentParser(description="比较两次 CRT 模型性能基准结果")
+    parser.add_argument("baseline", help="基线结果 JSON")
+    parser.add_argument("current", help="当前结果 JSON")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="允许的相对增幅")
+    parser.add_argument("--min-seconds", type=float, default=0.05, help="低于该耗时不判定耗时回归")
+    args = parser.parse_args(argv)
+    
+    rows = compare(load_results(args.baseline), load_results(args.current), args.tolerance, args.min_seconds)
+    print(f"{'用例':<24} {'行数':>12} {'耗时(秒)':>24} {'峰值内存(MB)':>28}")
+    for r in rows:
+        (s0, s1, sr), (m0, m1, mr) = r["seconds"], r["peak_mb"]
+        flag = "  <-- 回归" if r["regression"] else ""
+        print(f"{r['case']:<24} {r['rows']:>12,} {s0:>9.3f} -> {s1:>9.3f} ({sr:4.2f}x) "
+              f"{m0:>10.1f} -> {m1:>10.1f} ({mr:4.2f}x){flag}")
+    
+    regressions = [r for r in rows if r["regression"]]
+    if regressions:
+        print(f"发现 {len(regressions)} 项回归（容差 {args.tolerance:.0%}）")
+        return 1
+    print("未发现回归")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,373 @@
+"""
+分页下载检查 - 用 PostgREST 客户端的本地替身验证 SupabaseLoader 的并发下载、重试和断点续传
+    
+    python -m benchmarks.fetch_check
+    python -m benchmarks.fetch_check --rows 5000 --batch-size 250 --verbose
+
+FakePostgrest 在内存中的行列表上执行 select / gte / lte / in_ / or_ / order / range / limit，
+没有 order 时每次请求都打乱行顺序（与 Postgres 不保证顺序一致），并可按请求注入延迟和异常。
+检查项（任一失败退出码为 1）：
+    out_of_order: 4 个并发 range 请求按偏移倒序完成，产出仍按排序键有序、不重复不遗漏
+    transient_failure: 某页第一次请求抛出异常，有界退避重试后数据完整（offset / keyset 各一次）
+    resume: 下载中途中断，再次调用从断点清单恢复，已完成的页不再请求（offset / keyset 各一次）
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from src.config import KEYSET_COLUMNS
+from src.data.fetcher import FetchCheckpoint
+from src.data.loader import SupabaseLoader
+
+TABLE = "fake_model_view"
+DEFAULT_ROWS = 2_500
+DEFAULT_BATCH_SIZE = 200
+
+# (请求描述) -> 该次请求的延迟秒数 / 要抛出的异常（None 为正常返回）
+LatencyFn = Callable[[Dict], float]
+FaultFn = Callable[[Dict], Optional[BaseException]]
+
+
+def make_rows(n_rows: int, seed: int = 0) -> List[dict]:
+    """生成 (period, loan_identifier) 唯一的模拟行，period_year 为整数（对应 SMALLINT 生成列）"""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n_rows):
+        year = 2013 + i % 12
+        month = 1 + (i // 12) % 12
+        rows.append({
+            "period": f"{year}{month:02d}",
+            "period_year": year,
+            "loan_identifier": f"F{i:07d}",
+            "property_state": rng.choice(["CA", "TX", "NY", "FL"]),
+            "credit_score": rng.randint(600, 820),
+        })
+    rng.shuffle(rows)
+    return rows
+
+
+def _split_top(text: str) -> List[str]:
+    """按不在括号内的逗号切分 PostgREST 逻辑条件"""
+    parts, depth, buf, quoted = [], 0, "", False
+    for ch in text:
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and ch == ",":
+            parts.append(buf)
+            buf = ""
+            continue
+        buf += ch
+    parts.append(buf)
+    return parts
+
+
+def _parse_condition(text: str) -> Callable[[dict], bool]:
+    """把 or_ 条件（col.op."value" 及嵌套 and(...)）解析为行谓词"""
+    if text.startswith("and(") and text.endswith(")"):
+        preds = [_parse_condition(part) for part in _split_top(text[4:-1])]
+        return lambda row: all(p(row) for p in preds)
+    col, op, raw = text.split(".", 2)
+    value = raw[1:-1].replace('\\"', '"') if raw.startswith('"') else raw
+    compare = {
+        "eq": lambda a, b: a == b, "gt": lambda a, b: a > b,
+        "gte": lambda a, b: a >= b, "lt": lambda a, b: a < b, "lte": lambda a, b: a <= b,
+    }[op]
+    # URL 中的取值都是字符串，按列的实际类型比较
+    return lambda row: row[col] is not None and compare(row[col], type(row[col])(value))
+
+
+class _Query:
+    """链式查询：记录条件，execute() 时在替身的行列表上执行"""
+    
+    def __init__(self, client: "FakePostgrest", table: str):
+        self.client = client
+        self.table = table
+        self.columns: Optional[List[str]] = None
+        self.preds: List[Callable[[dict], bool]] = []
+        self.request: Dict = {"table": table}
+        self.order_by: List[str] = []
+        self.bounds: Optional[Tuple[int, int]] = None
+        self.max_rows: Optional[int] = None
+    
+    def select(self, columns: str) -> "_Query":
+        self.columns = None if columns == "*" else columns.split(",")
+        return self
+    
+    def gte(self, col: str, value) -> "_Query":
+        self.preds.append(lambda row: row[col] >= value)
+        return self
+    
+    def lte(self, col: str, value) -> "_Query":
+        self.preds.append(lambda row: row[col] <= value)
+        return self
+    
+    def in_(self, col: str, values: Sequence) -> "_Query":
+        allowed = set(values)
+        self.preds.append(lambda row: row[col] in allowed)
+        return self
+    
+    def or_(self, condition: str) -> "_Query":
+        preds = [_parse_condition(part) for part in _split_top(condition)]
+        self.preds.append(lambda row: any(p(row) for p in preds))
+        self.request["or"] = condition
+        return self
+    
+    def order(self, col: str) -> "_Query":
+        self.order_by.append(col)
+        return self
+    
+    def range(self, start: int, end: int) -> "_Query":
+        self.bounds = (start, end)
+        self.request["range"] = (start, end)
+        return self
+    
+    def limit(self, n: int) -> "_Query":
+        self.max_rows = n
+        self.request["limit"] = n
+        return self
+    
+    def execute(self) -> SimpleNamespace:
+        return self.client._execute(self)
+
+
+class FakePostgrest:
+    """
+    PostgREST 客户端的本地替身（只实现 SupabaseLoader 用到的接口）
+    
+    没有 order 时每次请求都打乱行顺序；latency / fault 按请求描述（{"range": ...} 或
+    {"or": ..., "limit": ...}）返回延迟和要抛出的异常。每次请求按完成顺序记入 requests，
+    抛出异常的请求记入 failures。
+    """
+    
+    def __init__(
+        self,
+        tables: Dict[str, List[dict]],
+        latency: Optional[LatencyFn] = None,
+        fault: Optional[FaultFn] = None,
+        seed: int = 0
+    ):
+        """
+        Args:
+            tables: {表名: 行列表}
+            latency: 每次请求的延迟
+            fault: 每次请求要抛出的异常
+            seed: 打乱无序结果使用的随机种子
+        """
+        self.tables = tables
+        self.latency = latency
+        self.fault = fault
+        self.requests: List[Dict] = []
+        self.failures: List[Dict] = []
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+    
+    def table(self, name: str) -> _Query:
+        return _Query(self, name)
+    
+    def _execute(self, query: _Query) -> SimpleNamespace:
+        request = query.request
+        if self.latency is not None:
+            time.sleep(self.latency(request))
+        error = self.fault(request) if self.fault is not None else None
+        with self._lock:
+            (self.failures if error is not None else self.requests).append(request)
+        if error is not None:
+            raise error
+        
+        rows = [row for row in self.tables[query.table] if all(p(row) for p in query.preds)]
+        if query.order_by:
+            rows.sort(key=lambda row: tuple(row[col] for col in query.order_by))
+        else:
+            with self._lock:
+                self._rng.shuffle(rows)
+        if query.bounds is not None:
+            rows = rows[query.bounds[0]: query.bounds[1] + 1]
+        if query.max_rows is not None:
+            rows = rows[: query.max_rows]
+        if query.columns is not None:
+            rows = [{col: row[col] for col in query.columns} for row in rows]
+        return SimpleNamespace(data=rows)
+
+
+def fail_once(match: Callable[[Dict], bool], error: BaseException) -> FaultFn:
+    """第一个满足 match 的请求抛出 error，之后都正常返回"""
+    state = {"fired": False}
+    lock = threading.Lock()
+    
+    def fault(request: Dict) -> Optional[BaseException]:
+        with lock:
+            if state["fired"] or not match(request):
+                return None
+            state["fired"] = True
+            return error
+    
+    return fault
+
+
+def _expected(rows: List[dict], years: Optional[Tuple[int, int]] = None) -> List[tuple]:
+    keys = [
+        tuple(row[col] for col in KEYSET_COLUMNS) for row in rows
+        if years is None or years[0] <= row["period_year"] <= years[1]
+    ]
+    return sorted(keys)
+
+
+def _load(
+    client: FakePostgrest,
+    batch_size: int,
+    max_rows: int,
+    pagination: str = "offset",
+    max_workers: int = 4,
+    checkpoint_dir: Optional[str] = None,
+    years: Optional[Tuple[int, int]] = None
+) -> List[tuple]:
+    """通过 SupabaseLoader.iter_batches 下载，返回按产出顺序排列的排序键"""
+    loader = SupabaseLoader(client=client)
+    keys: List[tuple] = []
+    for chunk in loader.iter_batches(
+        table_name=TABLE, max_rows=max_rows, batch_size=batch_size, max_workers=max_workers,
+        checkpoint_dir=checkpoint_dir, years=years, pagination=pagination
+    ):
+        keys.extend(zip(*(chunk[col].tolist() for col in KEYSET_COLUMNS)))
+    return keys
+
+
+def check_out_of_order(rows: List[dict], batch_size: int) -> Dict[str, object]:
+    """并发请求乱序完成（偏移越小延迟越大），产出仍按排序键有序且完整"""
+    n_pages = len(rows) // batch_size + 1
+    client = FakePostgrest(
+        {TABLE: rows},
+        latency=lambda req: 0.002 * (n_pages - req["range"][0] // batch_size)
+    )
+    years = (2014, 2023)
+    keys = _load(client, batch_size, 2 * len(rows), years=years)
+    completion = [req["range"][0] for req in client.requests]
+    return {
+        "ok": keys == _expected(rows, years) and completion != sorted(completion),
+        "rows": len(keys),
+        "requests": len(client.requests),
+        "out_of_order": completion != sorted(completion),
+    }
+
+
+def check_transient_failure(rows: List[dict], batch_size: int, pagination: str) -> Dict[str, object]:
+    """第 3 页的第一次请求抛出连接错误，重试后数据完整"""
+    if pagination == "offset":
+        match = lambda req: req.get("range", (None,))[0] == 2 * batch_size
+    else:
+        cursor_row = sorted(rows, key=lambda row: tuple(row[col] for col in KEYSET_COLUMNS))[2 * batch_size - 1]
+        match = lambda req: f'"{cursor_row["loan_identifier"]}"' in req.get("or", "")
+    client = FakePostgrest({TABLE: rows}, fault=fail_once(match, ConnectionError("连接被重置（注入）")))
+    keys = _load(client, batch_size, 2 * len(rows), pagination=pagination)
+    return {
+        "ok": keys == _expected(rows) and len(client.failures) == 1,
+        "rows": len(keys),
+        "failures": len(client.failures),
+        "requests": len(client.requests),
+    }
+
+
+def check_resume(rows: List[dict], batch_size: int, pagination: str) -> Dict[str, object]:
+    """第 6 次请求时中断（KeyboardInterrupt 不会被重试），再次调用从断点继续且不重复请求已完成的页"""
+    checkpoint_dir = tempfile.mkdtemp(prefix="fetch_check_")
+    try:
+        counter = {"n": 0}
+        lock = threading.Lock()
+        
+        def interrupt(request: Dict) -> Optional[BaseException]:
+            with lock:
+                counter["n"] += 1
+                return KeyboardInterrupt() if counter["n"] == 6 else None
+        
+        first = FakePostgrest({TABLE: rows}, fault=interrupt)
+        interrupted = False
+        try:
+            _load(first, batch_size, 2 * len(rows), pagination=pagination, checkpoint_dir=checkpoint_dir)
+        except KeyboardInterrupt:
+            interrupted = True
+        with open(os.path.join(checkpoint_dir, FetchCheckpoint.MANIFEST_NAME), encoding="utf-8") as fh:
+            completed = {int(k): v for k, v in json.load(fh)["completed"].items()}
+        
+        second = FakePostgrest({TABLE: rows})
+        keys = _load(second, batch_size, 2 * len(rows), pagination=pagination, checkpoint_dir=checkpoint_dir)
+        if pagination == "offset":
+            refetched = sorted(req["range"][0] for req in second.requests if req["range"][0] in completed)
+            resumed = not refetched
+        else:
+            # 键集分页：恢复后的第一次请求必须从断点末行的游标开始，而不是从头开始
+            refetched = [req for req in second.requests if "or" not in req]
+            resumed = not refetched and len(second.requests) <= len(rows) // batch_size + 1 - len(completed)
+        return {
+            "ok": interrupted and bool(completed) and resumed and keys == _expected(rows),
+            "rows": len(keys),
+            "checkpointed_pages": len(completed),
+            "requests_after_resume": len(second.requests),
+            "refetched": len(refetched),
+        }
+    finally:
+        shutil.rmtree(checkpoint_dir, ignore_errors=True)
+
+
+def run(
+    n_rows: int = DEFAULT_ROWS,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    verbose: bool = False
+) -> Dict[str, Dict[str, object]]:
+    """
+    运行全部检查
+    
+    Args:
+        n_rows: 替身表的行数
+        batch_size: 每页行数
+        verbose: 是否输出加载器的进度打印
+    
+    Returns:
+        {检查名: 结果}，结果中 ok 为是否通过
+    """
+    rows = make_rows(n_rows)
+    checks = {
+        "out_of_order": lambda: check_out_of_order(rows, batch_size),
+        "transient_failure[offset]": lambda: check_transient_failure(rows, batch_size, "offset"),
+        "transient_failure[keyset]": lambda: check_transient_failure(rows, batch_size, "keyset"),
+        "resume[offset]": lambda: check_resume(rows, batch_size, "offset"),
+        "resume[keyset]": lambda: check_resume(rows, batch_size, "keyset"),
+    }
+    results: Dict[str, Dict[str, object]] = {}
+    for name, check in checks.items():
+        quiet = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+        with quiet:
+            results[name] = check()
+        result = results[name]
+        detail = "，".join(f"{k}={v}" for k, v in result.items() if k != "ok")
+        print(f"  {name:<28}{'通过' if result['ok'] else '失败'}  {detail}")
+    return results
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """命令行入口，全部通过时返回 0"""
+    parser = argparse.ArgumentParser(description="SupabaseLoader 分页下载检查（本地替身）")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS, help="替身表的行数")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="每页行数")
+    parser.add_argument("--verbose", action="store_true", help="输出加载器的进度打印")
+    args = parser.parse_args(argv)
+    
+    results = run(n_rows=args.rows, batch_size=args.batch_size, verbose=args.verbose)
+    return 0 if all(r["ok"] for r in results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
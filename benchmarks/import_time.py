@@ -0,0 +1,134 @@
+"""
+导入耗时基准 - 在全新子进程中计时常用导入语句，并检查是否提前加载了重依赖
+    
+    python -m benchmarks.import_time
+    python -m benchmarks.compare benchmarks/results/import-<旧提交>.json benchmarks/results/import-<新提交>.json
+
+每条语句在独立的解释器中执行 repeat 次，取最短耗时；语句执行后若 sys.modules 中出现了
+该用例禁止的模块（如只用 kernel_bandwidth 却导入了 pygam），结果标记为失败，退出码为 1。
+结果格式与 benchmarks.run 相同，可直接用 benchmarks.compare 比较。
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .run import RESULTS_DIR, environment, save_results
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY = ("supabase", "pygam", "sklearn", "scipy")
+
+# (用例名, 导入语句, 不允许加载的模块)
+CASES: List[Tuple[str, str, Tuple[str, ...]]] = [
+    ("src", "import src", HEAVY + ("numpy", "pandas")),
+    ("src.config", "import src.config", HEAVY + ("numpy", "pandas")),
+    ("src.data", "import src.data", HEAVY + ("pandas",)),
+    ("PeriodStore", "from src.data import PeriodStore", HEAVY),
+    ("SupabaseLoader", "from src.data import SupabaseLoader", HEAVY),
+    ("kernel_bandwidth", "from src.utils import kernel_bandwidth", HEAVY),
+    ("best_threshold", "from src.utils import best_threshold", HEAVY),
+    ("instrument", "from src.utils import stage", HEAVY + ("numpy", "pandas")),
+    ("FeaturePipeline", "from src.features import FeaturePipeline", HEAVY),
+    ("Scorer", "from src.models import Scorer", HEAVY),
+    ("CompiledGAM", "from src.models import CompiledGAM", HEAVY),
+    ("tune_lambda", "from src.models import tune_lambda", ()),
+    ("CrossValidator", "from src.models import CrossValidator", ()),
+]
+
+_CHILD = """
+import json, resource, sys, time
+c0, t0 = time.process_time(), time.perf_counter()
+{statement}
+t1, c1 = time.perf_counter(), time.process_time()
+scale = 1 if sys.platform == "darwin" else 1024
+print(json.dumps({{
+    "seconds": t1 - t0,
+    "cpu_seconds": c1 - c0,
+    "peak_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2**20,
+    "modules": sorted({{m.split(".")[0] for m in sys.modules}}),
+}}))
+"""
+
+
+def time_import(statement: str, repeat: int = 5) -> Dict[str, object]:
+    """
+    在全新子进程中计时一条导入语句
+    
+    Args:
+        statement: 导入语句
+        repeat: 子进程次数（取最短耗时）
+    
+    Returns:
+        {"seconds", "seconds_all", "cpu_seconds", "peak_mb", "modules"}
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([ROOT] + [p for p in [env.get("PYTHONPATH")] if p])
+    runs = []
+    for _ in range(max(1, repeat)):
+        out = subprocess.run(
+            [sys.executable, "-c", _CHILD.format(statement=statement)],
+            cwd=ROOT, env=env, capture_output=True, text=True
+        )
+        if out.returncode != 0:
+            raise RuntimeError(f"{statement} 执行失败:\n{out.stderr}")
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    best = min(runs, key=lambda r: r["seconds"])
+    return {
+        "seconds": best["seconds"],
+        "seconds_all": [r["seconds"] for r in runs],
+        "cpu_seconds": best["cpu_seconds"],
+        "peak_mb": best["peak_mb"],
+        "modules": best["modules"],
+    }
+
+
+def run(cases: Optional[Sequence[str]] = None, repeat: int = 5) -> Dict[str, object]:
+    """
+    运行导入耗时基准
+    
+    Args:
+        cases: 用例名列表（None 时运行全部）
+        repeat: 每条语句的子进程次数
+    
+    Returns:
+        {"meta": 运行环境, "results": [...]}，每条结果带 forbidden_loaded（违规加载的模块）
+    """
+    selected = [c for c in CASES if cases is None or c[0] in cases]
+    meta = environment()
+    meta.update(kind="import_time", repeat=repeat)
+    results = []
+    for name, statement, forbidden in selected:
+        stats = time_import(statement, repeat)
+        modules = stats.pop("modules")
+        loaded = [m for m in forbidden if m in modules]
+        results.append({"case": f"import:{name}", "rows": 0, "statement": statement,
+                        **stats, "forbidden_loaded": loaded})
+        flag = f"  <-- 不应导入 {loaded}" if loaded else ""
+        print(f"  {statement:<45} {stats['seconds'] * 1000:>8.1f} ms{flag}")
+    return {"meta": meta, "results": results}
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """命令行入口，有用例提前加载了重依赖时返回 1"""
+    parser = argparse.ArgumentParser(description="CRT 模型导入耗时基准")
+    parser.add_argument("--cases", nargs="+", choices=[c[0] for c in CASES], help="只运行这些用例")
+    parser.add_argument("--repeat", type=int, default=5, help="每条语句的子进程次数")
+    parser.add_argument("--output", help="结果文件（默认 benchmarks/results/import-<commit>.json）")
+    args = parser.parse_args(argv)
+    
+    report = run(args.cases, args.repeat)
+    path = args.output or os.path.join(RESULTS_DIR, f"import-{report['meta'].get('commit') or 'local'}.json")
+    save_results(report, path)
+    
+    failed = [r["case"] for r in report["results"] if r["forbidden_loaded"]]
+    if failed:
+        print(f"以下用例提前加载了重依赖: {failed}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+"""
+大数据拟合基准 - 比较全量精确拟合与大数据模式（子样本选 λ + 分块 IRLS）的耗时、峰值内存和系数漂移
+    
+    python -m benchmarks.large_fit --rows 200000 1000000
+    python -m benchmarks.compare benchmarks/results/large-<旧提交>.json benchmarks/results/large-<新提交>.json
+
+每个规模上：
+    exact_fit: 全量数据分层切出验证集，用 tune_lambda（solver="cached"）选 λ，再用 GAMDesign 在全量上重训
+    large_fit: tune_lambda_large（分层子样本选 λ，ChunkedGAMDesign 分块重训）
+large_fit 的结果带两组漂移（见 utils.gam_fit.coef_drift）：
+    drift: 相对 exact_fit 的端到端漂移（含 λ 选择差异）
+    refit_drift: 同一 λ 下分块 IRLS 相对精确拟合的漂移（只反映数值误差）
+只能在精确拟合放得进内存的规模上运行；更大的数据直接使用 tune_lambda_large。
+"""
+import argparse
+import contextlib
+import gc
+import io
+import os
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from sklearn.model_selection import train_test_split
+
+from src.config import (
+    GAM_CHUNK_SIZE, GAM_N_SPLINES, GAM_SPLINE_ORDER, RANDOM_SEED, TARGET_COLUMN
+)
+from src.features.pipeline import FeaturePipeline
+from src.models.tuning import tune_lambda, tune_lambda_large
+from src.utils.gam_fit import ChunkedGAMDesign, GAMDesign, coef_drift
+from src.utils.model_utils import build_terms, class_weights
+
+from .run import DEFAULT_GAM_ROWS, DEFAULT_LAMS, RESULTS_DIR, environment, measure, save_results
+from .synthetic import make_crt_frame
+
+DEFAULT_ROWS = [200_000, 1_000_000]
+DEFAULT_SAMPLE_SIZE = 40_000
+DEFAULT_EVAL_ROWS = 100_000
+
+
+def _exact_fit(X, y, terms, lams, weights, val_size, seed):
+    """全量数据上的 λ 搜索 + 精确重训"""
+    tr_idx, val_idx = train_test_split(np.arange(len(y)), test_size=val_size, random_state=seed, stratify=y)
+    tr_idx.sort()
+    val_idx.sort()
+    best_lam, _, curve = tune_lambda(
+        X[tr_idx], y[tr_idx], X[val_idx], y[val_idx], terms,
+        lam_candidates=lams, weights=weights[tr_idx], random_state=seed, solver="cached"
+    )
+    return best_lam, GAMDesign(terms, X, y, weights=weights).fit(best_lam), curve
+
+
+def run(
+    rows: Sequence[int] = DEFAULT_ROWS,
+    lams: Sequence[float] = DEFAULT_LAMS,
+    sample_size: int = DEFAULT_SAMPLE_SIZE,
+    chunk_size: int = GAM_CHUNK_SIZE,
+    val_size: float = 0.2,
+    eval_rows: int = DEFAULT_EVAL_ROWS,
+    seed: int = RANDOM_SEED,
+    verbose: bool = False
+) -> Dict[str, object]:
+    """
+    按行数依次生成合成数据，运行精确拟合和大数据模式拟合
+    
+    Args:
+        rows: 数据规模列表
+        lams: 候选 λ
+        sample_size: 大数据模式 λ 搜索的子样本行数
+        chunk_size: 分块 IRLS 每块行数
+        val_size: 验证集比例
+        eval_rows: 计算概率漂移使用的行数（前 eval_rows 行）
+        seed: 随机种子
+        verbose: 是否输出被测函数的打印
+    
+    Returns:
+        {"meta": 运行环境与参数, "results": [...]}，格式与 benchmarks.run 相同
+    """
+    meta = environment()
+    meta.update(
+        kind="large_fit", rows=list(rows), lams=list(lams), sample_size=sample_size,
+        chunk_size=chunk_size, val_size=val_size, eval_rows=eval_rows, seed=seed
+    )
+    results: List[Dict[str, object]] = []
+    
+    for n_rows in rows:
+        df = make_crt_frame(n_rows, seed=seed)
+        quiet = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+        with quiet:
+            pipeline = FeaturePipeline().fit(df.iloc[:DEFAULT_GAM_ROWS])
+        X = pipeline.transform(df, as_frame=False)
+        y = df[TARGET_COLUMN].to_numpy()
+        del df
+        terms = build_terms(
+            pipeline.feature_columns, pipeline.categorical_columns,
+            n_splines=GAM_N_SPLINES, spline_order=GAM_SPLINE_ORDER
+        )
+        w0, w1 = class_weights(y)
+        weights = np.where(y == 1, w1, w0).astype(float)
+        X_eval = X[:eval_rows]
+        print(f"[{n_rows:,} 行]")
+        
+        out: Dict[str, tuple] = {}
+        
+        def exact():
+            out["exact"] = _exact_fit(X, y, terms, list(lams), weights, val_size, seed)
+        
+        def large():
+            out["large"] = tune_lambda_large(
+                X, y, terms, lam_candidates=list(lams), weights=weights,
+                sample_size=sample_size, val_size=val_size, chunk_size=chunk_size, random_state=seed
+            )
+        
+        exact_stats = measure(exact, repeat=1, verbose=verbose)
+        large_stats = measure(large, repeat=1, verbose=verbose)
+        exact_lam, exact_model, _ = out["exact"]
+        large_lam, large_model, _ = out["large"]
+        
+        drift = coef_drift(exact_model, large_model, X_eval)
+        if large_lam == exact_lam:
+            refit_drift = drift
+        else:
+            with quiet:
+                refit = ChunkedGAMDesign(terms, X, y, weights=weights, chunk_size=chunk_size).fit(exact_lam)
+            refit_drift = coef_drift(exact_model, refit, X_eval)
+        
+        results.append({"case": "exact_fit", "rows": n_rows, **exact_stats, "lam": exact_lam})
+        results.append({
+            "case": "large_fit", "rows": n_rows, **large_stats, "lam": large_lam,
+            "drift": drift, "refit_drift": refit_drift,
+        })
+        print(f"  exact_fit  {exact_stats['seconds']:>9.1f} 秒  {exact_stats['peak_mb']:>10.1f} MB  λ={exact_lam}")
+        print(f"  large_fit  {large_stats['seconds']:>9.1f} 秒  {large_stats['peak_mb']:>10.1f} MB  λ={large_lam}")
+        print(f"  系数漂移 {drift['coef_rel_l2']:.2e}（同 λ 重训 {refit_drift['coef_rel_l2']:.2e}），"
+              f"概率最大差 {drift['proba_max_abs']:.2e}（同 λ 重训 {refit_drift['proba_max_abs']:.2e}）")
+        
+        del X, y, weights, X_eval, out
+        gc.collect()
+    
+    return {"meta": meta, "results": results}
+
+
+def main(argv: Optional[Sequence[str]] = None) -> Dict[str, object]:
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="CRT 模型大数据拟合基准")
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS, help="数据规模（行数）")
+    parser.add_argument("--lams", type=float, nargs="+", default=DEFAULT_LAMS, help="候选 λ")
+    parser.add_argument("--sample-size", type=int, default=DEFAULT_SAMPLE_SIZE, help="λ 搜索子样本行数")
+    parser.add_argument("--chunk-size", type=int, default=GAM_CHUNK_SIZE, help="分块 IRLS 每块行数")
+    parser.add_argument("--eval-rows", type=int, default=DEFAULT_EVAL_ROWS, help="计算概率漂移的行数")
+    parser.add_argument("--seed", type=int, default=RANDOM_SEED, help="随机种子")
+    parser.add_argument("--output", help="结果文件（默认 benchmarks/results/large-<commit>.json）")
+    parser.add_argument("--verbose", action="store_true", help="输出被测函数的打印")
+    args = parser.parse_args(argv)
+    
+    report = run(
+        rows=args.rows, lams=args.lams, sample_size=args.sample_size, chunk_size=args.chunk_size,
+        eval_rows=args.eval_rows, seed=args.seed, verbose=args.verbose
+    )
+    path = args.output or os.path.join(RESULTS_DIR, f"large-{report['meta'].get('commit') or 'local'}.json")
+    save_results(report, path)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,349 @@
+"""
+性能基准 - 在合成 CRT 数据上记录主要步骤的耗时与峰值内存，结果写为 JSON
+    
+    python -m benchmarks.run --rows 40000 200000 1000000
+    python -m benchmarks.run --rows 10000000 --cases transform_with_encoders best_threshold
+
+每个用例先在计时范围外准备输入，再重复运行 repeat 次记录墙钟时间 / CPU 时间，
+最后在 tracemalloc 下单独运行一次记录峰值内存（numpy / pandas 的数组分配都会被统计）。
+GAM 拟合与 λ 搜索只在前 gam_rows 行上进行（训练样本规模），GAM 预测在全部行上分批进行。
+"""
+import argparse
+import contextlib
+import copy
+import gc
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import pygam
+import sklearn
+from pygam import LogisticGAM
+
+from src.config import (
+    GAM_N_SPLINES, GAM_SPLINE_ORDER, LEAKAGE_COLUMNS, RANDOM_SEED, SCORING_BATCH_SIZE, TARGET_COLUMN
+)
+from src.features.pipeline import FeaturePipeline
+from src.features.selection import FeatureSelector
+from src.models.compiled_gam import CompiledGAM
+from src.models.tuning import tune_lambda
+from src.utils.gam_utils import smooth_curves
+from src.utils.model_utils import best_threshold, build_terms, fit_label_encoders, transform_with_encoders
+
+from .synthetic import make_crt_frame
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+DEFAULT_ROWS = [40_000, 200_000, 1_000_000]
+DEFAULT_GAM_ROWS = 40_000
+DEFAULT_LAMS = [10, 80, 640]
+
+# 用例名 -> 准备函数；准备函数接收上下文，返回计时的无参函数
+CASES: Dict[str, Callable[[Dict], Callable[[], object]]] = {}
+
+
+def case(name: str):
+    """注册基准用例"""
+    def register(setup):
+        CASES[name] = setup
+        return setup
+    return register
+
+
+def _model(ctx: Dict) -> Dict:
+    """在前 gam_rows 行上拟合特征流水线和一个 GAM（不计时，多个用例共用）"""
+    if "gam" not in ctx:
+        df = ctx["df"]
+        train = df.iloc[:ctx["gam_rows"]]
+        pipeline = FeaturePipeline().fit(train)
+        X_tr = pipeline.transform(train, as_frame=False)
+        y_tr = train[TARGET_COLUMN].to_numpy()
+        terms = build_terms(
+            pipeline.feature_columns, pipeline.categorical_columns,
+            n_splines=GAM_N_SPLINES, spline_order=GAM_SPLINE_ORDER
+        )
+        gam = LogisticGAM(copy.deepcopy(terms), lam=ctx["lams"][len(ctx["lams"]) // 2])
+        gam.fit(X_tr, y_tr)
+        
+        ctx.update(pipeline=pipeline, terms=terms, X_tr=X_tr, y_tr=y_tr, gam=gam)
+        ctx["X"] = pipeline.transform(df, as_frame=False)
+        ctx["y"] = df[TARGET_COLUMN].to_numpy()
+        ctx["proba"] = CompiledGAM.from_gam(gam).predict_proba(ctx["X"])
+    return ctx
+
+
+@case("transform_with_encoders")
+def _transform_with_encoders(ctx: Dict):
+    # 与 notebook 一样先去掉目标列和泄露字段，再编码剩余的类别列
+    df = ctx["df"].drop(columns=[TARGET_COLUMN] + LEAKAGE_COLUMNS, errors="ignore")
+    _, encs, obj_cols, modes = fit_label_encoders(df.iloc[:ctx["gam_rows"]])
+    return lambda: transform_with_encoders(df, encs, obj_cols, modes)
+
+
+@case("select_features")
+def _select_features(ctx: Dict):
+    df = ctx["df"]
+    return lambda: FeatureSelector().select_features(df)
+
+
+@case("best_threshold")
+def _best_threshold(ctx: Dict):
+    ctx = _model(ctx)
+    y, proba = ctx["y"], ctx["proba"]
+    return lambda: best_threshold(y, proba)
+
+
+@case("smooth_curves")
+def _smooth_curves(ctx: Dict):
+    ctx = _model(ctx)
+    x = ctx["df"]["credit_score"].to_numpy(dtype=float)
+    y, proba = ctx["y"], ctx["proba"]
+    grid = np.linspace(np.quantile(x, 0.01), np.quantile(x, 0.99), 200)
+    return lambda: smooth_curves(x, y, proba, grid)
+
+
+@case("lambda_search")
+def _lambda_search(ctx: Dict):
+    ctx = _model(ctx)
+    X_tr, y_tr = ctx["X_tr"], ctx["y_tr"]
+    split = int(len(X_tr) * 0.8)
+    return lambda: tune_lambda(
+        X_tr[:split], y_tr[:split], X_tr[split:], y_tr[split:], ctx["terms"],
+        lam_candidates=ctx["lams"], n_jobs=ctx["n_jobs"]
+    )
+
+
+@case("lambda_search_pygam")
+def _lambda_search_pygam(ctx: Dict):
+    ctx = _model(ctx)
+    X_tr, y_tr = ctx["X_tr"], ctx["y_tr"]
+    split = int(len(X_tr) * 0.8)
+    return lambda: tune_lambda(
+        X_tr[:split], y_tr[:split], X_tr[split:], y_tr[split:], ctx["terms"],
+        lam_candidates=ctx["lams"], n_jobs=ctx["n_jobs"], solver="pygam"
+    )
+
+
+def _predict_batches(model, X: np.ndarray, batch_size: int = SCORING_BATCH_SIZE) -> np.ndarray:
+    """按打分批大小分批预测（与 Scorer 的内存口径一致）"""
+    out = np.empty(len(X))
+    for start in range(0, len(X), batch_size):
+        out[start:start + batch_size] = model.predict_proba(X[start:start + batch_size])
+    return out
+
+
+@case("gam_predict")
+def _gam_predict(ctx: Dict):
+    ctx = _model(ctx)
+    gam, X = ctx["gam"], ctx["X"]
+    return lambda: _predict_batches(gam, X)
+
+
+@case("compiled_gam_predict")
+def _compiled_gam_predict(ctx: Dict):
+    ctx = _model(ctx)
+    compiled, X = CompiledGAM.from_gam(ctx["gam"]), ctx["X"]
+    return lambda: _predict_batches(compiled, X)
+
+
+def _quiet(verbose: bool):
+    """被测函数会打印进度，默认不输出"""
+    return contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+
+
+def measure(fn: Callable[[], object], repeat: int = 3, verbose: bool = False) -> Dict[str, object]:
+    """
+    记录一个无参函数的耗时与峰值内存
+    
+    Args:
+        fn: 被测函数
+        repeat: 计时重复次数（取最小值作为主指标）
+        verbose: 是否输出被测函数的打印
+    
+    Returns:
+        {"seconds", "seconds_all", "cpu_seconds", "peak_mb"}
+    """
+    wall, cpu = [], []
+    for _ in range(max(1, repeat)):
+        gc.collect()
+        with _quiet(verbose):
+            c0, t0 = time.process_time(), time.perf_counter()
+            fn()
+            t1, c1 = time.perf_counter(), time.process_time()
+        wall.append(t1 - t0)
+        cpu.append(c1 - c0)
+    
+    gc.collect()
+    tracemalloc.start()
+    try:
+        with _quiet(verbose):
+            fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    
+    best = int(np.argmin(wall))
+    return {
+        "seconds": wall[best],
+        "seconds_all": wall,
+        "cpu_seconds": cpu[best],
+        "peak_mb": peak / 2**20,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=root,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], cwd=root,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ("-dirty" if dirty else "")
+
+
+def environment() -> Dict[str, object]:
+    """运行环境信息，写入结果便于跨提交比较时排除环境差异"""
+    return {
+        "commit": _git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+        "pygam": getattr(pygam, "__version__", None),
+    }
+
+
+def run(
+    rows: Sequence[int] = DEFAULT_ROWS,
+    cases: Optional[Sequence[str]] = None,
+    repeat: int = 3,
+    gam_rows: int = DEFAULT_GAM_ROWS,
+    lams: Sequence[float] = DEFAULT_LAMS,
+    n_jobs: int = 1,
+    downcast: bool = False,
+    seed: int = RANDOM_SEED,
+    verbose: bool = False
+) -> Dict[str, object]:
+    """
+    按行数依次生成合成数据并运行基准用例
+    
+    Args:
+        rows: 数据规模列表
+        cases: 用例名列表（None 时运行全部）
+        repeat: 计时重复次数
+        gam_rows: GAM 拟合 / λ 搜索使用的行数
+        lams: λ 搜索的候选值
+        n_jobs: λ 搜索的进程数
+        downcast: 合成数据是否按 optimize_dtypes 压缩类型
+        seed: 随机种子
+        verbose: 是否输出被测函数的打印
+    
+    Returns:
+        {"meta": 运行环境与参数, "results": [每个 (用例, 行数) 的结果]}
+    """
+    names = list(CASES) if cases is None else list(cases)
+    unknown = [name for name in names if name not in CASES]
+    if unknown:
+        raise ValueError(f"未知的用例: {unknown}，可选: {list(CASES)}")
+    
+    meta = environment()
+    meta.update(
+        rows=list(rows), cases=names, repeat=repeat, gam_rows=gam_rows,
+        lams=list(lams), n_jobs=n_jobs, downcast=downcast, seed=seed
+    )
+    results: List[Dict[str, object]] = []
+    
+    for n_rows in rows:
+        t0 = time.perf_counter()
+        df = make_crt_frame(n_rows, seed=seed, downcast=downcast)
+        print(f"[{n_rows:,} 行] 合成数据 {time.perf_counter() - t0:.1f} 秒, "
+              f"{df.memory_usage(deep=True).sum() / 2**20:,.0f} MB")
+        ctx = {"df": df, "gam_rows": min(gam_rows, n_rows), "lams": list(lams), "n_jobs": n_jobs}
+        
+        for name in names:
+            with _quiet(verbose):
+                fn = CASES[name](ctx)
+            stats = measure(fn, repeat=repeat, verbose=verbose)
+            stats = {"case": name, "rows": n_rows, **stats}
+            results.append(stats)
+            print(f"  {name:<24} {stats['seconds']:>9.3f} 秒  {stats['peak_mb']:>10.1f} MB")
+        
+        del df, ctx
+        gc.collect()
+    
+    # Linux 上 ru_maxrss 单位为 KB，macOS 上为字节
+    scale = 1 if sys.platform == "darwin" else 1024
+    meta["max_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2**20
+    return {"meta": meta, "results": results}
+
+
+def save_results(report: Dict[str, object], path: Optional[str] = None) -> str:
+    """
+    保存基准结果（默认 benchmarks/results/<commit>.json）
+    
+    Args:
+        report: run 的返回值
+        path: 输出路径
+    
+    Returns:
+        实际写入的路径
+    """
+    if path is None:
+        name = report["meta"].get("commit") or datetime.now().strftime("%Y%m%d%H%M%S")
+        path = os.path.join(RESULTS_DIR, f"{name}.json")
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+    print(f"基准结果已保存: {path}")
+    return path
+
+
+def main(argv: Optional[Sequence[str]] = None) -> Dict[str, object]:
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="CRT 模型性能基准")
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS, help="数据规模（行数）")
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), help="只运行这些用例")
+    parser.add_argument("--repeat", type=int, default=3, help="计时重复次数")
+    parser.add_argument("--gam-rows", type=int, default=DEFAULT_GAM_ROWS, help="GAM 拟合 / λ 搜索使用的行数")
+    parser.add_argument("--lams", type=float, nargs="+", default=DEFAULT_LAMS, help="λ 搜索的候选值")
+    parser.add_argument("--n-jobs", type=int, default=1, help="λ 搜索的进程数")
+    parser.add_argument("--downcast", action="store_true", help="合成数据按 optimize_dtypes 压缩类型")
+    parser.add_argument("--seed", type=int, default=RANDOM_SEED, help="随机种子")
+    parser.add_argument("--output", help="结果文件（默认 benchmarks/results/<commit>.json）")
+    parser.add_argument("--verbose", action="store_true", help="输出被测函数的打印")
+    args = parser.parse_args(argv)
+    
+    report = run(
+        rows=args.rows, cases=args.cases, repeat=args.repeat, gam_rows=args.gam_rows,
+        lams=args.lams, n_jobs=args.n_jobs, downcast=args.downcast, seed=args.seed,
+        verbose=args.verbose
+    )
+    save_results(report, args.output)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+合成 CRT 数据 - 生成与建模视图 freddie_mac_delinquency_30_model_mv 字段一致的模拟数据
+
+字段、取值口径与 sql_scripts 中的建模表 / 物化视图一致（分桶、州 / MSA 违约率、
+季节性等衍生字段按视图中的 SQL 计算），标签由信用分、LTV、DTI、利率差等
+通过 logistic 模型生成，GAM 能学到有意义的形状。只用于性能基准，不代表真实分布。
+"""
+import numpy as np
+import pandas as pd
+
+from src.config import RANDOM_SEED, TRAIN_YEARS
+from src.data.schema import optimize_dtypes
+
+STATES = [
+    "AK", "AL", "AR", "AZ", "CA", "CO", "CT", "DC", "DE", "FL", "GA", "GU", "HI", "IA",
+    "ID", "IL", "IN", "KS", "KY", "LA", "MA", "MD", "ME", "MI", "MN", "MO", "MS", "MT",
+    "NC", "ND", "NE", "NH", "NJ", "NM", "NV", "NY", "OH", "OK", "OR", "PA", "PR", "RI",
+    "SC", "SD", "TN", "TX", "UT", "VA", "VI", "VT", "WA", "WI", "WV", "WY",
+]
+
+SELLERS = [
+    "Other sellers", "Wells Fargo Bank, N.A.", "U.S. Bank N.A.", "JPMorgan Chase Bank, N.A.",
+    "Quicken Loans Inc.", "Caliber Home Loans, Inc.", "Flagstar Bank, FSB",
+    "Truist Bank", "PennyMac Corp.", "United Wholesale Mortgage, LLC",
+    "Guaranteed Rate, Inc.", "loanDepot.com, LLC", "Fairway Independent Mortgage Corporation",
+    "Newrez LLC", "Home Point Financial Corporation", "AmeriHome Mortgage Company, LLC",
+]
+
+N_MSA = 400
+
+
+def _pick(rng: np.random.Generator, values, n: int, p=None) -> np.ndarray:
+    """从 values 中按概率抽样，返回 object 数组（同一取值共享同一个字符串对象）"""
+    pool = np.array(list(values), dtype=object)
+    return pool[rng.choice(len(pool), size=n, p=p)]
+
+
+def _cut(values: np.ndarray, bins, labels, right: bool = True) -> np.ndarray:
+    """按物化视图中的 CASE 分桶，缺失值保持为 None"""
+    out = pd.cut(values, bins=bins, labels=labels, right=right).astype(object)
+    return np.where(pd.isna(out), None, out)
+
+
+def _prior_rate(df: pd.DataFrame, key: str) -> pd.Series:
+    """
+    按 key 分组的训练窗口逾期率（训练窗口内的行扣除自身），与物化视图的口径一致；
+    合成数据没有全量人群，用训练窗口内的合成行代替
+    """
+    in_train = (df["period_year"] <= TRAIN_YEARS[1]).astype(np.int64)
+    label = df["delinquency_30d_label"] * in_train
+    groups = df[key]
+    n_delinquent = label.groupby(groups, dropna=False, observed=True).transform("sum") - label
+    n_total = in_train.groupby(groups, dropna=False, observed=True).transform("sum") - in_train
+    return (n_delinquent / n_total.where(n_total > 0)).round(6)
+
+
+def make_crt_frame(
+    n_rows: int,
+    seed: int = RANDOM_SEED,
+    positive_rate: float = 0.5,
+    years: tuple = (2013, 2025),
+    downcast: bool = False
+) -> pd.DataFrame:
+    """
+    生成模拟的建模数据
+    
+    默认与 SupabaseLoader.load_data 的返回一致：文本列为 object，数值列为 int64 / float64，
+    日期列为 'YYYY-MM-DD' 字符串；downcast=True 时再按 optimize_dtypes 压缩类型。
+    
+    Args:
+        n_rows: 行数
+        seed: 随机种子（相同参数生成完全相同的数据）
+        positive_rate: 正样本比例（默认与训练样本一样 1:1 平衡）
+        years: period_year 闭区间
+        downcast: 是否压缩列类型
+    
+    Returns:
+        DataFrame
+    """
+    rng = np.random.default_rng(seed)
+    n = int(n_rows)
+    
+    year = rng.integers(years[0], years[1] + 1, size=n)
+    month = rng.integers(1, 13, size=n)
+    period_codes = year * 100 + month
+    period = pd.Series(period_codes).astype(str).to_numpy(dtype=object)
+    
+    term = rng.choice([360, 240, 180], size=n, p=[0.85, 0.05, 0.10])
+    loan_age = np.minimum(rng.gamma(2.0, 18.0, size=n).astype(np.int64), term - 1)
+    first_pay = pd.to_datetime(
+        {"year": year, "month": month, "day": np.ones(n, dtype=np.int64)}
+    ) - pd.to_timedelta(loan_age * 30.44, unit="D")
+    first_pay = first_pay.dt.to_period("M").dt.to_timestamp()
+    maturity = first_pay + pd.to_timedelta((term - 1) * 30.44, unit="D")
+    
+    credit_score = np.clip(rng.normal(745, 45, size=n), 300, 850).astype(np.int64)
+    ltv = np.clip(rng.normal(75, 15, size=n), 10, 97).astype(np.int64)
+    dti = np.clip(rng.normal(35, 9, size=n), 1, 50).astype(np.int64)
+    orig_rate = np.round(np.clip(rng.normal(4.3, 1.1, size=n), 2.0, 8.5), 3)
+    modified = rng.random(n) < 0.03
+    cur_rate = np.where(modified, np.round(orig_rate - rng.uniform(0.5, 2.0, size=n), 3), orig_rate)
+    cur_rate = np.clip(cur_rate, 1.0, None)
+    upb = np.round(np.exp(rng.normal(12.3, 0.5, size=n)), -3)
+    cur_upb = np.round(upb * np.clip(1.0 - loan_age / term * 0.9, 0.0, 1.0), 2)
+    mi_pct = np.where(ltv > 80, rng.choice([6, 12, 25, 30, 35], size=n), 0)
+    n_mods = np.where(modified, rng.integers(1, 3, size=n), 0)
+    
+    states = _pick(rng, STATES, n)
+    msa_pool = [f"{c:05d}" for c in rng.choice(np.arange(10000, 50000), size=N_MSA, replace=False)]
+    msa = _pick(rng, msa_pool, n)
+    msa[rng.random(n) < 0.08] = None
+    
+    # 标签：信用分 / LTV / DTI / 利率差 / 贷款年龄的 logistic 模型，截距按 positive_rate 校准
+    logit = (
+        -0.012 * (credit_score - 745)
+        + 0.025 * (ltv - 75)
+        + 0.03 * (dti - 35)
+        + 0.6 * (orig_rate - cur_rate)
+        + 0.4 * np.sin(loan_age / 24.0)
+        + 0.3 * (month == 12)
+        + rng.normal(0.0, 0.5, size=n)
+    )
+    cutoff = np.quantile(logit, 1.0 - positive_rate) if n else 0.0
+    label = (rng.random(n) < 1.0 / (1.0 + np.exp(-(logit - cutoff) * 1.5))).astype(np.int64)
+    
+    # 近 3 期还款记录：逾期样本更可能出现非 0 状态
+    recent = rng.random(n) < np.where(label == 1, 0.35, 0.05)
+    history_pool = np.array(["000000000000", "000000000001", "000000000010", "000000000100"], dtype=object)
+    history = history_pool[np.where(recent, rng.integers(1, 4, size=n), 0)]
+    
+    loan_codes = year * 10_000_000 + rng.integers(0, 10_000_000, size=n)
+    df = pd.DataFrame({
+        "loan_identifier": ("F" + pd.Series(loan_codes).astype(str)).to_numpy(dtype=object),
+        "period": period,
+        "period_year": year,
+        "period_month": month,
+        "amortization_type": _pick(rng, ["FRM"], n),
+        "seller_name": _pick(rng, SELLERS, n),
+        "property_state": states,
+        "msa": msa,
+        "first_payment_date": first_pay.dt.strftime("%Y-%m-%d").to_numpy(dtype=object),
+        "maturity_date": maturity.dt.to_period("M").dt.to_timestamp().dt.strftime("%Y-%m-%d").to_numpy(dtype=object),
+        "original_loan_term": term,
+        "original_interest_rate": orig_rate,
+        "original_upb": upb,
+        "loan_purpose": _pick(rng, ["P", "C", "N"], n, p=[0.45, 0.25, 0.30]),
+        "channel": _pick(rng, ["R", "B", "C", "T"], n, p=[0.55, 0.15, 0.25, 0.05]),
+        "property_type": _pick(rng, ["SF", "PU", "CO", "MH", "CP"], n, p=[0.62, 0.27, 0.08, 0.02, 0.01]),
+        "number_of_units": rng.choice([1, 2, 3, 4], size=n, p=[0.97, 0.02, 0.005, 0.005]),
+        "occupancy_status": _pick(rng, ["P", "S", "I"], n, p=[0.90, 0.04, 0.06]),
+        "first_time_homebuyer_indicator": _pick(rng, ["N", "Y"], n, p=[0.75, 0.25]),
+        "credit_score": credit_score,
+        "original_loan_to_value_ltv": ltv,
+        "original_debt_to_income_dti_ratio": dti,
+        "mortgage_insurance_percentage_mi_percent": mi_pct.astype(np.float64),
+        "loan_age": loan_age,
+        "remaining_months_to_legal_maturity": term - loan_age,
+        "current_loan_delinquency_status": np.where(label == 1, "01", "00").astype(object),
+        "payment_history": history,
+        "current_interest_rate": cur_rate,
+        "current_actual_upb": cur_upb,
+        "modification_flag": np.where(modified, "Y", None).astype(object),
+        "delinquency_due_to_disaster": _pick(rng, [None, "Y"], n, p=[0.995, 0.005]),
+        "bankruptcy_flag": _pick(rng, ["N", "Y"], n, p=[0.998, 0.002]),
+        "number_of_modifications": n_mods,
+        "modification_debt_to_income_ratio": np.where(modified, dti.astype(np.float64), np.nan),
+        "interest_rate_step_indicator": _pick(rng, ["N"], n),
+        "property_valuation_method": _pick(rng, ["1", "2", "3", "4", "9"], n, p=[0.05, 0.80, 0.05, 0.09, 0.01]),
+        "borrower_assistance_plan": _pick(rng, [None, "F", "R", "T"], n, p=[0.97, 0.01, 0.01, 0.01]),
+        "payment_deferral_flag": _pick(rng, ["N", "Y"], n, p=[0.99, 0.01]),
+        "distressed_principal_balance_flag": _pick(rng, ["N"], n),
+        "delinquency_30d_label": label,
+    })
+    
+    # 以下衍生字段与 Delinquency Model Materialized View 中的 SQL 一致
+    df["loan_to_value_ratio_bucket"] = _cut(
+        ltv, [-np.inf, 60, 80, 90, 95, np.inf], ["<=60", "60-80", "80-90", "90-95", ">95"]
+    )
+    df["loan_age_years"] = np.round(loan_age / 12.0, 2)
+    df["interest_rate_diff"] = np.round(orig_rate - cur_rate, 4)
+    df["high_dti_flag"] = (dti > 45).astype(np.int64)
+    df["credit_score_bucket"] = _cut(
+        credit_score, [-np.inf, 620, 680, 740, 780, np.inf],
+        ["<620", "620-679", "680-739", "740-779", ">=780"], right=False
+    )
+    df["recent_delinquency_flag"] = recent.astype(np.int64)
+    df["state_default_rate"] = _prior_rate(df, "property_state")
+    df["msa_default_rate"] = _prior_rate(df, "msa")
+    df["loan_size_bucket"] = _cut(
+        upb, [-np.inf, 100_000, 250_000, 500_000, np.inf], ["<100K", "100K-250K", "250K-500K", ">=500K"], right=False
+    )
+    df["interest_rate_bucket"] = _cut(
+        cur_rate, [-np.inf, 3, 4, 5, 6, np.inf], ["<3", "3-4", "4-5", "5-6", ">=6"], right=False
+    )
+    df["seasonality_flag"] = np.isin(month, [11, 12, 1]).astype(np.int64)
+    df["modification_history_flag"] = (modified | (n_mods > 0)).astype(np.int64)
+    
+    if downcast:
+        df, _ = optimize_dtypes(df, verbose=False)
+    return df
+
@@ -16,6 +16,7 @@ required_packages = {
     'pygam': 'pygam',
     'matplotlib': 'matplotlib',
     'scipy': 'scipy',
+    'pyarrow': 'pyarrow',
 }
 
 missing_packages = []
@@ -45,7 +46,7 @@ if missing_packages:
     print("\n运行以下命令安装:")
     print(f"\npip3 install {' '.join(missing_packages)}")
     print("\n或一次性安装所有依赖:")
-    print(f"\npip3 install pandas numpy scikit-learn supabase pygam matplotlib scipy")
+    print(f"\npip3 install pandas numpy scikit-learn supabase pygam matplotlib scipy pyarrow")
     sys.exit(1)
 else:
     print("\n🎉 所有必需的包都已安装！")
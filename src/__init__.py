@@ -1,5 +1,10 @@
 """
 CRT Model - Freddie Mac 30天违约预测模型
+
+子包（data / features / models / utils）在首次访问时才导入。
 """
+from ._lazy import lazy_exports
+
 __version__ = "0.1.0"
 
+__getattr__, __dir__ = lazy_exports(__name__, {}, submodules=("data", "features", "models", "utils"))
@@ -0,0 +1,45 @@
+"""
+延迟导入 - 包的公开属性在首次访问时才导入所在子模块（PEP 562 模块级 __getattr__）
+"""
+import importlib
+from typing import Callable, Dict, Iterable, List, Tuple
+
+
+def lazy_exports(
+    package: str,
+    exports: Dict[str, str],
+    submodules: Iterable[str] = ()
+) -> Tuple[Callable[[str], object], Callable[[], List[str]]]:
+    """
+    生成包的 __getattr__ / __dir__
+    
+    用法（在包的 __init__.py 中）：
+        
+        __getattr__, __dir__ = lazy_exports(__name__, {"SupabaseLoader": ".loader"})
+    
+    首次访问后属性写入包的命名空间，之后的访问不再经过 __getattr__。
+    
+    Args:
+        package: 包名（传 __name__）
+        exports: {公开名称: 所在子模块的相对路径}
+        submodules: 可按属性访问的子模块名（如 src.data）
+    
+    Returns:
+        (__getattr__, __dir__)
+    """
+    submodules = tuple(submodules)
+    
+    def __getattr__(name: str):
+        if name in exports:
+            value = getattr(importlib.import_module(exports[name], package), name)
+        elif name in submodules:
+            value = importlib.import_module(f".{name}", package)
+        else:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        vars(importlib.import_module(package))[name] = value
+        return value
+    
+    def __dir__() -> List[str]:
+        return sorted(set(vars(importlib.import_module(package))) | set(exports) | set(submodules))
+    
+    return __getattr__, __dir__
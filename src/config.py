@@ -15,6 +15,9 @@ SUPABASE_KEY = os.getenv(
 
 # 数据库表名
 TABLE_MODEL_DATA = "freddie_mac_delinquency_30_model_2013_2025"
+# 建模视图：服务端完成类型转换、分桶和州 / MSA 违约率（见 sql_scripts/Delinquency Model Materialized View），
+# SupabaseLoader 默认从这里读取；TABLE_MODEL_DATA 为旧的 TEXT 建模表，仅在显式指定时使用
+TABLE_MODEL_VIEW = "freddie_mac_delinquency_30_model_mv"
 TABLE_RAW_DATA = "freddie_mac_crt_raw_2023_2023"
 TABLE_CLEAN_DATA = "freddie_mac_crt_raw_clean1"
 
@@ -22,28 +25,64 @@ TABLE_CLEAN_DATA = "freddie_mac_crt_raw_clean1"
 BATCH_SIZE = 1000
 MAX_ROWS = 40000
 
+# 并发下载配置
+FETCH_MAX_WORKERS = 4          # 同时在途的分页请求数
+FETCH_MAX_RETRIES = 5          # 单页最大重试次数
+FETCH_BACKOFF_BASE = 1.0       # 指数退避初始等待（秒）
+FETCH_BACKOFF_MAX = 30.0       # 指数退避最大等待（秒）
+
+# 键集分页的排序键（需有对应的联合索引，见 sql_scripts）
+KEYSET_COLUMNS = ["period", "loan_identifier"]
+
 # 目标变量
 TARGET_COLUMN = "delinquency_30d_label"
 
+# 时间窗口（period_year 闭区间）
+TRAIN_YEARS = (2013, 2022)
+BACKTEST_YEARS = (2023, 2025)
+
 # 文件路径
 DATA_DIR = "data"
 RAW_DATA_FILE = "freddie_mac_delinquency_balanced.csv"
-PROCESSED_DATA_FILE = "freddie_mac_delinquency_strict_predict_ready_GAM.csv"
+PROCESSED_DATA_FILE = "freddie_mac_delinquency_strict_predict_ready_GAM.parquet"
+
+# 列式缓存配置
+CACHE_DIR = os.path.join(DATA_DIR, "cache")
+CACHE_FORMAT = "parquet"       # 'parquet' 或 'feather'
+
+# 按 period 分区的本地数据集（增量同步）
+STORE_DIR = os.path.join(DATA_DIR, "store")
+SYNC_MAX_ROWS = 50_000_000     # 单次增量同步的最大行数
+
+# 阶段计时（见 utils.instrument；设置环境变量即在导入时启用）
+INSTRUMENT_PATH = os.getenv("CRT_INSTRUMENT_PATH")     # 各阶段指标以 JSON lines 追加写入该文件
+INSTRUMENT_PROFILE_DIR = os.getenv("CRT_PROFILE_DIR")  # 对最外层阶段采样分析，折叠栈文件写入该目录
+PROFILE_SAMPLE_INTERVAL = 0.01                         # 采样间隔（秒）
 
 # 模型配置
 RANDOM_SEED = 42
 TEST_SIZE = 0.2
 CV_FOLDS = 5
 
+# 打分配置
+SCORING_BATCH_SIZE = 100_000   # 批量打分每批行数
+SCORING_ID_COLUMNS = ["loan_identifier", "period"]   # 原样写入打分结果的标识列
+
 # GAM 模型参数
 GAM_LAM_CANDIDATES = [10, 20, 40, 80, 120, 160, 240, 320, 480, 640]
 GAM_N_SPLINES = 8
 GAM_SPLINE_ORDER = 3
+GAM_SOLVER = "cached"   # λ 搜索 / 重训的求解器：cached（GAMDesign，设计矩阵按数据划分缓存）或 pygam
+GAM_LARGE_SAMPLE_SIZE = 200_000   # 大数据模式下 λ 搜索使用的分层子样本行数
+GAM_CHUNK_SIZE = 100_000   # 大数据模式下分块 IRLS 每块行数
+SMOOTH_BINS_PER_H = 80   # smooth_curves 线性分箱：每个核带宽内的分箱数
+SMOOTH_EXACT_MAX_CELLS = 2_000_000   # smooth_curves 观测数 × 网格点数不超过该值时逐点精确计算
 
 # 特征工程配置
 HIGH_MISSING_THRESHOLD = 0.4
 HIGH_CORRELATION_THRESHOLD = 0.9
 LOW_VARIANCE_THRESHOLD = 0.01
+PROFILE_MAX_DISTINCT = 100_000    # 分块统计时数值列超过该不同取值数改用流式矩 + 分位数草图
 
 # 必须保留的特征
 MUST_KEEP_FEATURES = [
@@ -53,7 +92,8 @@ MUST_KEEP_FEATURES = [
     "loan_age_years", "interest_rate_diff"
 ]
 
-# 可选保留的特征
+# 可选保留的特征（state_default_rate / msa_default_rate 只用训练窗口人群计算、训练期留一，
+# 不含回测期标签，见 sql_scripts/Delinquency Model Materialized View）
 OPTIONAL_KEEP_FEATURES = [
     "state_default_rate", "msa_default_rate", "modification_history_flag"
 ]
@@ -1,8 +1,31 @@
 """
 数据加载和处理模块
+
+公开属性在首次访问时才导入所在子模块，例如只使用 PeriodStore / read_frame 时不会导入 supabase。
 """
-from .loader import SupabaseLoader
-from .preprocessor import DataPreprocessor
+from typing import TYPE_CHECKING
+
+from .._lazy import lazy_exports
+
+_EXPORTS = {
+    'SupabaseLoader': '.loader',
+    'DataPreprocessor': '.preprocessor',
+    'ColumnarCache': '.cache',
+    'frame_writer': '.cache',
+    'iter_frame_batches': '.cache',
+    'read_frame': '.cache',
+    'write_frame': '.cache',
+    'optimize_dtypes': '.schema',
+    'PeriodStore': '.store',
+}
+
+__all__ = list(_EXPORTS)
 
-__all__ = ['SupabaseLoader', 'DataPreprocessor']
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
 
+if TYPE_CHECKING:
+    from .loader import SupabaseLoader
+    from .preprocessor import DataPreprocessor
+    from .cache import ColumnarCache, frame_writer, iter_frame_batches, read_frame, write_frame
+    from .schema import optimize_dtypes
+    from .store import PeriodStore
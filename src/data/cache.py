@@ -0,0 +1,469 @@
+"""
+列式磁盘缓存 - 以 Parquet/Feather 存储带类型的数据，按查询指纹自动失效
+"""
+import glob
+import hashlib
+import json
+import os
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+from ..config import CACHE_DIR, CACHE_FORMAT
+from .schema import FLOAT_COLUMNS, INTEGER_COLUMNS
+
+# 缓存布局或指纹规则变化时递增，使旧文件全部失效
+# （2：增量写入的列类型改为逐块放宽，不再固定为首块的类型）
+CACHE_VERSION = 2
+
+# 字段表中的数值列：整数列也可能含缺失，落盘统一为 float64，不随首块推断
+_NUMERIC_COLUMNS = frozenset(INTEGER_COLUMNS) | frozenset(FLOAT_COLUMNS)
+
+_EXTENSIONS = {"parquet": ".parquet", "feather": ".feather"}
+
+
+def cache_fingerprint(
+    table_name: str,
+    row_range: Sequence[int],
+    columns: Optional[List[str]] = None,
+    filters: Optional[Dict] = None
+) -> str:
+    """
+    计算查询指纹
+    
+    Args:
+        table_name: 表名
+        row_range: 行范围 (start, stop)
+        columns: 投影列（None 表示全部列）
+        filters: 查询条件
+    
+    Returns:
+        16 位十六进制指纹
+    """
+    payload = {
+        "version": CACHE_VERSION,
+        "table": table_name,
+        "row_range": [int(v) for v in row_range],
+        "columns": list(columns) if columns else "*",
+        "filters": filters or {},
+    }
+    raw = json.dumps(payload, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def _format_of(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    for fmt, fmt_ext in _EXTENSIONS.items():
+        if ext == fmt_ext:
+            return fmt
+    return "csv"
+
+
+def write_frame(df: pd.DataFrame, path: str) -> str:
+    """
+    按扩展名写出 DataFrame（.parquet / .feather，其他按 CSV）
+    
+    Args:
+        df: DataFrame
+        path: 文件路径
+    
+    Returns:
+        文件路径
+    """
+    fmt = _format_of(path)
+    dirname = os.path.dirname(path)
+    if dirname:
+        os.makedirs(dirname, exist_ok=True)
+    tmp_path = path + ".tmp"
+    if fmt == "parquet":
+        df.to_parquet(tmp_path, index=False)
+    elif fmt == "feather":
+        # 不压缩以便内存映射读取
+        feather.write_feather(
+            pa.Table.from_pandas(df, preserve_index=False), tmp_path, compression="uncompressed"
+        )
+    else:
+        df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_frame(
+    path: str,
+    columns: Optional[List[str]] = None,
+    memory_map: bool = True
+) -> pd.DataFrame:
+    """
+    按扩展名读取 DataFrame，列式格式支持投影列和内存映射
+    
+    Args:
+        path: 文件路径
+        columns: 只读取这些列（None 为全部）
+        memory_map: 列式格式是否使用内存映射
+    
+    Returns:
+        DataFrame
+    """
+    fmt = _format_of(path)
+    if fmt == "parquet":
+        return pq.read_table(path, columns=columns, memory_map=memory_map).to_pandas()
+    if fmt == "feather":
+        return feather.read_table(path, columns=columns, memory_map=memory_map).to_pandas()
+    return pd.read_csv(path, usecols=columns, low_memory=False)
+
+
+def frame_columns(path: str) -> List[str]:
+    """
+    只读取文件的列名（列式格式读 schema，CSV 读表头）
+    
+    Args:
+        path: 文件路径
+    
+    Returns:
+        列名列表
+    """
+    fmt = _format_of(path)
+    if fmt == "parquet":
+        return pq.read_schema(path).names
+    if fmt == "feather":
+        with pa.memory_map(path, "r") as source:
+            return pa.ipc.open_file(source).schema.names
+    return pd.read_csv(path, nrows=0).columns.tolist()
+
+
+def iter_frame_batches(
+    path: str,
+    batch_size: int,
+    columns: Optional[List[str]] = None,
+    dtype: Optional[Dict] = None
+) -> Iterator[pd.DataFrame]:
+    """
+    按扩展名分块流式读取文件，内存占用只与 batch_size 有关
+    
+    Args:
+        path: 文件路径（.parquet / .feather，其他按 CSV）
+        batch_size: 每块行数
+        columns: 只读取这些列
+        dtype: CSV 的列类型（如类别列按 str 读取，避免 '01' 被解析为 1）
+    
+    Yields:
+        DataFrame 数据块
+    """
+    fmt = _format_of(path)
+    if fmt == "parquet":
+        batches = pq.ParquetFile(path, memory_map=True).iter_batches(
+            batch_size=batch_size, columns=columns
+        )
+        for batch in batches:
+            yield batch.to_pandas()
+        return
+    if fmt == "feather":
+        with pa.memory_map(path, "r") as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                table = pa.Table.from_batches([reader.get_batch(i)])
+                if columns is not None:
+                    table = table.select(columns)
+                for start in range(0, table.num_rows, batch_size):
+                    yield table.slice(start, batch_size).to_pandas()
+        return
+    yield from pd.read_csv(path, usecols=columns, dtype=dtype, chunksize=batch_size)
+
+
+def _initial_type(field: pa.Field) -> pa.DataType:
+    """首块确定的列类型：字段表中的数值列（首块为空或为数值时）统一为 float64，其余沿用首块"""
+    if field.name in _NUMERIC_COLUMNS and (
+        pa.types.is_null(field.type) or pa.types.is_integer(field.type) or pa.types.is_floating(field.type)
+    ):
+        return pa.float64()
+    return field.type
+
+
+def _promote(current: pa.DataType, incoming: pa.DataType) -> pa.DataType:
+    """
+    两个列类型的公共类型，只放宽不收窄：空列可变为任意类型，整数可放宽为 float64，
+    数值与字符串等无法合并的类型最后才退为字符串
+    """
+    if current == incoming or pa.types.is_null(incoming):
+        return current
+    if pa.types.is_null(current):
+        return incoming
+    try:
+        return pa.unify_schemas(
+            [pa.schema([("c", current)]), pa.schema([("c", incoming)])], promote_options="permissive"
+        ).field("c").type
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pa.string()
+
+
+def _align(table: pa.Table, schema: pa.Schema) -> pa.Table:
+    """把 Arrow 表对齐到 schema（缺少的列补空值，多出的列丢弃）"""
+    arrays = []
+    for field in schema:
+        if field.name in table.column_names:
+            arrays.append(table.column(field.name).cast(field.type))
+        else:
+            arrays.append(pa.nulls(table.num_rows, type=field.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def _iter_record_batches(path: str, fmt: str) -> Iterator[pa.RecordBatch]:
+    """逐批读取列式文件（用于重写）"""
+    if fmt == "parquet":
+        yield from pq.ParquetFile(path).iter_batches()
+        return
+    with pa.memory_map(path, "r") as source:
+        reader = pa.ipc.open_file(source)
+        for i in range(reader.num_record_batches):
+            yield reader.get_batch(i)
+
+
+class ChunkWriter:
+    """增量写入器：逐块追加到列式文件（或 CSV），close() 后文件才生效"""
+    
+    def __init__(self, path: str, fmt: str, on_close=None):
+        """
+        Args:
+            path: 目标文件路径
+            fmt: 'parquet'、'feather' 或 'csv'
+            on_close: 关闭后回调，参数为 (写入行数, schema)；CSV 的 schema 为 None
+        """
+        self.path = path
+        self.fmt = fmt
+        self.tmp_path = path + ".tmp"
+        self.schema: Optional[pa.Schema] = None
+        self.rows = 0
+        self._writer = None
+        self._sink = None
+        self._columns: List[str] = []
+        self._on_close = on_close
+        dirname = os.path.dirname(path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+    
+    def _open(self, schema: pa.Schema) -> None:
+        self.schema = schema
+        if self.fmt == "parquet":
+            self._writer = pq.ParquetWriter(self.tmp_path, self.schema)
+        else:
+            self._sink = pa.OSFile(self.tmp_path, "wb")
+            self._writer = pa.ipc.new_file(self._sink, self.schema)
+    
+    def _close_writer(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        if self._sink is not None:
+            self._sink.close()
+        self._writer, self._sink = None, None
+    
+    def _widen(self, schema: pa.Schema) -> None:
+        """
+        新数据块的类型放不进当前 schema 时（如首块全为空的列、首块为整数后出现小数），
+        放宽 schema 并把已写入的数据逐批转换后重写
+        """
+        incoming = {f.name: f.type for f in schema}
+        fields = [
+            pa.field(f.name, _promote(f.type, incoming[f.name])) if f.name in incoming else f
+            for f in self.schema
+        ]
+        widened = pa.schema(fields)
+        if widened.equals(self.schema):
+            return
+        self._close_writer()
+        old_path = self.tmp_path + ".old"
+        os.replace(self.tmp_path, old_path)
+        self._open(widened)
+        for batch in _iter_record_batches(old_path, self.fmt):
+            self._writer.write_table(_align(pa.Table.from_batches([batch]), widened))
+        os.remove(old_path)
+    
+    def write(self, chunk: pd.DataFrame) -> None:
+        """追加一个数据块"""
+        if self.fmt == "csv":
+            header = self._writer is None
+            if header:
+                self._columns = chunk.columns.tolist()
+                self._writer = open(self.tmp_path, "w", encoding="utf-8", newline="")
+            chunk.reindex(columns=self._columns).to_csv(self._writer, header=header, index=False)
+            self.rows += len(chunk)
+            return
+        if chunk.empty and self.schema is not None:
+            return
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if self.schema is None:
+            self._open(pa.schema([pa.field(f.name, _initial_type(f)) for f in table.schema]))
+        else:
+            self._widen(table.schema)
+        table = _align(table, self.schema)
+        self._writer.write_table(table)
+        self.rows += table.num_rows
+    
+    def close(self) -> str:
+        """完成写入并原子替换为正式文件"""
+        if self._writer is None:
+            raise ValueError("没有写入任何数据块")
+        self._close_writer()
+        os.replace(self.tmp_path, self.path)
+        if self._on_close is not None:
+            self._on_close(self.rows, self.schema)
+        return self.path
+    
+    def abort(self) -> None:
+        """放弃写入，删除临时文件"""
+        self._close_writer()
+        for path in (self.tmp_path, self.tmp_path + ".old"):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def frame_writer(path: str) -> ChunkWriter:
+    """
+    按扩展名打开增量写入器（.parquet / .feather，其他按 CSV）
+    
+    Args:
+        path: 文件路径
+    
+    Returns:
+        ChunkWriter
+    """
+    return ChunkWriter(path, _format_of(path))
+
+
+class ColumnarCache:
+    """按查询指纹索引的列式缓存"""
+    
+    def __init__(self, cache_dir: str = CACHE_DIR, fmt: str = CACHE_FORMAT):
+        """
+        Args:
+            cache_dir: 缓存目录
+            fmt: 文件格式，'parquet' 或 'feather'
+        """
+        if fmt not in _EXTENSIONS:
+            raise ValueError(f"不支持的缓存格式: {fmt}")
+        self.cache_dir = cache_dir
+        self.fmt = fmt
+    
+    def key(
+        self,
+        table_name: str,
+        row_range: Sequence[int],
+        columns: Optional[List[str]] = None,
+        filters: Optional[Dict] = None
+    ) -> str:
+        """生成缓存键：<表名>-<指纹>"""
+        return f"{table_name}-{cache_fingerprint(table_name, row_range, columns, filters)}"
+    
+    def path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + _EXTENSIONS[self.fmt])
+    
+    def meta_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + ".meta.json")
+    
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self.path(key))
+    
+    def read(
+        self,
+        key: str,
+        columns: Optional[List[str]] = None,
+        memory_map: bool = True
+    ) -> pd.DataFrame:
+        """
+        读取缓存
+        
+        Args:
+            key: 缓存键
+            columns: 只读取这些列
+            memory_map: 是否内存映射
+        
+        Returns:
+            DataFrame
+        """
+        return read_frame(self.path(key), columns=columns, memory_map=memory_map)
+    
+    def iter_chunks(
+        self,
+        key: str,
+        batch_size: int,
+        columns: Optional[List[str]] = None
+    ) -> Iterator[pd.DataFrame]:
+        """
+        分块流式读取缓存，不把整个文件载入内存
+        
+        Args:
+            key: 缓存键
+            batch_size: 每块行数
+            columns: 只读取这些列
+        
+        Yields:
+            DataFrame 数据块
+        """
+        yield from iter_frame_batches(self.path(key), batch_size, columns=columns)
+    
+    def _write_meta(self, key: str, rows: int, dtypes: Dict[str, str], meta: Optional[Dict]) -> None:
+        info = dict(meta or {})
+        info.update({
+            "version": CACHE_VERSION,
+            "format": self.fmt,
+            "rows": int(rows),
+            "dtypes": dtypes,
+        })
+        with open(self.meta_path(key), "w", encoding="utf-8") as fh:
+            json.dump(info, fh, ensure_ascii=False, indent=2, default=str)
+    
+    def writer(self, key: str, meta: Optional[Dict] = None) -> ChunkWriter:
+        """
+        打开增量写入器，数据块逐个追加，close() 之后缓存才可命中
+        
+        Args:
+            key: 缓存键
+            meta: 额外元数据
+        
+        Returns:
+            ChunkWriter
+        """
+        def on_close(rows, schema):
+            self._write_meta(key, rows, {f.name: str(f.type) for f in schema}, meta)
+        
+        return ChunkWriter(self.path(key), self.fmt, on_close=on_close)
+    
+    def write(self, key: str, df: pd.DataFrame, meta: Optional[Dict] = None) -> str:
+        """
+        写入缓存，并在旁边保存记录查询条件和列类型的元数据
+        
+        Args:
+            key: 缓存键
+            df: DataFrame
+            meta: 额外元数据（表名、行范围、查询条件等）
+        
+        Returns:
+            缓存文件路径
+        """
+        path = write_frame(df, self.path(key))
+        self._write_meta(
+            key, df.shape[0], {col: str(dtype) for col, dtype in df.dtypes.items()}, meta
+        )
+        return path
+    
+    def clear(self, table_name: Optional[str] = None) -> int:
+        """
+        删除缓存文件
+        
+        Args:
+            table_name: 只删除该表的缓存（None 为全部）
+        
+        Returns:
+            删除的缓存条目数
+        """
+        prefix = f"{table_name}-" if table_name else ""
+        removed = 0
+        for path in glob.glob(os.path.join(self.cache_dir, prefix + "*" + _EXTENSIONS[self.fmt])):
+            os.remove(path)
+            meta = path[: -len(_EXTENSIONS[self.fmt])] + ".meta.json"
+            if os.path.exists(meta):
+                os.remove(meta)
+            removed += 1
+        return removed
@@ -0,0 +1,332 @@
+"""
+并发分页下载引擎 - 按 range 并发拉取，支持指数退避重试和断点续传
+"""
+import json
+import os
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from ..config import (
+    BATCH_SIZE, FETCH_MAX_WORKERS, FETCH_MAX_RETRIES,
+    FETCH_BACKOFF_BASE, FETCH_BACKOFF_MAX
+)
+
+# fetch_page(start, end) -> 该闭区间内的行（list of dict）
+FetchPageFn = Callable[[int, int], List[dict]]
+# fetch_after(cursor, limit) -> 排序键严格大于 cursor 的前 limit 行（cursor 为 None 时从头开始）
+FetchAfterFn = Callable[[Optional[tuple], int], List[dict]]
+
+
+def retry_with_backoff(
+    fn: Callable[[], object],
+    max_retries: int = FETCH_MAX_RETRIES,
+    backoff_base: float = FETCH_BACKOFF_BASE,
+    backoff_max: float = FETCH_BACKOFF_MAX,
+    desc: str = "请求"
+):
+    """
+    带有界指数退避的重试
+    
+    Args:
+        fn: 无参调用
+        max_retries: 最大重试次数
+        backoff_base: 初始等待秒数
+        backoff_max: 单次等待上限
+        desc: 日志中的请求描述
+    
+    Returns:
+        fn 的返回值
+    
+    Raises:
+        RuntimeError: 重试次数用尽
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return fn()
+        except Exception as e:
+            if attempt >= max_retries:
+                raise RuntimeError(f"{desc} 重试 {max_retries} 次后仍失败: {e}") from e
+            delay = min(backoff_max, backoff_base * (2 ** attempt))
+            delay *= 0.5 + 0.5 * random.random()
+            print(f"{desc} 失败: {e}，{delay:.1f}秒后重试 ({attempt + 1}/{max_retries})...")
+            time.sleep(delay)
+
+
+class FetchCheckpoint:
+    """断点续传清单：记录已完成的 range，并把每页数据落盘"""
+    
+    MANIFEST_NAME = "manifest.json"
+    
+    def __init__(self, checkpoint_dir: str, signature: dict):
+        """
+        Args:
+            checkpoint_dir: 断点目录
+            signature: 查询签名（表名、批次大小、查询条件等），不一致时丢弃旧断点
+        """
+        self.checkpoint_dir = checkpoint_dir
+        self.signature = signature
+        self.completed: Dict[int, int] = {}
+        self.end_offset: Optional[int] = None
+        
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        manifest = self._read_manifest()
+        if manifest is not None and manifest.get("signature") == signature:
+            self.completed = {int(k): v for k, v in manifest["completed"].items()}
+            self.end_offset = manifest.get("end_offset")
+            if self.completed:
+                print(f"从断点恢复: 已完成 {len(self.completed)} 页")
+        elif manifest is not None:
+            print("断点签名不匹配，重新下载")
+            self.clear()
+            os.makedirs(checkpoint_dir, exist_ok=True)
+    
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.checkpoint_dir, self.MANIFEST_NAME)
+    
+    def _page_path(self, start: int) -> str:
+        return os.path.join(self.checkpoint_dir, f"page_{start:012d}.json")
+    
+    def _read_manifest(self) -> Optional[dict]:
+        if not os.path.exists(self.manifest_path):
+            return None
+        with open(self.manifest_path, "r", encoding="utf-8") as fh:
+            return json.load(fh)
+    
+    def _write_json(self, path: str, obj) -> None:
+        # 先写临时文件再替换，避免中断时留下半个文件
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(obj, fh, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    
+    def is_done(self, start: int) -> bool:
+        return start in self.completed
+    
+    def load_page(self, start: int) -> List[dict]:
+        with open(self._page_path(start), "r", encoding="utf-8") as fh:
+            return json.load(fh)
+    
+    def save_page(self, start: int, rows: List[dict], end_offset: Optional[int] = None) -> None:
+        """保存一页数据并更新清单"""
+        self._write_json(self._page_path(start), rows)
+        self.completed[start] = len(rows)
+        if end_offset is not None:
+            self.end_offset = end_offset if self.end_offset is None else min(self.end_offset, end_offset)
+        self._write_json(self.manifest_path, {
+            "signature": self.signature,
+            "completed": {str(k): v for k, v in sorted(self.completed.items())},
+            "end_offset": self.end_offset,
+        })
+    
+    def clear(self) -> None:
+        """删除断点目录下的清单和分页文件"""
+        if not os.path.isdir(self.checkpoint_dir):
+            return
+        for name in os.listdir(self.checkpoint_dir):
+            if name == self.MANIFEST_NAME or name.startswith("page_"):
+                os.remove(os.path.join(self.checkpoint_dir, name))
+        self.completed = {}
+        self.end_offset = None
+
+
+class RangeFetcher:
+    """按 offset range 并发分页下载，按 offset 顺序产出结果"""
+    
+    def __init__(
+        self,
+        fetch_page: FetchPageFn,
+        batch_size: int = BATCH_SIZE,
+        max_workers: int = FETCH_MAX_WORKERS,
+        max_retries: int = FETCH_MAX_RETRIES,
+        backoff_base: float = FETCH_BACKOFF_BASE,
+        backoff_max: float = FETCH_BACKOFF_MAX,
+        checkpoint: Optional[FetchCheckpoint] = None
+    ):
+        """
+        Args:
+            fetch_page: 拉取闭区间 [start, end] 的函数
+            batch_size: 每页行数（不能超过服务端单次返回上限）
+            max_workers: 同时在途的请求数
+            max_retries: 单页最大重试次数
+            backoff_base: 指数退避初始等待秒数
+            backoff_max: 指数退避最大等待秒数
+            checkpoint: 断点清单（None 时不落盘）
+        """
+        self.fetch_page = fetch_page
+        self.batch_size = batch_size
+        self.max_workers = max(1, max_workers)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.checkpoint = checkpoint
+    
+    def _fetch_with_retry(self, start: int, end: int) -> List[dict]:
+        return retry_with_backoff(
+            lambda: self.fetch_page(start, end) or [],
+            max_retries=self.max_retries,
+            backoff_base=self.backoff_base,
+            backoff_max=self.backoff_max,
+            desc=f"获取行 {start} - {end}"
+        )
+    
+    def iter_pages(self, max_rows: int) -> Iterator[Tuple[int, List[dict]]]:
+        """
+        并发拉取 [0, max_rows) 范围内的所有页
+        
+        某页返回行数少于请求行数即视为到达表尾，之后的页不再提交。
+        
+        Args:
+            max_rows: 最大行数
+        
+        Yields:
+            (start, rows)，按 start 升序
+        """
+        starts = list(range(0, max_rows, self.batch_size))
+        ckpt = self.checkpoint
+        end_offset = ckpt.end_offset if ckpt else None
+        pending = {}
+        buffered: Dict[int, Optional[List[dict]]] = {}
+        next_submit = 0
+        next_yield = 0
+        
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            while True:
+                # 补满在途请求
+                while len(pending) < self.max_workers and next_submit < len(starts):
+                    start = starts[next_submit]
+                    if end_offset is not None and start >= end_offset:
+                        next_submit = len(starts)
+                        break
+                    next_submit += 1
+                    if ckpt and ckpt.is_done(start):
+                        buffered[start] = None
+                        continue
+                    end = min(start + self.batch_size, max_rows) - 1
+                    pending[executor.submit(self._fetch_with_retry, start, end)] = start
+                
+                # 按顺序产出已就绪的连续页
+                while next_yield < len(starts):
+                    start = starts[next_yield]
+                    if end_offset is not None and start >= end_offset:
+                        return
+                    if start not in buffered:
+                        break
+                    rows = buffered.pop(start)
+                    if rows is None:
+                        rows = ckpt.load_page(start)
+                    next_yield += 1
+                    if rows:
+                        yield start, rows
+                
+                if next_yield >= len(starts):
+                    return
+                if not pending:
+                    continue
+                
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    start = pending.pop(fut)
+                    rows = fut.result()
+                    expected = min(start + self.batch_size, max_rows) - start
+                    page_end = None
+                    if len(rows) < expected:
+                        page_end = start + len(rows)
+                        end_offset = page_end if end_offset is None else min(end_offset, page_end)
+                    if ckpt:
+                        ckpt.save_page(start, rows, end_offset=page_end)
+                    buffered[start] = rows
+        finally:
+            for fut in pending:
+                fut.cancel()
+            executor.shutdown(wait=True)
+    
+    def fetch_all(self, max_rows: int) -> List[dict]:
+        """拉取所有页并拼接为行列表"""
+        rows: List[dict] = []
+        for _, page in self.iter_pages(max_rows):
+            rows.extend(page)
+        return rows
+
+
+class KeysetFetcher:
+    """按排序键游标分页（keyset pagination），每页只扫描游标之后的索引范围"""
+    
+    def __init__(
+        self,
+        fetch_after: FetchAfterFn,
+        key_columns: Sequence[str],
+        batch_size: int = BATCH_SIZE,
+        max_retries: int = FETCH_MAX_RETRIES,
+        backoff_base: float = FETCH_BACKOFF_BASE,
+        backoff_max: float = FETCH_BACKOFF_MAX,
+        checkpoint: Optional[FetchCheckpoint] = None
+    ):
+        """
+        Args:
+            fetch_after: 拉取游标之后 limit 行的函数
+            key_columns: 排序键列（需有对应的联合索引）
+            batch_size: 每页行数
+            max_retries: 单页最大重试次数
+            backoff_base: 指数退避初始等待秒数
+            backoff_max: 指数退避最大等待秒数
+            checkpoint: 断点清单（None 时不落盘）
+        """
+        self.fetch_after = fetch_after
+        self.key_columns = list(key_columns)
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.checkpoint = checkpoint
+    
+    def _cursor_of(self, row: dict) -> tuple:
+        return tuple(row[col] for col in self.key_columns)
+    
+    def iter_pages(self, max_rows: int) -> Iterator[Tuple[int, List[dict]]]:
+        """
+        顺序拉取至多 max_rows 行（每页依赖上一页的游标，因此不并发）
+        
+        Args:
+            max_rows: 最大行数
+        
+        Yields:
+            (start, rows)，start 为该页首行的序号
+        """
+        ckpt = self.checkpoint
+        start = 0
+        cursor = None
+        
+        # 先重放断点中已完成的页，游标取最后一页的末行
+        while ckpt and start < max_rows and ckpt.is_done(start):
+            limit = min(self.batch_size, max_rows - start)
+            rows = ckpt.load_page(start)
+            if rows:
+                yield start, rows
+                cursor = self._cursor_of(rows[-1])
+            start += len(rows)
+            if len(rows) < limit:
+                return
+        
+        while start < max_rows:
+            limit = min(self.batch_size, max_rows - start)
+            rows = retry_with_backoff(
+                lambda: self.fetch_after(cursor, limit) or [],
+                max_retries=self.max_retries,
+                backoff_base=self.backoff_base,
+                backoff_max=self.backoff_max,
+                desc=f"获取游标 {cursor} 之后 {limit} 行"
+            )
+            if ckpt:
+                ckpt.save_page(
+                    start, rows, end_offset=start + len(rows) if len(rows) < limit else None
+                )
+            if rows:
+                yield start, rows
+            if len(rows) < limit:
+                return
+            cursor = self._cursor_of(rows[-1])
+            start += len(rows)
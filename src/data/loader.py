@@ -2,38 +2,347 @@
 数据加载器 - 从 Supabase 加载数据
 """
 import pandas as pd
-import time
-from supabase import create_client, Client
-from typing import Optional
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Sequence, Tuple
 import os
 
 from ..config import (
-    SUPABASE_URL, SUPABASE_KEY, TABLE_MODEL_DATA,
-    BATCH_SIZE, MAX_ROWS, RAW_DATA_FILE
+    SUPABASE_URL, SUPABASE_KEY, TABLE_MODEL_VIEW,
+    BATCH_SIZE, MAX_ROWS, CACHE_DIR, FETCH_MAX_WORKERS,
+    LEAKAGE_COLUMNS, TRAIN_YEARS, KEYSET_COLUMNS, STORE_DIR, SYNC_MAX_ROWS
 )
+from ..utils.instrument import instrumented, record_transfer
+from .cache import ColumnarCache, read_frame, write_frame
+from .fetcher import FetchCheckpoint, KeysetFetcher, RangeFetcher, retry_with_backoff
+from .schema import optimize_dtypes
+from .store import PeriodStore, next_period
+
+if TYPE_CHECKING:
+    from supabase import Client
 
 
 class SupabaseLoader:
     """Supabase 数据加载器"""
     
-    def __init__(self, url: str = SUPABASE_URL, key: str = SUPABASE_KEY):
+    def __init__(
+        self,
+        url: str = SUPABASE_URL,
+        key: str = SUPABASE_KEY,
+        client: Optional["Client"] = None
+    ):
         """
         初始化 Supabase 客户端
         
         Args:
             url: Supabase 项目 URL
             key: Supabase API 密钥
+            client: 已创建的客户端（可传入本地替身用于测试）
         """
         self.url = url
         self.key = key
-        self.client: Client = create_client(url, key)
+        if client is None:
+            # supabase 及其 HTTP 依赖只在需要连接时导入（从缓存 / 本地分区读取时不需要）
+            from supabase import create_client
+            client = create_client(url, key)
+        self.client: "Client" = client
+        self._table_columns: Dict[str, List[str]] = {}
+        # 最近一次 load_data(downcast=True) 的类型转换报告
+        self.dtype_report: Dict = {}
+    
+    def get_columns(self, table_name: str = TABLE_MODEL_VIEW) -> List[str]:
+        """
+        获取表的列名（读取一行探测，结果按表名缓存）
+        
+        Args:
+            table_name: 表名
+        
+        Returns:
+            列名列表
+        """
+        if table_name not in self._table_columns:
+            res = retry_with_backoff(
+                lambda: self.client.table(table_name).select("*").limit(1).execute(),
+                desc=f"探测表结构 {table_name}"
+            )
+            if not res.data:
+                raise ValueError(f"表 {table_name} 为空，无法确定列名")
+            self._table_columns[table_name] = list(res.data[0].keys())
+        return self._table_columns[table_name]
+    
+    def resolve_columns(
+        self,
+        table_name: str = TABLE_MODEL_VIEW,
+        columns: Optional[List[str]] = None,
+        exclude_columns: Optional[List[str]] = None,
+        drop_leakage: bool = False
+    ) -> Optional[List[str]]:
+        """
+        计算下推到服务端的投影列
+        
+        Args:
+            table_name: 表名
+            columns: 需要的列（None 为全部列）
+            exclude_columns: 需要排除的列（如上次特征选择删除的高缺失列）
+            drop_leakage: 是否排除 config.LEAKAGE_COLUMNS
+        
+        Returns:
+            列名列表，None 表示 select("*")
+        """
+        exclude = set(exclude_columns or [])
+        if drop_leakage:
+            exclude.update(LEAKAGE_COLUMNS)
+        if columns is None and not exclude:
+            return None
+        if columns is None:
+            columns = self.get_columns(table_name)
+        return [col for col in columns if col not in exclude]
+    
+    @staticmethod
+    def build_filters(
+        years: Optional[Tuple[int, int]] = None,
+        periods: Optional[Tuple[str, str]] = None,
+        states: Optional[Sequence[str]] = None
+    ) -> Dict:
+        """
+        整理下推到服务端的查询条件
+        
+        Args:
+            years: period_year 闭区间 (起始年, 结束年)
+            periods: period 闭区间 ('YYYYMM', 'YYYYMM')
+            states: property_state 取值列表
+        
+        Returns:
+            查询条件字典（同时用于缓存指纹和断点签名）
+        """
+        filters = {}
+        if years is not None:
+            filters["years"] = [int(years[0]), int(years[1])]
+        if periods is not None:
+            filters["periods"] = [str(periods[0]), str(periods[1])]
+        if states:
+            filters["states"] = sorted(str(s) for s in states)
+        return filters
+    
+    def _build_query(
+        self,
+        table_name: str,
+        columns: Optional[List[str]] = None,
+        filters: Optional[Dict] = None
+    ):
+        """构建带投影和过滤条件的查询"""
+        select = ",".join(columns) if columns else "*"
+        query = self.client.table(table_name).select(select)
+        filters = filters or {}
+        # period_year 为 SMALLINT 生成列，按整数比较
+        if "years" in filters:
+            lo, hi = filters["years"]
+            query = query.gte("period_year", int(lo)).lte("period_year", int(hi))
+        # period 为定长 TEXT（YYYYMM），按字符串比较即可得到正确区间
+        if "periods" in filters:
+            lo, hi = filters["periods"]
+            query = query.gte("period", lo).lte("period", hi)
+        if "states" in filters:
+            query = query.in_("property_state", filters["states"])
+        return query
+    
+    def _fetch_range(
+        self,
+        table_name: str,
+        start: int,
+        end: int,
+        key_columns: Sequence[str],
+        columns: Optional[List[str]] = None,
+        filters: Optional[Dict] = None
+    ) -> List[dict]:
+        """
+        按排序键获取闭区间 [start, end] 的行
+        
+        没有 ORDER BY 时 Postgres 不保证各次请求的行顺序一致，并发或断点续传的 range 分页
+        会静默重复 / 遗漏行，因此每页都按唯一排序键（默认 period, loan_identifier）排序。
+        """
+        query = self._build_query(table_name, columns, filters)
+        for col in key_columns:
+            query = query.order(col)
+        res = query.range(start, end).execute()
+        return res.data or []
+    
+    @staticmethod
+    def _keyset_condition(key_columns: Sequence[str], cursor: tuple) -> str:
+        """
+        构造 (k1, k2, ...) > cursor 的 PostgREST or 条件，例如
+        period.gt."201301",and(period.eq."201301",loan_identifier.gt."F13Q1")
+        """
+        def quote(value) -> str:
+            return '"' + str(value).replace('"', '\\"') + '"'
+        
+        parts = []
+        for i, col in enumerate(key_columns):
+            eqs = [f"{key_columns[j]}.eq.{quote(cursor[j])}" for j in range(i)]
+            cond = f"{col}.gt.{quote(cursor[i])}"
+            parts.append(f"and({','.join(eqs + [cond])})" if eqs else cond)
+        return ",".join(parts)
+    
+    def _fetch_after(
+        self,
+        table_name: str,
+        cursor: Optional[tuple],
+        limit: int,
+        key_columns: Sequence[str],
+        columns: Optional[List[str]] = None,
+        filters: Optional[Dict] = None
+    ) -> List[dict]:
+        """按排序键获取游标之后的 limit 行"""
+        query = self._build_query(table_name, columns, filters)
+        if cursor is not None:
+            query = query.or_(self._keyset_condition(key_columns, cursor))
+        for col in key_columns:
+            query = query.order(col)
+        res = query.limit(limit).execute()
+        return res.data or []
+    
+    def iter_batches(
+        self,
+        table_name: str = TABLE_MODEL_VIEW,
+        max_rows: int = MAX_ROWS,
+        batch_size: int = BATCH_SIZE,
+        max_workers: int = FETCH_MAX_WORKERS,
+        checkpoint_dir: Optional[str] = None,
+        cache_dir: Optional[str] = None,
+        columns: Optional[List[str]] = None,
+        exclude_columns: Optional[List[str]] = None,
+        drop_leakage: bool = False,
+        years: Optional[Tuple[int, int]] = None,
+        periods: Optional[Tuple[str, str]] = None,
+        states: Optional[Sequence[str]] = None,
+        pagination: str = "offset",
+        key_columns: Sequence[str] = KEYSET_COLUMNS
+    ) -> Iterator[pd.DataFrame]:
+        """
+        逐页流式加载数据，每页立即转换为 DataFrame 数据块
+        
+        Args:
+            table_name: 表名
+            max_rows: 最大行数
+            batch_size: 批次大小
+            max_workers: 同时在途的分页请求数（1 为顺序下载）
+            checkpoint_dir: 断点目录（中断后再次调用从已完成的页继续）
+            cache_dir: 列式缓存目录（命中则分块读缓存，否则边下载边追加写入）
+            columns: 投影列（下推到服务端，None 为全部列）
+            exclude_columns: 下载前排除的列
+            drop_leakage: 下载前排除 config.LEAKAGE_COLUMNS
+            years: period_year 闭区间过滤（下推到服务端）
+            periods: period 闭区间过滤（下推到服务端）
+            states: property_state 过滤（下推到服务端）
+            pagination: 'offset'（range 分页，可并发）或 'keyset'（按排序键游标分页，
+                深度扫描时每页耗时不随偏移增长，但只能顺序请求；排序键为 NULL 的行会被跳过）
+            key_columns: 排序键（两种分页都按其排序，需唯一以保证分页边界稳定）
+        
+        Yields:
+            DataFrame 数据块
+        """
+        if pagination not in ("offset", "keyset"):
+            raise ValueError(f"不支持的分页方式: {pagination}")
+        columns = self.resolve_columns(table_name, columns, exclude_columns, drop_leakage)
+        filters = self.build_filters(years, periods, states)
+        # 排序键计入缓存指纹和断点签名（页内容取决于排序）
+        filters["order_by"] = list(key_columns)
+        # keyset 分页需要读到排序键以推进游标，未投影的键列在产出前删除
+        extra_keys: List[str] = []
+        if pagination == "keyset":
+            if columns is not None:
+                extra_keys = [col for col in key_columns if col not in columns]
+        fetch_columns = columns + extra_keys if columns is not None else None
+        
+        cache, cache_key = None, None
+        if cache_dir:
+            cache = ColumnarCache(cache_dir)
+            cache_key = cache.key(table_name, (0, max_rows), columns, filters)
+            if cache.exists(cache_key):
+                print(f"从缓存分块加载数据: {cache.path(cache_key)}")
+                yield from cache.iter_chunks(cache_key, batch_size)
+                return
+        
+        print(f"从 Supabase 下载数据: {table_name}")
+        checkpoint = None
+        if checkpoint_dir:
+            checkpoint = FetchCheckpoint(
+                checkpoint_dir,
+                signature={
+                    "table": table_name,
+                    "batch_size": batch_size,
+                    "select": columns or "*",
+                    "filters": filters,
+                }
+            )
+        if pagination == "keyset":
+            fetcher = KeysetFetcher(
+                fetch_after=lambda cursor, limit: self._fetch_after(
+                    table_name, cursor, limit, key_columns, fetch_columns, filters
+                ),
+                key_columns=key_columns,
+                batch_size=batch_size,
+                checkpoint=checkpoint
+            )
+        else:
+            fetcher = RangeFetcher(
+                fetch_page=lambda start, end: self._fetch_range(
+                    table_name, start, end, key_columns, columns, filters
+                ),
+                batch_size=batch_size,
+                max_workers=max_workers,
+                checkpoint=checkpoint
+            )
+        writer = cache.writer(
+            cache_key,
+            meta={
+                "table": table_name,
+                "row_range": [0, max_rows],
+                "columns": columns or "*",
+                "filters": filters,
+            }
+        ) if cache is not None else None
+        
+        try:
+            for start, page in fetcher.iter_pages(max_rows):
+                # 在消费页的线程中计入传输量（并发下载的 worker 线程没有阶段栈）
+                record_transfer(page)
+                chunk = pd.DataFrame(page)
+                if extra_keys:
+                    chunk = chunk.drop(columns=extra_keys)
+                if writer is not None:
+                    writer.write(chunk)
+                done = start + len(page)
+                print(f"进度: {done}/{max_rows} ({(done/max_rows)*100:.1f}%)")
+                yield chunk
+        except BaseException:
+            if writer is not None:
+                writer.abort()
+            raise
+        print("数据读取完成")
+        
+        if writer is not None and writer.rows > 0:
+            print(f"数据已缓存: {writer.close()}")
+        if checkpoint:
+            checkpoint.clear()
     
+    @instrumented("load_data")
     def load_data(
         self,
-        table_name: str = TABLE_MODEL_DATA,
+        table_name: str = TABLE_MODEL_VIEW,
         max_rows: int = MAX_ROWS,
         batch_size: int = BATCH_SIZE,
-        cache_file: Optional[str] = None
+        cache_file: Optional[str] = None,
+        max_workers: int = FETCH_MAX_WORKERS,
+        checkpoint_dir: Optional[str] = None,
+        cache_dir: Optional[str] = None,
+        columns: Optional[List[str]] = None,
+        exclude_columns: Optional[List[str]] = None,
+        drop_leakage: bool = False,
+        years: Optional[Tuple[int, int]] = None,
+        periods: Optional[Tuple[str, str]] = None,
+        states: Optional[Sequence[str]] = None,
+        pagination: str = "offset",
+        key_columns: Sequence[str] = KEYSET_COLUMNS,
+        downcast: bool = False
     ) -> pd.DataFrame:
         """
         从 Supabase 加载数据
@@ -42,7 +351,20 @@ class SupabaseLoader:
             table_name: 表名
             max_rows: 最大行数
             batch_size: 批次大小
-            cache_file: 缓存文件路径（如果存在则从缓存加载）
+            cache_file: 缓存文件路径（如果存在则从缓存加载，格式由扩展名决定）
+            max_workers: 同时在途的分页请求数（1 为顺序下载）
+            checkpoint_dir: 断点目录（中断后再次调用从已完成的页继续）
+            cache_dir: 列式缓存目录（按表名、行范围等查询指纹命中缓存）
+            columns: 投影列（下推到服务端，None 为全部列）
+            exclude_columns: 下载前排除的列
+            drop_leakage: 下载前排除 config.LEAKAGE_COLUMNS
+            years: period_year 闭区间过滤（下推到服务端）
+            periods: period 闭区间过滤（下推到服务端）
+            states: property_state 过滤（下推到服务端）
+            pagination: 'offset'（range 分页，默认）或 'keyset'（游标分页，适合深度扫描）
+            key_columns: 排序键（两种分页都按其排序）
+            downcast: 是否按 schema 字段表转换类型（数值列 float32 / 窄整数，低基数字符串列 category），
+                转换报告保存在 self.dtype_report；缓存中保存的是未转换的数据
         
         Returns:
             DataFrame
@@ -50,57 +372,189 @@ class SupabaseLoader:
         # 检查缓存
         if cache_file and os.path.exists(cache_file):
             print(f"从缓存加载数据: {cache_file}")
-            return pd.read_csv(cache_file, low_memory=False)
+            return self._finish(read_frame(cache_file), downcast)
         
-        # 从 API 下载
-        print(f"从 Supabase 下载数据: {table_name}")
-        rows = []
-        offset = 0
-        
-        while offset < max_rows:
-            print(f"获取行 {offset} - {offset + batch_size - 1} ...")
-            try:
-                res = self.client.table(table_name).select("*").range(
-                    offset, offset + batch_size - 1
-                ).execute()
-                
-                if not res.data:
-                    print("数据读取完成")
-                    break
-                
-                rows.extend(res.data)
-                offset += batch_size
-                print(f"进度: {offset}/{max_rows} ({(offset/max_rows)*100:.1f}%)")
-                
-            except Exception as e:
-                print(f"请求失败: {e}，5秒后重试...")
-                time.sleep(5)
-                continue
-        
-        df = pd.DataFrame(rows)
+        columns = self.resolve_columns(table_name, columns, exclude_columns, drop_leakage)
+        filters = self.build_filters(years, periods, states)
+        filters["order_by"] = list(key_columns)
+        if cache_dir:
+            cache = ColumnarCache(cache_dir)
+            cache_key = cache.key(table_name, (0, max_rows), columns, filters)
+            if cache.exists(cache_key):
+                print(f"从缓存加载数据: {cache.path(cache_key)}")
+                return self._finish(cache.read(cache_key), downcast)
+        
+        # 从 API 下载（逐页转为数据块，不保留原始行字典）
+        chunks = list(self.iter_batches(
+            table_name=table_name,
+            max_rows=max_rows,
+            batch_size=batch_size,
+            max_workers=max_workers,
+            checkpoint_dir=checkpoint_dir,
+            cache_dir=cache_dir,
+            columns=columns,
+            years=years,
+            periods=periods,
+            states=states,
+            pagination=pagination,
+            key_columns=key_columns
+        ))
+        df = pd.concat(chunks, ignore_index=True).infer_objects() if chunks else pd.DataFrame()
+        del chunks
         
         # 保存缓存
         if cache_file:
-            df.to_csv(cache_file, index=False)
+            write_frame(df, cache_file)
             print(f"数据已缓存: {cache_file}")
         
         print(f"加载完成: {df.shape[0]} 行, {df.shape[1]} 列")
+        return self._finish(df, downcast)
+    
+    def _finish(self, df: pd.DataFrame, downcast: bool) -> pd.DataFrame:
+        """按需转换列类型"""
+        if not downcast:
+            return df
+        df, self.dtype_report = optimize_dtypes(df)
         return df
     
-    def load_training_data(self, use_cache: bool = True) -> pd.DataFrame:
+    def load_training_data(self, use_cache: bool = True, downcast: bool = True) -> pd.DataFrame:
         """
         加载训练数据（便捷方法）
         
         Args:
             use_cache: 是否使用缓存
+            downcast: 是否按 schema 字段表转换类型
         
         Returns:
             DataFrame
         """
-        cache_file = RAW_DATA_FILE if use_cache else None
+        cache_dir = CACHE_DIR if use_cache else None
         return self.load_data(
-            table_name=TABLE_MODEL_DATA,
+            table_name=TABLE_MODEL_VIEW,
             max_rows=MAX_ROWS,
-            cache_file=cache_file
+            cache_dir=cache_dir,
+            downcast=downcast
         )
-
+    
+    def load_window(
+        self,
+        years: Tuple[int, int] = TRAIN_YEARS,
+        max_rows: int = MAX_ROWS,
+        exclude_columns: Optional[List[str]] = None,
+        use_cache: bool = True,
+        downcast: bool = True,
+        store_dir: Optional[str] = None
+    ) -> pd.DataFrame:
+        """
+        加载某个年份窗口的建模数据（训练窗口或回测窗口），
+        年份过滤和泄露列剔除都在服务端完成；指定 store_dir 时改为从本地分区数据集
+        （见 sync）读取，只打开窗口内的分区和需要的列
+        
+        Args:
+            years: period_year 闭区间，如 config.TRAIN_YEARS / config.BACKTEST_YEARS
+            max_rows: 最大行数
+            exclude_columns: 额外排除的列（如高缺失列）
+            use_cache: 是否使用缓存
+            downcast: 是否按 schema 字段表转换类型
+            store_dir: 本地分区数据集根目录（None 时从 Supabase 加载；从本地读取时不受 max_rows 限制）
+        
+        Returns:
+            DataFrame
+        """
+        if store_dir:
+            store = PeriodStore(store_dir)
+            exclude = set(exclude_columns or []) | set(LEAKAGE_COLUMNS)
+            columns = [c for c in store.columns(TABLE_MODEL_VIEW) if c not in exclude]
+            df = store.read(TABLE_MODEL_VIEW, years=years, columns=columns)
+            print(f"从本地数据集加载 {years}: {df.shape[0]} 行, {df.shape[1]} 列")
+            return self._finish(df, downcast)
+        return self.load_data(
+            table_name=TABLE_MODEL_VIEW,
+            max_rows=max_rows,
+            cache_dir=CACHE_DIR if use_cache else None,
+            exclude_columns=exclude_columns,
+            drop_leakage=True,
+            years=years,
+            downcast=downcast
+        )
+    
+    def sync(
+        self,
+        table_name: str = TABLE_MODEL_VIEW,
+        store_dir: str = STORE_DIR,
+        batch_size: int = BATCH_SIZE,
+        max_rows: int = SYNC_MAX_ROWS,
+        columns: Optional[List[str]] = None,
+        exclude_columns: Optional[List[str]] = None,
+        drop_leakage: bool = False,
+        start_period: Optional[str] = None,
+        checkpoint_dir: Optional[str] = None
+    ) -> Dict[str, int]:
+        """
+        增量同步到本地分区数据集：只下载高水位之后的 period，按 period 追加写入
+        
+        按 (period, loan_identifier) 键集分页顺序读取，某个 period 的行读完（出现下一个 period
+        或读到末尾）后该分区才登记到清单并推进高水位；中断后再次调用会从未完成的 period 重新下载。
+        
+        Args:
+            table_name: 表名
+            store_dir: 本地数据集根目录
+            batch_size: 批次大小
+            max_rows: 本次同步的最大行数（达到上限时最后一个 period 可能不完整，不登记）
+            columns: 投影列（会自动包含 period）
+            exclude_columns: 下载前排除的列
+            drop_leakage: 下载前排除 config.LEAKAGE_COLUMNS
+            start_period: 本地没有数据时的起始 period（None 为从头开始）
+            checkpoint_dir: 断点目录
+        
+        Returns:
+            {period: 新增行数}
+        """
+        store = PeriodStore(store_dir)
+        hwm = store.high_water_mark(table_name)
+        lo = next_period(hwm) if hwm else start_period
+        print(f"增量同步 {table_name}: 本地高水位 {hwm or '无'}，下载 period >= {lo or '最早'}")
+        
+        columns = self.resolve_columns(table_name, columns, exclude_columns, drop_leakage)
+        if columns is not None and "period" not in columns:
+            columns = ["period"] + columns
+        
+        written: Dict[str, int] = {}
+        writer, current, total = None, None, 0
+        try:
+            for chunk in self.iter_batches(
+                table_name=table_name,
+                max_rows=max_rows,
+                batch_size=batch_size,
+                checkpoint_dir=checkpoint_dir,
+                columns=columns,
+                periods=(lo, "999912") if lo else None,
+                pagination="keyset",
+                key_columns=KEYSET_COLUMNS
+            ):
+                total += len(chunk)
+                # 键集分页按 period 升序返回，一个数据块最多跨越相邻的几个 period
+                for period, part in chunk.groupby(chunk["period"].astype(str), sort=True):
+                    if period != current:
+                        if writer is not None:
+                            writer.close()
+                            written[current] = writer.rows
+                        writer, current = store.writer(table_name, period), period
+                    writer.write(part)
+            if writer is not None:
+                if total >= max_rows:
+                    # 达到行数上限，最后一个 period 可能没读完
+                    writer.abort()
+                    print(f"达到 max_rows={max_rows}，period {current} 未登记，下次同步重新下载")
+                else:
+                    writer.close()
+                    written[current] = writer.rows
+                writer = None
+        except BaseException:
+            if writer is not None:
+                writer.abort()
+            raise
+        
+        print(f"增量同步完成: 新增 {len(written)} 个 period，{sum(written.values())} 行，"
+              f"高水位 {store.high_water_mark(table_name) or '无'}")
+        return written
@@ -3,22 +3,29 @@
 """
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import LabelEncoder
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional
 
-from ..config import TARGET_COLUMN
+from ..config import TARGET_COLUMN, PROFILE_MAX_DISTINCT
+from ..utils.encoders import CategoryEncoder
+from ..utils.instrument import instrumented
+from ..utils.profile import ColumnProfile
+from .cache import write_frame
 
 
 class DataPreprocessor:
     """数据预处理器"""
     
     def __init__(self):
-        self.label_encoders: Dict[str, LabelEncoder] = {}
+        self.label_encoders: Dict[str, CategoryEncoder] = {}
+        self.mode_codes: Dict[str, int] = {}
+        self.constant_columns: List[str] = []
+        self.profile: Optional[ColumnProfile] = None
     
     def remove_constant_columns(
         self, 
         df: pd.DataFrame, 
-        exclude_cols: Optional[List[str]] = None
+        exclude_cols: Optional[List[str]] = None,
+        profile: Optional[ColumnProfile] = None
     ) -> pd.DataFrame:
         """
         删除常量列
@@ -26,16 +33,21 @@ class DataPreprocessor:
         Args:
             df: DataFrame
             exclude_cols: 排除的列名列表
+            profile: 列统计画像（None 时扫描 df 构建）
         
         Returns:
             处理后的 DataFrame
         """
         exclude_cols = exclude_cols or ["first_payment_date"]
+        if profile is None or any(col not in profile.stats for col in df.columns):
+            profile = ColumnProfile.from_frame(df)
+        nunique = profile.nunique(df.columns.tolist())
         constant_cols = [
             col for col in df.columns 
-            if df[col].nunique() <= 1 and col not in exclude_cols
+            if nunique[col] <= 1 and col not in exclude_cols
         ]
         
+        self.constant_columns = constant_cols
         if constant_cols:
             print(f"删除常量列: {constant_cols}")
             df = df.drop(columns=constant_cols)
@@ -60,9 +72,10 @@ class DataPreprocessor:
             编码后的 DataFrame
         """
         exclude_cols = exclude_cols or [TARGET_COLUMN, "first_payment_date"]
-        df = df.copy()
+        # 浅拷贝：下面整列赋值会替换列，不会修改调用方的 DataFrame
+        df = df.copy(deep=False)
         
-        obj_cols = df.select_dtypes(include=['object']).columns
+        obj_cols = df.select_dtypes(include=['object', 'category']).columns
         
         for col in obj_cols:
             if col in exclude_cols:
@@ -70,28 +83,83 @@ class DataPreprocessor:
             
             if fit:
                 # 训练新的编码器
-                le = LabelEncoder()
-                df[col] = le.fit_transform(df[col].astype(str))
-                self.label_encoders[col] = le
-            else:
-                # 使用已有编码器
-                if col in self.label_encoders:
-                    le = self.label_encoders[col]
-                    # 处理未见过的类别
-                    mode_label = int(pd.Series(df[col]).mode().iloc[0])
-                    classes = set(le.classes_)
-                    
-                    def safe_transform(val):
-                        val_str = str(val)
-                        return int(le.transform([val_str])[0]) if val_str in classes else mode_label
-                    
-                    df[col] = df[col].astype(str).map(safe_transform).astype(int)
+                enc = CategoryEncoder()
+                df[col] = enc.fit_transform(df[col])
+                self.label_encoders[col] = enc
+                self.mode_codes[col] = enc.mode_code
+            elif col in self.label_encoders:
+                # 使用已有编码器，未见过的类别映射为训练集众数编码
+                df[col] = self.label_encoders[col].transform(
+                    df[col], unknown_code=self.mode_codes.get(col)
+                )
         
         if fit:
             print(f"编码了 {len(self.label_encoders)} 个类别特征")
         
         return df
     
+    def fit_chunks(
+        self,
+        chunks: Iterable[pd.DataFrame],
+        exclude_cols: Optional[List[str]] = None,
+        max_distinct: Optional[int] = PROFILE_MAX_DISTINCT
+    ) -> "DataPreprocessor":
+        """
+        逐块扫描数据构建 ColumnProfile，据此识别常量列并训练编码器，无需整表载入内存
+        
+        各块列类型一致时，结果与整表调用 preprocess(fit=True) 相同。
+        
+        Args:
+            chunks: DataFrame 数据块迭代器
+            exclude_cols: 编码时排除的列名列表
+            max_distinct: 见 ColumnProfile（只影响数值列，类别列始终保留完整频数）
+        
+        Returns:
+            self
+        """
+        exclude_cols = exclude_cols or [TARGET_COLUMN, "first_payment_date"]
+        profile = ColumnProfile.from_chunks(chunks, max_distinct=max_distinct)
+        self.profile = profile
+        
+        nunique = profile.nunique()
+        self.constant_columns = [
+            col for col in profile.columns
+            if nunique[col] <= 1 and col != "first_payment_date"
+        ]
+        if self.constant_columns:
+            print(f"删除常量列: {self.constant_columns}")
+        
+        category_counts = {
+            col: profile.category_counts(col)
+            for col in profile.object_columns() if col not in exclude_cols
+        }
+        
+        self.label_encoders = {}
+        self.mode_codes = {}
+        for col, counts in category_counts.items():
+            if col in self.constant_columns:
+                continue
+            enc = CategoryEncoder.from_value_counts(counts)
+            self.label_encoders[col] = enc
+            self.mode_codes[col] = enc.mode_code
+        print(f"编码了 {len(self.label_encoders)} 个类别特征")
+        
+        return self
+    
+    def transform_chunks(self, chunks: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        """
+        按 fit_chunks 的结果逐块预处理
+        
+        Args:
+            chunks: DataFrame 数据块迭代器
+        
+        Yields:
+            预处理后的数据块
+        """
+        for chunk in chunks:
+            chunk = chunk.drop(columns=[c for c in self.constant_columns if c in chunk.columns])
+            yield self.encode_categorical_features(chunk, fit=False)
+    
     def extract_time_features(self, df: pd.DataFrame, period_col: str = 'period') -> pd.DataFrame:
         """
         从 period 字段提取时间特征
@@ -103,7 +171,8 @@ class DataPreprocessor:
         Returns:
             添加了时间特征的 DataFrame
         """
-        df = df.copy()
+        # 只新增 / 替换整列，浅拷贝即可
+        df = df.copy(deep=False)
         df[period_col] = df[period_col].astype(str)
         df['period_year'] = df[period_col].str[:4].astype(int)
         df['period_month'] = df[period_col].str[4:6].astype(int)
@@ -111,11 +180,13 @@ class DataPreprocessor:
         print(f"提取时间特征: period_year, period_month")
         return df
     
+    @instrumented("preprocess", data="df")
     def preprocess(
         self, 
         df: pd.DataFrame,
         fit: bool = True,
-        save_path: Optional[str] = None
+        save_path: Optional[str] = None,
+        profile: Optional[ColumnProfile] = None
     ) -> pd.DataFrame:
         """
         完整的预处理流程
@@ -123,7 +194,8 @@ class DataPreprocessor:
         Args:
             df: 原始 DataFrame
             fit: 是否训练编码器
-            save_path: 保存路径
+            save_path: 保存路径（.parquet / .feather 为列式，其他为 CSV）
+            profile: df 的列统计画像（None 时扫描 df 构建）
         
         Returns:
             预处理后的 DataFrame
@@ -131,14 +203,14 @@ class DataPreprocessor:
         print("开始数据预处理...")
         
         # 1. 删除常量列
-        df = self.remove_constant_columns(df)
+        df = self.remove_constant_columns(df, profile=profile)
         
         # 2. Label Encoding
         df = self.encode_categorical_features(df, fit=fit)
         
         # 3. 保存
         if save_path:
-            df.to_csv(save_path, index=False)
+            write_frame(df, save_path)
             print(f"预处理数据已保存: {save_path}")
         
         print(f"预处理完成: {df.shape}")
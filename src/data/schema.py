@@ -0,0 +1,151 @@
+"""
+CRT 字段类型 - 按字段表把 Supabase 返回的 TEXT 列转为紧凑的数值 / category 类型
+"""
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional, Sequence, Tuple
+
+# 整数字段：全部可解析为整数且无缺失时取能容纳的最窄整数类型（int8/int16/int32），否则 float32
+INTEGER_COLUMNS = [
+    "period_year", "period_month",
+    "credit_score", "updated_credit_score_at_issuance",
+    "updated_credit_score_1_quarterly", "updated_credit_score_2_quarterly",
+    "updated_credit_score_3_quarterly",
+    "original_loan_to_value_ltv", "original_combined_loan_to_value_cltv",
+    "original_debt_to_income_dti_ratio", "modification_debt_to_income_ratio",
+    "original_loan_term", "loan_age", "remaining_months_to_legal_maturity",
+    "adjusted_remaining_months_to_maturity_rmm",
+    "number_of_units", "number_of_borrowers", "number_of_modifications",
+    "estimated_loan_to_value_ltv_quarterly",
+    "delinquency_30d_label", "high_dti_flag", "recent_delinquency_flag",
+    "seasonality_flag", "modification_history_flag",
+]
+
+# 连续数值字段：float32
+FLOAT_COLUMNS = [
+    "original_interest_rate", "current_interest_rate",
+    "first_step_rate", "second_step_rate", "third_step_rate",
+    "fourth_step_rate", "fifth_step_rate",
+    "original_upb", "upb_at_issuance", "current_actual_upb",
+    "current_interest_bearing_upb", "upb_at_time_of_removal_from_the_reference_pool",
+    "total_capitalized_amount", "delinquent_accrued_interest",
+    "mortgage_insurance_percentage_mi_percent", "forecast_standard_deviation_fsd",
+    "net_sales_proceeds", "mi_credit", "taxes_and_insurance", "legal_costs",
+    "maintenance_and_preservation_costs", "bankruptcy_cramdown_costs",
+    "miscellaneous_expenses", "miscellaneous_credits", "modification_costs",
+    "loan_age_years", "interest_rate_diff", "state_default_rate", "msa_default_rate",
+]
+
+# 低基数字符串字段：category
+CATEGORY_COLUMNS = [
+    "property_state", "seller_name", "servicer_name", "channel", "msa",
+    "amortization_type", "loan_purpose", "property_type", "occupancy_status",
+    "first_time_homebuyer_indicator", "prepayment_penalty_indicator",
+    "special_eligibility_program", "mortgage_insurance_type",
+    "property_valuation_method", "modification_flag", "bankruptcy_flag",
+    "interest_rate_step_indicator", "borrower_assistance_plan",
+    "payment_deferral_flag", "distressed_principal_balance_flag",
+    "delinquency_due_to_disaster", "current_loan_delinquency_status",
+    "loan_to_value_ratio_bucket", "credit_score_bucket",
+    "loan_size_bucket", "interest_rate_bucket",
+]
+
+MAX_CATEGORIES = 2000
+
+
+def _narrowest_int(values: pd.Series) -> Optional[str]:
+    """非空且全为整数时返回能容纳的最窄整数类型，否则返回 None"""
+    if values.isna().any():
+        return None
+    arr = values.to_numpy(dtype=np.float64)
+    if len(arr) and not np.array_equal(arr, np.round(arr)):
+        return None
+    lo, hi = (arr.min(), arr.max()) if len(arr) else (0, 0)
+    for dtype in ("int8", "int16", "int32"):
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return dtype
+    return "int64"
+
+
+def _parse_numeric(series: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    """解析为数值，返回 (数值, 解析失败的原值)；空字符串视为缺失，不算失败"""
+    if pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype):
+        return series, series.iloc[:0]
+    values = pd.to_numeric(series, errors="coerce")
+    candidates = series[values.isna() & series.notna()]
+    failed = candidates[candidates.astype(str).str.strip() != ""]
+    return values, failed
+
+
+def optimize_dtypes(
+    df: pd.DataFrame,
+    integer_columns: Sequence[str] = INTEGER_COLUMNS,
+    float_columns: Sequence[str] = FLOAT_COLUMNS,
+    category_columns: Sequence[str] = CATEGORY_COLUMNS,
+    max_categories: int = MAX_CATEGORIES,
+    verbose: bool = True
+) -> Tuple[pd.DataFrame, Dict]:
+    """
+    按字段表转换列类型（只处理 df 中存在的列，其余列保持不变）
+    
+    - 整数字段：无缺失且全为整数时转为最窄整数类型，否则 float32
+    - 连续数值字段：float32
+    - 类别字段：不同取值不超过 max_categories 时转为 category
+    
+    无法解析为数值的非空取值会变成 NaN，并在报告中列出。
+    
+    Args:
+        df: DataFrame
+        integer_columns: 整数字段
+        float_columns: 连续数值字段
+        category_columns: 类别字段
+        max_categories: 转为 category 的最大不同取值数
+        verbose: 是否打印转换结果
+    
+    Returns:
+        (转换后的 DataFrame, 报告)。报告包含 converted {列: 类型}、
+        failed {列: {"count": 失败个数, "examples": 示例取值}}、
+        memory_before / memory_after（字节）
+    """
+    memory_before = int(df.memory_usage(deep=True).sum())
+    converted: Dict[str, str] = {}
+    failed: Dict[str, Dict] = {}
+    new_columns: Dict[str, pd.Series] = {}
+    
+    numeric_targets = [(c, True) for c in integer_columns] + [(c, False) for c in float_columns]
+    for col, prefer_int in numeric_targets:
+        if col not in df.columns:
+            continue
+        values, bad = _parse_numeric(df[col])
+        if len(bad):
+            failed[col] = {"count": int(len(bad)), "examples": bad.astype(str).unique()[:3].tolist()}
+        dtype = _narrowest_int(values) if prefer_int else None
+        dtype = dtype or "float32"
+        if df[col].dtype != dtype:
+            new_columns[col] = values.astype(dtype)
+            converted[col] = dtype
+    
+    for col in category_columns:
+        if col not in df.columns or isinstance(df[col].dtype, pd.CategoricalDtype):
+            continue
+        if df[col].nunique() <= max_categories:
+            new_columns[col] = df[col].astype("category")
+            converted[col] = "category"
+    
+    if new_columns:
+        df = df.assign(**new_columns)
+    
+    report = {
+        "converted": converted,
+        "failed": failed,
+        "memory_before": memory_before,
+        "memory_after": int(df.memory_usage(deep=True).sum()),
+    }
+    if verbose:
+        print(f"类型转换: {len(converted)} 列, 内存 {report['memory_before'] / 1e6:.1f}MB -> "
+              f"{report['memory_after'] / 1e6:.1f}MB")
+        for col, info in failed.items():
+            print(f"  {col}: {info['count']} 个取值无法解析为数值，例如 {info['examples']}")
+    return df, report
+
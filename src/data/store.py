@@ -0,0 +1,287 @@
+"""
+按 period 分区的本地数据集 - 每个 period 一个目录，清单中记录各分区文件和高水位 period
+"""
+import json
+import os
+import shutil
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from ..config import CACHE_FORMAT, STORE_DIR
+from .cache import _EXTENSIONS, ChunkWriter, frame_columns, read_frame, write_frame
+
+# 目录布局或清单格式变化时递增
+STORE_VERSION = 1
+
+
+def next_period(period: str) -> str:
+    """
+    下一个月的 period
+    
+    Args:
+        period: 'YYYYMM'
+    
+    Returns:
+        'YYYYMM'
+    """
+    year, month = int(period[:4]), int(period[4:6])
+    year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return f"{year:04d}{month:02d}"
+
+
+class PeriodStore:
+    """
+    按 period 分区的列式数据集
+    
+    目录布局：<root>/<表名>/period_year=YYYY/period_month=MM/part-NNNN.<ext>，
+    <root>/<表名>/_manifest.json 记录每个 period 的文件和行数，以及高水位 period。
+    分区文件先写临时文件再原子替换，清单在文件写完后才更新，中断时不会登记半个分区。
+    读取时按年份 / period 区间只打开命中的分区文件，并且只读取需要的列。
+    """
+    
+    MANIFEST_NAME = "_manifest.json"
+    
+    def __init__(self, root: str = STORE_DIR, fmt: str = CACHE_FORMAT):
+        """
+        Args:
+            root: 数据集根目录
+            fmt: 文件格式，'parquet' 或 'feather'
+        """
+        if fmt not in _EXTENSIONS:
+            raise ValueError(f"不支持的存储格式: {fmt}")
+        self.root = root
+        self.fmt = fmt
+    
+    def table_dir(self, table_name: str) -> str:
+        return os.path.join(self.root, table_name)
+    
+    def manifest_path(self, table_name: str) -> str:
+        return os.path.join(self.table_dir(table_name), self.MANIFEST_NAME)
+    
+    def partition_dir(self, table_name: str, period: str) -> str:
+        return os.path.join(
+            self.table_dir(table_name), f"period_year={period[:4]}", f"period_month={period[4:6]}"
+        )
+    
+    def manifest(self, table_name: str) -> Dict:
+        """
+        读取清单（表不存在时返回空清单）
+        
+        Raises:
+            ValueError: 清单版本或格式与当前设置不一致
+        """
+        path = self.manifest_path(table_name)
+        if not os.path.exists(path):
+            return {"version": STORE_VERSION, "table": table_name, "format": self.fmt,
+                    "high_water_mark": None, "columns": [], "partitions": {}}
+        with open(path, "r", encoding="utf-8") as fh:
+            manifest = json.load(fh)
+        if manifest.get("version") != STORE_VERSION:
+            raise ValueError(f"{path} 的版本为 {manifest.get('version')}，当前支持版本 {STORE_VERSION}")
+        if manifest.get("format") != self.fmt:
+            raise ValueError(f"{path} 的格式为 {manifest.get('format')}，与当前设置 {self.fmt} 不一致")
+        return manifest
+    
+    def _write_manifest(self, table_name: str, manifest: Dict) -> None:
+        path = self.manifest_path(table_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(manifest, fh, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+    
+    def _register(
+        self,
+        table_name: str,
+        period: str,
+        filename: str,
+        rows: int,
+        columns: Sequence[str]
+    ) -> None:
+        """分区文件写完后登记到清单，并推进高水位"""
+        manifest = self.manifest(table_name)
+        known = manifest.setdefault("columns", [])
+        known.extend(col for col in columns if col not in known)
+        part = manifest["partitions"].setdefault(period, {"files": [], "rows": 0})
+        part["files"].append(filename)
+        part["rows"] += int(rows)
+        hwm = manifest.get("high_water_mark")
+        manifest["high_water_mark"] = period if hwm is None or period > hwm else hwm
+        self._write_manifest(table_name, manifest)
+    
+    def _next_file(self, table_name: str, period: str) -> str:
+        n = len(self.manifest(table_name)["partitions"].get(period, {}).get("files", []))
+        return f"part-{n:04d}{_EXTENSIONS[self.fmt]}"
+    
+    def periods(self, table_name: str) -> List[str]:
+        """已存储的 period（升序）"""
+        return sorted(self.manifest(table_name)["partitions"])
+    
+    def high_water_mark(self, table_name: str) -> Optional[str]:
+        """已完整写入的最大 period（无数据时为 None）"""
+        return self.manifest(table_name).get("high_water_mark")
+    
+    def columns(self, table_name: str) -> List[str]:
+        """各分区出现过的全部列（按首次写入顺序）"""
+        return list(self.manifest(table_name).get("columns", []))
+    
+    def rows(self, table_name: str) -> int:
+        """已存储的总行数"""
+        return sum(p["rows"] for p in self.manifest(table_name)["partitions"].values())
+    
+    def writer(self, table_name: str, period: str) -> ChunkWriter:
+        """
+        打开某个 period 的增量写入器，close() 之后分区文件才登记到清单
+        
+        Args:
+            table_name: 表名
+            period: 'YYYYMM'
+        
+        Returns:
+            ChunkWriter
+        """
+        filename = self._next_file(table_name, period)
+        path = os.path.join(self.partition_dir(table_name, period), filename)
+        return ChunkWriter(
+            path, self.fmt,
+            on_close=lambda rows, schema: self._register(table_name, period, filename, rows, schema.names)
+        )
+    
+    def append(self, table_name: str, df: pd.DataFrame, period_col: str = "period") -> Dict[str, int]:
+        """
+        按 period 拆分并追加写入
+        
+        Args:
+            table_name: 表名
+            df: 含 period 列的 DataFrame
+            period_col: period 列名
+        
+        Returns:
+            {period: 写入行数}
+        """
+        written = {}
+        for period, part in df.groupby(df[period_col].astype(str), sort=True):
+            filename = self._next_file(table_name, period)
+            write_frame(part, os.path.join(self.partition_dir(table_name, period), filename))
+            self._register(table_name, period, filename, len(part), part.columns.tolist())
+            written[period] = len(part)
+        return written
+    
+    def write(self, table_name: str, df: pd.DataFrame, period_col: str = "period") -> Dict[str, int]:
+        """
+        用 df 重建整张表的数据集（先删除已有分区）
+        
+        Args:
+            table_name: 表名
+            df: 含 period 列的 DataFrame
+            period_col: period 列名
+        
+        Returns:
+            {period: 写入行数}
+        """
+        self.clear(table_name)
+        return self.append(table_name, df, period_col=period_col)
+    
+    def select_periods(
+        self,
+        table_name: str,
+        years: Optional[Tuple[int, int]] = None,
+        periods: Optional[Tuple[str, str]] = None
+    ) -> List[str]:
+        """
+        分区裁剪：只根据清单挑出命中的 period，不打开任何数据文件
+        
+        Args:
+            table_name: 表名
+            years: period_year 闭区间
+            periods: period 闭区间 ('YYYYMM', 'YYYYMM')
+        
+        Returns:
+            命中的 period（升序）
+        """
+        selected = self.periods(table_name)
+        if years is not None:
+            lo, hi = int(years[0]), int(years[1])
+            selected = [p for p in selected if lo <= int(p[:4]) <= hi]
+        if periods is not None:
+            lo, hi = str(periods[0]), str(periods[1])
+            selected = [p for p in selected if lo <= p <= hi]
+        return selected
+    
+    def _read_file(self, path: str, columns: Optional[List[str]], memory_map: bool) -> pd.DataFrame:
+        """读取一个分区文件；文件中没有的投影列补为缺失"""
+        if columns is None:
+            return read_frame(path, memory_map=memory_map)
+        available = set(frame_columns(path))
+        df = read_frame(path, columns=[c for c in columns if c in available], memory_map=memory_map)
+        return df.reindex(columns=columns) if len(df.columns) < len(columns) else df
+    
+    def iter_partitions(
+        self,
+        table_name: str,
+        years: Optional[Tuple[int, int]] = None,
+        periods: Optional[Tuple[str, str]] = None,
+        columns: Optional[List[str]] = None,
+        memory_map: bool = True
+    ) -> Iterator[Tuple[str, pd.DataFrame]]:
+        """
+        逐个分区读取（滚动窗口回测等场景每次只持有一个 period）
+        
+        Args:
+            table_name: 表名
+            years: period_year 闭区间
+            periods: period 闭区间
+            columns: 投影列（None 为全部列）
+            memory_map: 是否内存映射
+        
+        Yields:
+            (period, DataFrame)
+        """
+        partitions = self.manifest(table_name)["partitions"]
+        for period in self.select_periods(table_name, years, periods):
+            directory = self.partition_dir(table_name, period)
+            frames = [
+                self._read_file(os.path.join(directory, name), columns, memory_map)
+                for name in partitions[period]["files"]
+            ]
+            yield period, frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+    
+    def read(
+        self,
+        table_name: str,
+        years: Optional[Tuple[int, int]] = None,
+        periods: Optional[Tuple[str, str]] = None,
+        columns: Optional[List[str]] = None,
+        memory_map: bool = True
+    ) -> pd.DataFrame:
+        """
+        读取年份 / period 区间内的数据，只打开命中的分区文件
+        
+        Args:
+            table_name: 表名
+            years: period_year 闭区间，如 config.TRAIN_YEARS / config.BACKTEST_YEARS
+            periods: period 闭区间
+            columns: 投影列（None 为全部列）
+            memory_map: 是否内存映射
+        
+        Returns:
+            DataFrame（没有命中的分区时为只含投影列的空表）
+        """
+        frames = [df for _, df in self.iter_partitions(table_name, years, periods, columns, memory_map)]
+        if not frames:
+            return pd.DataFrame(columns=columns if columns is not None else self.columns(table_name))
+        return pd.concat(frames, ignore_index=True)
+    
+    def clear(self, table_name: str) -> bool:
+        """
+        删除整张表的数据集
+        
+        Returns:
+            是否删除了数据
+        """
+        path = self.table_dir(table_name)
+        if not os.path.exists(path):
+            return False
+        shutil.rmtree(path)
+        return True
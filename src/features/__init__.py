@@ -1,8 +1,23 @@
 """
 特征工程模块
+
+公开属性在首次访问时才导入所在子模块。
 """
-from .engineering import FeatureEngineer
-from .selection import FeatureSelector
+from typing import TYPE_CHECKING
+
+from .._lazy import lazy_exports
+
+_EXPORTS = {
+    'FeatureEngineer': '.engineering',
+    'FeatureSelector': '.selection',
+    'FeaturePipeline': '.pipeline',
+}
+
+__all__ = list(_EXPORTS)
 
-__all__ = ['FeatureEngineer', 'FeatureSelector']
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
 
+if TYPE_CHECKING:
+    from .engineering import FeatureEngineer
+    from .selection import FeatureSelector
+    from .pipeline import FeaturePipeline
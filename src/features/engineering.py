@@ -22,7 +22,8 @@ class FeatureEngineer:
     @staticmethod
     def looks_like_yyyymm(series: pd.Series) -> bool:
         """检查序列是否像 YYYYMM 格式"""
-        if not np.issubdtype(series.dtype, np.number):
+        # category 等扩展类型不能交给 np.issubdtype 判断
+        if not pd.api.types.is_numeric_dtype(series.dtype) or pd.api.types.is_bool_dtype(series.dtype):
             return False
         v = pd.Series(series).dropna().astype(int)
         if v.empty:
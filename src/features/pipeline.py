@@ -0,0 +1,205 @@
+"""
+特征流水线 - 训练时记录全部处理方案，打分时一次性应用
+"""
+import os
+import pickle
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from ..config import TARGET_COLUMN
+from ..utils.encoders import CategoryEncoder
+from .engineering import FeatureEngineer
+from .selection import FeatureSelector
+
+
+class FeaturePipeline:
+    """
+    特征流水线：fit 时执行特征选择、识别时间列并训练编码器，记录删除列、填充值、
+    编码器和特征列顺序；transform 时不再重新选择特征，按记录的方案把原始数据
+    直接写入一个预分配的 float64 矩阵（每列只处理一次，不逐步复制 DataFrame）。
+    
+    处理口径与 notebook 一致：特征选择（高缺失 / 高相关 / 低方差 / 泄露）-> 缺失值填充
+    （数值用中位数、类别用众数）-> 删除目标列、年份列和时间类字段 -> 类别编码（从 1 开始，
+    未见类别映射为训练集众数编码）-> 其余缺失填 0。
+    """
+    
+    VERSION = 1
+    
+    def __init__(
+        self,
+        target_col: str = TARGET_COLUMN,
+        year_col: str = "period_year",
+        select_features: bool = True,
+        drop_time_columns: bool = True,
+        encode_offset: int = 1
+    ):
+        """
+        Args:
+            target_col: 目标列
+            year_col: 年份列（用于划分样本窗口，不作为特征）
+            select_features: 是否执行 FeatureSelector 的删除步骤
+            drop_time_columns: 是否删除时间类字段
+            encode_offset: 类别编码偏移
+        """
+        self.target_col = target_col
+        self.year_col = year_col
+        self.select_features = select_features
+        self.drop_time_columns = drop_time_columns
+        self.encode_offset = encode_offset
+        
+        self.dropped_features: Dict[str, List[str]] = {}
+        self.time_columns: List[str] = []
+        self.feature_columns: List[str] = []
+        self.categorical_columns: List[str] = []
+        self.fill_values: Dict[str, object] = {}
+        self.encoders: Dict[str, CategoryEncoder] = {}
+        # 类别列缺失值（按众数填充后）对应的编码
+        self.fill_codes: Dict[str, int] = {}
+    
+    def fit(self, df: pd.DataFrame) -> "FeaturePipeline":
+        """
+        在训练数据上确定处理方案
+        
+        Args:
+            df: 训练 DataFrame（含目标列）
+        
+        Returns:
+            self
+        """
+        print("开始拟合特征流水线...")
+        selector = FeatureSelector()
+        if self.select_features:
+            selected = selector.select_features(df, fill_missing=False)
+        else:
+            selected = df
+        fill_values = selector.missing_fill_values(selected, target_col=self.target_col, profile=selector.profile)
+        self.dropped_features = {k: list(v) for k, v in selector.dropped_features.items()}
+        
+        non_features = [c for c in [self.target_col, self.year_col] if c in selected.columns]
+        self.time_columns = []
+        if self.drop_time_columns:
+            self.time_columns = FeatureEngineer.identify_time_columns(selected, exclude_cols=non_features)
+        
+        excluded = set(non_features + self.time_columns)
+        self.feature_columns = [c for c in selected.columns if c not in excluded]
+        self.categorical_columns = [
+            c for c in self.feature_columns
+            if selected.dtypes[c] == object or isinstance(selected.dtypes[c], pd.CategoricalDtype)
+        ]
+        self.fill_values = {c: v for c, v in fill_values.items() if c in self.feature_columns}
+        
+        self.encoders = {}
+        self.fill_codes = {}
+        for col in self.categorical_columns:
+            values = selected[col]
+            if col in self.fill_values:
+                values = values.fillna(self.fill_values[col])
+            enc = CategoryEncoder(offset=self.encode_offset)
+            enc.fit(values)
+            self.encoders[col] = enc
+            if col in self.fill_values:
+                self.fill_codes[col] = int(enc.transform([self.fill_values[col]])[0])
+        
+        print(f"特征流水线拟合完成: {len(self.feature_columns)} 个特征, "
+              f"{len(self.categorical_columns)} 个类别特征")
+        return self
+    
+    def transform(
+        self,
+        df: pd.DataFrame,
+        as_frame: bool = True,
+        out: Optional[np.ndarray] = None
+    ):
+        """
+        按拟合时的方案生成模型输入
+        
+        Args:
+            df: 原始 DataFrame（只需包含 feature_columns）
+            as_frame: True 时返回 DataFrame（与矩阵共享内存），否则返回 ndarray
+            out: 可复用的 (len(df), n_features) float64 输出矩阵
+        
+        Returns:
+            特征矩阵，列顺序为 feature_columns
+        
+        Raises:
+            KeyError: df 缺少特征列
+        """
+        missing = [c for c in self.feature_columns if c not in df.columns]
+        if missing:
+            raise KeyError(f"缺少特征列: {missing}")
+        
+        shape = (len(df), len(self.feature_columns))
+        if out is None:
+            out = np.empty(shape, dtype=np.float64)
+        elif out.shape != shape:
+            raise ValueError(f"out 的形状应为 {shape}，实际为 {out.shape}")
+        
+        for j, col in enumerate(self.feature_columns):
+            values = df[col]
+            dest = out[:, j]
+            if col in self.encoders:
+                dest[:] = self.encoders[col].transform(values)
+                if col in self.fill_codes:
+                    dest[values.isna().to_numpy()] = self.fill_codes[col]
+            else:
+                dest[:] = values.to_numpy(dtype=np.float64, na_value=np.nan)
+                np.copyto(dest, float(self.fill_values.get(col, 0.0)), where=np.isnan(dest))
+                # 中位数本身为 NaN（整列缺失）时与 notebook 一样最终填 0
+                np.copyto(dest, 0.0, where=np.isnan(dest))
+        
+        if as_frame:
+            return pd.DataFrame(out, columns=self.feature_columns, index=df.index, copy=False)
+        return out
+    
+    def fit_transform(self, df: pd.DataFrame, as_frame: bool = True):
+        """拟合并转换训练数据"""
+        return self.fit(df).transform(df, as_frame=as_frame)
+    
+    def save(self, path: str) -> None:
+        """
+        保存流水线（带版本号）
+        
+        Args:
+            path: 文件路径
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        payload = {
+            "type": type(self).__name__,
+            "version": self.VERSION,
+            "state": self.__dict__,
+        }
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as fh:
+            pickle.dump(payload, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        print(f"特征流水线已保存: {path}")
+    
+    @classmethod
+    def load(cls, path: str) -> "FeaturePipeline":
+        """
+        加载流水线
+        
+        Args:
+            path: 文件路径
+        
+        Returns:
+            FeaturePipeline
+        
+        Raises:
+            ValueError: 文件不是 FeaturePipeline 或版本不兼容
+        """
+        with open(path, "rb") as fh:
+            payload = pickle.load(fh)
+        if not isinstance(payload, dict) or payload.get("type") != cls.__name__:
+            raise ValueError(f"{path} 不是 {cls.__name__} 文件")
+        if payload.get("version") != cls.VERSION:
+            raise ValueError(
+                f"{path} 的版本为 {payload.get('version')}，当前支持版本 {cls.VERSION}，请重新拟合"
+            )
+        pipeline = cls.__new__(cls)
+        pipeline.__dict__.update(payload["state"])
+        return pipeline
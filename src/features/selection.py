@@ -3,13 +3,16 @@
 """
 import pandas as pd
 import numpy as np
-from sklearn.feature_selection import VarianceThreshold
-from typing import List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional
 
+from .statistics import CorrelationAccumulator, high_correlation_drops
+from ..utils.instrument import instrumented
+from ..utils.profile import ColumnProfile
 from ..config import (
     HIGH_MISSING_THRESHOLD, HIGH_CORRELATION_THRESHOLD,
     LOW_VARIANCE_THRESHOLD, MUST_KEEP_FEATURES,
-    OPTIONAL_KEEP_FEATURES, LEAKAGE_COLUMNS, TARGET_COLUMN
+    OPTIONAL_KEEP_FEATURES, LEAKAGE_COLUMNS, TARGET_COLUMN,
+    PROFILE_MAX_DISTINCT
 )
 
 
@@ -23,17 +26,27 @@ class FeatureSelector:
             'low_variance': [],
             'leakage': []
         }
+        self.profile: Optional[ColumnProfile] = None
+        self.selected_columns: List[str] = []
+        self.fill_values: Dict[str, object] = {}
+    
+    def _get_profile(self, df: pd.DataFrame, profile: Optional[ColumnProfile]) -> ColumnProfile:
+        """使用传入的画像，未传入或缺少 df 中的列时扫描一次 df"""
+        if profile is None or any(col not in profile.stats for col in df.columns):
+            profile = ColumnProfile.from_frame(df)
+        return profile
     
     def remove_high_missing(
         self, 
         df: pd.DataFrame,
         threshold: float = HIGH_MISSING_THRESHOLD,
-        must_keep: Optional[List[str]] = None
+        must_keep: Optional[List[str]] = None,
+        profile: Optional[ColumnProfile] = None
     ) -> pd.DataFrame:
         """删除高缺失率特征"""
         must_keep = must_keep or (MUST_KEEP_FEATURES + OPTIONAL_KEEP_FEATURES)
         
-        missing_rate = df.isnull().mean()
+        missing_rate = self._get_profile(df, profile).missing_rate(df.columns.tolist())
         high_missing_cols = missing_rate[missing_rate > threshold].index.tolist()
         high_missing_cols = [col for col in high_missing_cols if col not in must_keep]
         
@@ -48,9 +61,21 @@ class FeatureSelector:
         self,
         df: pd.DataFrame,
         threshold: float = HIGH_CORRELATION_THRESHOLD,
-        must_keep: Optional[List[str]] = None
+        must_keep: Optional[List[str]] = None,
+        recheck_tol: float = 1e-3,
+        profile: Optional[ColumnProfile] = None,
+        correlation: Optional[pd.DataFrame] = None
     ) -> pd.DataFrame:
-        """删除高相关特征"""
+        """
+        删除高相关特征
+        
+        与之前逐个比较 corr().iloc[i, j] 的规则相同：若某列与它之前的任意一列
+        |相关系数| > threshold 且不在 must_keep 中，则删除该列。相关矩阵用 float32
+        分块矩阵乘法计算，|r| 与阈值相差不超过 recheck_tol 的列对再用 DataFrame.corr
+        按 float64 精确复核，保证删除结果与逐个比较完全一致。
+        
+        传入 correlation（例如分块累计得到的相关矩阵）时直接取其子矩阵，不读取 df 的数据。
+        """
         must_keep = must_keep or (MUST_KEEP_FEATURES + OPTIONAL_KEEP_FEATURES)
         
         # 只对数值列计算相关性
@@ -62,19 +87,30 @@ class FeatureSelector:
         if len(numeric_cols) < 2:
             return df
         
-        corr_matrix = df[numeric_cols].corr()
-        drop_corr = set()
+        if correlation is not None:
+            corr = correlation.loc[numeric_cols, numeric_cols].to_numpy()
+            exact_corr = None
+        else:
+            # 用画像中的均值 / 标准差做标准化，省去一次扫描
+            profile = self._get_profile(df, profile)
+            acc = CorrelationAccumulator(
+                len(numeric_cols),
+                shift=np.nan_to_num(profile.mean(numeric_cols).to_numpy()),
+                scale=np.sqrt(profile.variance(numeric_cols).to_numpy())
+            )
+            values = df[numeric_cols].to_numpy(dtype=float, na_value=np.nan)
+            corr = acc.update(values).correlation()
+            
+            def exact_corr(i: int, j: int) -> float:
+                return df[[numeric_cols[i], numeric_cols[j]]].corr().iloc[1, 0]
         
-        for i in range(len(corr_matrix.columns)):
-            for j in range(i):
-                if abs(corr_matrix.iloc[i, j]) > threshold:
-                    col_name = corr_matrix.columns[i]
-                    if col_name not in must_keep:
-                        drop_corr.add(col_name)
+        drop_corr = high_correlation_drops(
+            numeric_cols, corr, threshold, must_keep, exact_corr, recheck_tol
+        )
         
         if drop_corr:
-            self.dropped_features['high_correlation'] = list(drop_corr)
-            df = df.drop(columns=list(drop_corr))
+            self.dropped_features['high_correlation'] = drop_corr
+            df = df.drop(columns=drop_corr)
             print(f"删除高相关特征 (>{threshold}): {len(drop_corr)} 个")
         
         return df
@@ -83,9 +119,10 @@ class FeatureSelector:
         self,
         df: pd.DataFrame,
         threshold: float = LOW_VARIANCE_THRESHOLD,
-        must_keep: Optional[List[str]] = None
+        must_keep: Optional[List[str]] = None,
+        profile: Optional[ColumnProfile] = None
     ) -> pd.DataFrame:
-        """删除低方差特征"""
+        """删除低方差特征（方差口径与 VarianceThreshold 相同：ddof=0，忽略缺失）"""
         must_keep = must_keep or (MUST_KEEP_FEATURES + OPTIONAL_KEEP_FEATURES)
         
         numeric_cols = [
@@ -96,20 +133,21 @@ class FeatureSelector:
         if not numeric_cols:
             return df
         
-        selector = VarianceThreshold(threshold=threshold)
-        try:
-            selector.fit(df[numeric_cols])
-            low_var_cols = [
-                col for col, var in zip(numeric_cols, selector.variances_) 
-                if var < threshold and col not in must_keep
-            ]
-            
-            if low_var_cols:
-                self.dropped_features['low_variance'] = low_var_cols
-                df = df.drop(columns=low_var_cols)
-                print(f"删除低方差特征 (<{threshold}): {len(low_var_cols)} 个")
-        except Exception as e:
-            print(f"低方差特征选择警告: {e}")
+        variances = self._get_profile(df, profile).variance(numeric_cols).to_numpy()
+        # VarianceThreshold 在没有任何特征达到阈值时报错，此时不删除任何列
+        if np.all(~np.isfinite(variances) | (variances <= threshold)):
+            print(f"低方差特征选择警告: No feature in X meets the variance threshold {threshold:.5f}")
+            return df
+        
+        low_var_cols = [
+            col for col, var in zip(numeric_cols, variances) 
+            if var < threshold and col not in must_keep
+        ]
+        
+        if low_var_cols:
+            self.dropped_features['low_variance'] = low_var_cols
+            df = df.drop(columns=low_var_cols)
+            print(f"删除低方差特征 (<{threshold}): {len(low_var_cols)} 个")
         
         return df
     
@@ -130,25 +168,46 @@ class FeatureSelector:
         
         return df
     
-    def fill_missing_values(self, df: pd.DataFrame, target_col: str = TARGET_COLUMN) -> pd.DataFrame:
-        """填充缺失值"""
-        df = df.copy()
+    def missing_fill_values(
+        self,
+        df: pd.DataFrame,
+        target_col: str = TARGET_COLUMN,
+        profile: Optional[ColumnProfile] = None
+    ) -> Dict[str, object]:
+        """计算各缺失列的填充值：类别特征用众数，数值特征用中位数"""
+        profile = self._get_profile(df, profile)
+        n_missing = profile.n_missing(df.columns.tolist())
         
+        fill_values = {}
         for col in df.columns:
-            if col == target_col:
+            if col == target_col or n_missing[col] == 0:
                 continue
             
-            if df[col].isnull().any():
-                if df[col].dtype == "object":
-                    # 类别特征用众数填充
-                    df[col].fillna(df[col].mode()[0], inplace=True)
-                else:
-                    # 数值特征用中位数填充
-                    df[col].fillna(df[col].median(), inplace=True)
+            if df[col].dtype == "object" or isinstance(df[col].dtype, pd.CategoricalDtype):
+                # 类别特征用众数填充
+                fill_values[col] = profile.stats[col].mode()
+            else:
+                # 数值特征用中位数填充
+                fill_values[col] = profile.stats[col].median()
+        
+        return fill_values
+    
+    def fill_missing_values(
+        self,
+        df: pd.DataFrame,
+        target_col: str = TARGET_COLUMN,
+        profile: Optional[ColumnProfile] = None
+    ) -> pd.DataFrame:
+        """填充缺失值"""
+        fill_values = self.missing_fill_values(df, target_col, profile)
+        
+        if fill_values:
+            df = df.fillna(value=fill_values)
         
         print("缺失值填充完成")
         return df
     
+    @instrumented("select_features", data="df")
     def select_features(
         self,
         df: pd.DataFrame,
@@ -156,11 +215,14 @@ class FeatureSelector:
         remove_correlation: bool = True,
         remove_variance: bool = True,
         remove_leakage: bool = True,
-        fill_missing: bool = True
+        fill_missing: bool = True,
+        profile: Optional[ColumnProfile] = None
     ) -> pd.DataFrame:
         """
         完整的特征选择流程
         
+        开始时对 df 做一次 ColumnProfile 扫描，之后各步骤都读取该画像。
+        
         Args:
             df: DataFrame
             remove_missing: 是否删除高缺失率特征
@@ -168,6 +230,7 @@ class FeatureSelector:
             remove_variance: 是否删除低方差特征
             remove_leakage: 是否删除数据泄露特征
             fill_missing: 是否填充缺失值
+            profile: 预先计算好的列统计画像（None 时扫描 df 构建）
         
         Returns:
             特征选择后的 DataFrame
@@ -175,25 +238,131 @@ class FeatureSelector:
         print("开始特征选择...")
         print(f"初始特征数: {df.shape[1]}")
         
+        self.profile = self._get_profile(df, profile)
+        df = self._run_steps(
+            df, remove_missing, remove_correlation, remove_variance, remove_leakage
+        )
+        
+        if fill_missing:
+            df = self.fill_missing_values(df, profile=self.profile)
+        
+        print(f"最终特征数: {df.shape[1]}")
+        print(f"特征选择完成: {df.shape}")
+        
+        return df
+    
+    def _run_steps(
+        self,
+        df: pd.DataFrame,
+        remove_missing: bool,
+        remove_correlation: bool,
+        remove_variance: bool,
+        remove_leakage: bool,
+        correlation: Optional[pd.DataFrame] = None
+    ) -> pd.DataFrame:
+        """按顺序执行各删除步骤（统计量都取自 self.profile）"""
         if remove_missing:
-            df = self.remove_high_missing(df)
+            df = self.remove_high_missing(df, profile=self.profile)
         
         if remove_correlation:
-            df = self.remove_high_correlation(df)
+            df = self.remove_high_correlation(df, profile=self.profile, correlation=correlation)
         
         if remove_variance:
-            df = self.remove_low_variance(df)
+            df = self.remove_low_variance(df, profile=self.profile)
         
         if remove_leakage:
             df = self.remove_leakage_features(df)
         
-        if fill_missing:
-            df = self.fill_missing_values(df)
+        return df
+    
+    def fit_chunks(
+        self,
+        chunks: Iterable[pd.DataFrame],
+        remove_missing: bool = True,
+        remove_correlation: bool = True,
+        remove_variance: bool = True,
+        remove_leakage: bool = True,
+        fill_missing: bool = True,
+        max_distinct: Optional[int] = PROFILE_MAX_DISTINCT
+    ) -> "FeatureSelector":
+        """
+        逐块扫描数据生成特征选择方案（删除列 + 填充值），无需整表载入内存
         
-        print(f"最终特征数: {df.shape[1]}")
-        print(f"特征选择完成: {df.shape}")
+        一次遍历同时累计 ColumnProfile（数值列用流式矩和分位数草图）和成对相关统计量，
+        再在只有表结构的空 DataFrame 上执行与 select_features 相同的步骤。
+        与整表相比，高相关步骤不做精确复核，草图模式列的中位数为估计值。
         
-        return df
+        Args:
+            chunks: DataFrame 数据块迭代器（各块列和类型一致，以第一块为准）
+            remove_missing: 是否删除高缺失率特征
+            remove_correlation: 是否删除高相关特征
+            remove_variance: 是否删除低方差特征
+            remove_leakage: 是否删除数据泄露特征
+            fill_missing: 是否计算填充值
+            max_distinct: 见 ColumnProfile
+        
+        Returns:
+            self
+        """
+        print("开始分块特征选择...")
+        profile = ColumnProfile(max_distinct)
+        schema = None
+        numeric_cols: List[str] = []
+        acc = None
+        n_rows = 0
+        
+        for chunk in chunks:
+            if schema is None:
+                schema = chunk.iloc[:0]
+                numeric_cols = [
+                    col for col in chunk.select_dtypes(include=[np.number]).columns
+                    if col != TARGET_COLUMN
+                ]
+                # 没有精确复核，累加使用 float64
+                acc = CorrelationAccumulator(len(numeric_cols), dtype=np.float64)
+            profile.update(chunk)
+            if remove_correlation and len(numeric_cols) >= 2:
+                acc.update(chunk[numeric_cols].to_numpy(dtype=float, na_value=np.nan))
+            n_rows += len(chunk)
+        
+        if schema is None:
+            raise ValueError("没有可用的数据块")
+        
+        print(f"扫描 {n_rows} 行, 初始特征数: {schema.shape[1]}")
+        self.profile = profile
+        correlation = None
+        if remove_correlation and len(numeric_cols) >= 2:
+            correlation = pd.DataFrame(acc.correlation(), index=numeric_cols, columns=numeric_cols)
+        
+        df = self._run_steps(
+            schema, remove_missing, remove_correlation, remove_variance, remove_leakage,
+            correlation=correlation
+        )
+        self.selected_columns = df.columns.tolist()
+        self.fill_values = self.missing_fill_values(df, profile=profile) if fill_missing else {}
+        
+        print(f"最终特征数: {len(self.selected_columns)}, 填充列数: {len(self.fill_values)}")
+        return self
+    
+    def transform_chunks(self, chunks: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        """
+        按 fit_chunks 的方案逐块选择列并填充缺失值
+        
+        Args:
+            chunks: DataFrame 数据块迭代器
+        
+        Yields:
+            处理后的数据块
+        """
+        for chunk in chunks:
+            chunk = chunk[self.selected_columns]
+            if self.fill_values:
+                chunk = chunk.fillna(value=self.fill_values)
+            yield chunk
+    
+    def get_dropped_columns(self) -> List[str]:
+        """获取所有被删除的列（可作为下次下载时的排除列表）"""
+        return [col for features in self.dropped_features.values() for col in features]
     
     def get_dropped_features_summary(self) -> dict:
         """获取被删除特征的汇总"""
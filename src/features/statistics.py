@@ -0,0 +1,149 @@
+"""
+特征统计量 - 可分块累计、可合并的统计量
+"""
+import numpy as np
+from typing import Callable, List, Optional
+
+
+class CorrelationAccumulator:
+    """
+    按成对完整观测（与 DataFrame.corr 相同）计算 Pearson 相关系数矩阵的累加器
+    
+    每个行块先按 shift / scale 标准化并转为 float32 做矩阵乘法，再累加到 float64 的
+    成对统计量 (n, Σx, Σx², Σxy) 中，因此可以逐块流式更新，两个累加器也可以直接合并。
+    """
+    
+    def __init__(
+        self,
+        n_cols: int,
+        shift: Optional[np.ndarray] = None,
+        scale: Optional[np.ndarray] = None,
+        dtype=np.float32,
+        row_chunk: int = 200_000,
+        degenerate_tol: float = 1e-6
+    ):
+        """
+        Args:
+            n_cols: 列数
+            shift: 每列的平移量（一般为均值，None 时取第一块的均值）
+            scale: 每列的缩放量（一般为标准差，None 时取第一块的标准差）
+            dtype: 矩阵乘法使用的精度
+            row_chunk: 单次矩阵乘法的最大行数
+            degenerate_tol: 方差 / Σx² 不超过该值时视为常量
+        """
+        self.n_cols = n_cols
+        self.shift = shift
+        self.scale = scale
+        self.dtype = dtype
+        self.row_chunk = row_chunk
+        self.degenerate_tol = degenerate_tol
+        self._ready = False
+        
+        self.n = np.zeros((n_cols, n_cols))
+        self.sx = np.zeros((n_cols, n_cols))
+        self.sxx = np.zeros((n_cols, n_cols))
+        self.sxy = np.zeros((n_cols, n_cols))
+    
+    def _init_transform(self, values: np.ndarray) -> None:
+        self._ready = True
+        with np.errstate(all="ignore"):
+            if self.shift is None:
+                self.shift = np.nan_to_num(np.nanmean(values, axis=0))
+            if self.scale is None:
+                self.scale = np.nanstd(values, axis=0)
+        self.scale = np.where(np.isfinite(self.scale) & (self.scale > 0), self.scale, 1.0)
+    
+    def update(self, values: np.ndarray) -> "CorrelationAccumulator":
+        """
+        累加一块数据
+        
+        Args:
+            values: (n_rows, n_cols) 数值矩阵，缺失为 NaN
+        
+        Returns:
+            self
+        """
+        values = np.asarray(values, dtype=float)
+        if len(values) == 0:
+            return self
+        if not self._ready:
+            self._init_transform(values)
+        
+        for start in range(0, len(values), self.row_chunk):
+            z = ((values[start:start + self.row_chunk] - self.shift) / self.scale).astype(self.dtype)
+            mask = ~np.isnan(z)
+            z[~mask] = 0
+            
+            if mask.all():
+                k = len(z)
+                self.n += k
+                self.sx += z.sum(axis=0, dtype=float)[:, None]
+                self.sxx += np.square(z).sum(axis=0, dtype=float)[:, None]
+            else:
+                m = mask.astype(self.dtype)
+                self.n += m.T @ m
+                self.sx += z.T @ m
+                self.sxx += np.square(z).T @ m
+            self.sxy += z.T @ z
+        
+        return self
+    
+    def merge(self, other: "CorrelationAccumulator") -> "CorrelationAccumulator":
+        """合并另一个使用相同 shift / scale 的累加器"""
+        if not (np.array_equal(self.shift, other.shift) and np.array_equal(self.scale, other.scale)):
+            raise ValueError("只能合并 shift / scale 相同的累加器")
+        self.n += other.n
+        self.sx += other.sx
+        self.sxx += other.sxx
+        self.sxy += other.sxy
+        return self
+    
+    def correlation(self) -> np.ndarray:
+        """
+        相关系数矩阵
+        
+        Returns:
+            (n_cols, n_cols) 矩阵；成对观测少于 2 个或方差为 0 时为 NaN
+        """
+        with np.errstate(all="ignore"):
+            n = np.where(self.n > 0, self.n, np.nan)
+            cov = self.sxy - self.sx * self.sx.T / n
+            var = self.sxx - np.square(self.sx) / n
+            denom = np.sqrt(var * var.T)
+            corr = cov / denom
+        corr[(self.n < 2) | ~(denom > 0)] = np.nan
+        return np.clip(corr, -1.0, 1.0)
+
+
+def high_correlation_drops(
+    columns: List[str],
+    corr: np.ndarray,
+    threshold: float,
+    must_keep: List[str],
+    exact_corr: Optional[Callable[[int, int], float]] = None,
+    recheck_tol: float = 1e-3
+) -> List[str]:
+    """
+    根据相关矩阵选出要删除的列：与之前任意一列 |r| > threshold 且不在 must_keep 中
+    
+    Args:
+        columns: 列名（与 corr 的行列顺序一致）
+        corr: 相关系数矩阵
+        threshold: 相关系数阈值
+        must_keep: 必须保留的列
+        exact_corr: 精确计算第 i、j 列相关系数的函数（None 时不复核）
+        recheck_tol: |r| 与阈值相差不超过该值的列对用 exact_corr 复核
+    
+    Returns:
+        要删除的列名，按原列顺序
+    """
+    abs_corr = np.abs(corr)
+    lower = np.tril(np.ones(abs_corr.shape, dtype=bool), k=-1)
+    hit = lower & (abs_corr > threshold)
+    
+    if exact_corr is not None:
+        for i, j in zip(*np.nonzero(lower & (np.abs(abs_corr - threshold) <= recheck_tol))):
+            hit[i, j] = abs(exact_corr(i, j)) > threshold
+    
+    keep = set(must_keep)
+    return [col for col, flag in zip(columns, hit.any(axis=1)) if flag and col not in keep]
@@ -0,0 +1,28 @@
+"""
+模型训练模块
+
+公开属性在首次访问时才导入所在子模块：Scorer / CompiledGAM 打分不导入 sklearn，
+使用 CompiledGAM 时也不导入 pygam；tune_lambda / CrossValidator 首次访问时才导入两者。
+"""
+from typing import TYPE_CHECKING
+
+from .._lazy import lazy_exports
+
+_EXPORTS = {
+    'tune_lambda': '.tuning',
+    'tune_lambda_large': '.tuning',
+    'CrossValidator': '.cross_validation',
+    'summarize': '.cross_validation',
+    'CompiledGAM': '.compiled_gam',
+    'Scorer': '.scoring',
+}
+
+__all__ = list(_EXPORTS)
+
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
+
+if TYPE_CHECKING:
+    from .tuning import tune_lambda, tune_lambda_large
+    from .cross_validation import CrossValidator, summarize
+    from .compiled_gam import CompiledGAM
+    from .scoring import Scorer
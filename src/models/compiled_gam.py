@@ -0,0 +1,178 @@
+"""
+编译后的 GAM - 把拟合好的 LogisticGAM 转成分段多项式 / 查找表，用纯 NumPy 计算 logit
+"""
+import numpy as np
+from typing import Dict, List
+
+
+def _spline_values(term, coef: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """用 pygam 自己的基函数计算样条项取值（只在编译时调用，推理时不导入 pygam）"""
+    from pygam.utils import b_spline_basis
+    
+    basis = b_spline_basis(
+        x, edge_knots=term.edge_knots_, n_splines=term.n_splines,
+        spline_order=term.spline_order, sparse=False, periodic=False, verbose=False
+    )
+    return basis @ coef
+
+
+class CompiledGAM:
+    """
+    LogisticGAM 的紧凑推理表示
+    
+    s(i) 样条项在每个节点区间内是 spline_order 次多项式：编译时按区间求出多项式系数，
+    推理时 searchsorted 定位区间再用 Horner 法求值；边界外与 pygam 一样线性外推。
+    f(i) 类别项编译为按区间（即类别编码）索引的查找表，超出训练范围的取值贡献为 0。
+    l(i) 线性项保留系数。对象只包含小型 numpy 数组，可直接 pickle。
+    """
+    
+    def __init__(self):
+        self.intercept = 0.0
+        # 样条项：每项一个 dict（feature, offset, scale, breaks, poly, 两端取值和斜率）
+        self.splines: List[Dict] = []
+        # 类别项：每项一个 dict（feature, lo, hi, table）
+        self.factors: List[Dict] = []
+        # 线性项：(feature, coef)
+        self.linear: List[tuple] = []
+    
+    @classmethod
+    def from_gam(cls, gam) -> "CompiledGAM":
+        """
+        编译已拟合的 LogisticGAM
+        
+        支持 Intercept、s()（'ps' 基、无 by）、f()、l() 项。
+        
+        Args:
+            gam: 已拟合的 LogisticGAM
+        
+        Returns:
+            CompiledGAM
+        
+        Raises:
+            ValueError: 模型未拟合或含有不支持的项
+        """
+        if getattr(gam, "coef_", None) is None:
+            raise ValueError("模型尚未拟合")
+        compiled = cls()
+        for i, term in enumerate(gam.terms):
+            coef = np.asarray(gam.coef_[gam.terms.get_coef_indices(i)], dtype=np.float64)
+            kind = type(term).__name__
+            if kind == "Intercept":
+                compiled.intercept += float(coef[0])
+            elif kind == "LinearTerm" and getattr(term, "by", None) is None:
+                compiled.linear.append((int(term.feature), float(coef[0])))
+            elif kind == "FactorTerm" and term.by is None:
+                compiled.factors.append(compiled._compile_factor(term, coef))
+            elif kind == "SplineTerm" and term.basis == "ps" and term.by is None:
+                compiled.splines.append(compiled._compile_spline(term, coef))
+            else:
+                raise ValueError(f"不支持编译的 term: {term}")
+        return compiled
+    
+    @staticmethod
+    def _compile_factor(term, coef: np.ndarray) -> Dict:
+        # 0 阶样条：[lo, hi] 均分为 n_splines 个区间，每个区间对应一个系数
+        table = np.r_[0.0, coef] if term.coding == "dummy" else coef.copy()
+        lo, hi = (float(v) for v in np.sort(term.edge_knots_))
+        return {"feature": int(term.feature), "lo": lo, "hi": hi, "table": table}
+    
+    @staticmethod
+    def _compile_spline(term, coef: np.ndarray) -> Dict:
+        order = int(term.spline_order)
+        lo, hi = (float(v) for v in np.sort(term.edge_knots_))
+        scale = hi - lo if hi > lo else 1.0
+        n_intervals = term.n_splines - order
+        breaks = np.linspace(0.0, 1.0, n_intervals + 1)
+        width = breaks[1] - breaks[0]
+        
+        # 每个区间取 order + 1 个 Chebyshev 点，用 pygam 的基函数求值后解出局部多项式系数
+        # （局部变量 t = (u - 区间左端) / 区间宽度，系数按 t 的升幂排列）
+        nodes = 0.5 - 0.5 * np.cos((2 * np.arange(order + 1) + 1) * np.pi / (2 * order + 2))
+        vander = np.vander(nodes, order + 1, increasing=True)
+        u = (breaks[:-1, None] + nodes[None, :] * width).ravel()
+        values = _spline_values(term, coef, lo + u * scale).reshape(n_intervals, order + 1)
+        poly = np.linalg.solve(vander, values.T).T
+        
+        # 边界外线性外推：斜率与 pygam 一致（以缩放后的坐标计）
+        ends = _spline_values(term, coef, lo + np.array([-1.0, 0.0, 1.0, 2.0]) * scale)
+        return {
+            "feature": int(term.feature),
+            "offset": lo,
+            "scale": scale,
+            "breaks": breaks,
+            "width": width,
+            "poly": poly,
+            "left": (float(ends[1]), float(ends[1] - ends[0])),
+            "right": (float(ends[2]), float(ends[3] - ends[2])),
+        }
+    
+    @staticmethod
+    def _eval_spline(sp: Dict, x: np.ndarray) -> np.ndarray:
+        u = (x - sp["offset"]) / sp["scale"]
+        breaks, poly = sp["breaks"], sp["poly"]
+        idx = np.clip(np.searchsorted(breaks, u, side="right") - 1, 0, len(poly) - 1)
+        t = (u - breaks[idx]) / sp["width"]
+        coefs = poly[idx]
+        out = coefs[:, -1].copy()
+        for k in range(poly.shape[1] - 2, -1, -1):
+            out *= t
+            out += coefs[:, k]
+        left, right = u < 0.0, u > 1.0
+        if left.any():
+            out[left] = sp["left"][0] + sp["left"][1] * u[left]
+        if right.any():
+            out[right] = sp["right"][0] + sp["right"][1] * (u[right] - 1.0)
+        return out
+    
+    @staticmethod
+    def _eval_factor(fc: Dict, x: np.ndarray) -> np.ndarray:
+        table = fc["table"]
+        lo, hi = fc["lo"], fc["hi"]
+        scale = hi - lo if hi > lo else 1.0
+        pos = (x - lo) / scale * len(table)
+        idx = np.clip(np.floor(pos).astype(np.int64), 0, len(table) - 1)
+        out = table[idx]
+        out[(x < lo) | (x > hi)] = 0.0
+        return out
+    
+    def decision_function(self, X: np.ndarray) -> np.ndarray:
+        """
+        线性预测值（logit）
+        
+        Args:
+            X: (n, m) 特征矩阵，列顺序与训练时一致
+        
+        Returns:
+            logit 数组
+        """
+        X = np.asarray(X, dtype=np.float64)
+        eta = np.full(X.shape[0], self.intercept)
+        for sp in self.splines:
+            eta += self._eval_spline(sp, X[:, sp["feature"]])
+        for fc in self.factors:
+            eta += self._eval_factor(fc, X[:, fc["feature"]])
+        for feature, coef in self.linear:
+            eta += coef * X[:, feature]
+        return eta
+    
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """
+        违约概率，与 LogisticGAM.predict_proba 一致
+        
+        Args:
+            X: (n, m) 特征矩阵
+        
+        Returns:
+            概率数组
+        """
+        return 1.0 / (1.0 + np.exp(-self.decision_function(X)))
+    
+    @property
+    def nbytes(self) -> int:
+        """数组占用的字节数"""
+        total = 0
+        for sp in self.splines:
+            total += sp["breaks"].nbytes + sp["poly"].nbytes
+        for fc in self.factors:
+            total += fc["table"].nbytes
+        return total
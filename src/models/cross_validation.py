@@ -0,0 +1,253 @@
+"""
+折间并行的 GAM 交叉验证
+"""
+import copy
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from pygam import LogisticGAM
+from sklearn.isotonic import IsotonicRegression
+from sklearn.metrics import brier_score_loss, log_loss, roc_auc_score
+from sklearn.model_selection import StratifiedKFold, train_test_split
+
+from ..config import GAM_LAM_CANDIDATES, GAM_N_SPLINES, GAM_SOLVER, GAM_SPLINE_ORDER, RANDOM_SEED
+from ..utils.encoders import CategoryEncoder
+from ..utils.gam_fit import GAMDesign
+from ..utils.instrument import instrumented, stage
+from ..utils.model_utils import best_threshold, build_terms, class_weights
+from .tuning import tune_lambda
+
+METRIC_NAMES = ["AUC", "Brier", "LogLoss", "F1", "Thr"]
+
+# 进程池中每个 worker 持有的共享数据（特征矩阵为只读 memmap）
+_SHARED: Dict = {}
+
+
+def _init_worker(shared: Dict) -> None:
+    _SHARED.clear()
+    _SHARED.update(shared)
+    if isinstance(_SHARED["X"], str):
+        _SHARED["X"] = np.load(_SHARED["X"], mmap_mode="r")
+
+
+def summarize(name: str, M: Dict[str, List[float]]) -> None:
+    """
+    打印各指标的折间均值和标准差
+    
+    Args:
+        name: 模型名称
+        M: {指标名: 每折取值}
+    """
+    print(f"\n=== {len(M['AUC'])}-Fold CV: {name} ===")
+    for k in METRIC_NAMES:
+        vals = np.array(M[k], dtype=float)
+        print(f"{k}: mean={vals.mean():.4f}, std={vals.std(ddof=1):.4f}")
+
+
+def _score(y_true: np.ndarray, proba: np.ndarray) -> Dict[str, float]:
+    thr, f1 = best_threshold(y_true, proba)
+    return {
+        "AUC": roc_auc_score(y_true, proba),
+        "Brier": brier_score_loss(y_true, proba),
+        "LogLoss": log_loss(y_true, proba),
+        "F1": f1,
+        "Thr": thr,
+    }
+
+
+def _fold_matrix(X: np.ndarray, rows: np.ndarray, luts: Dict[int, np.ndarray]) -> np.ndarray:
+    """取出若干行，并把类别列的全局编码换成本折编码"""
+    out = np.array(X[rows], dtype=float)
+    for j, lut in luts.items():
+        out[:, j] = lut[out[:, j].astype(np.int64)]
+    return out
+
+
+@instrumented("cv_fold", data="tr_idx")
+def _run_fold(fold: int, tr_idx: np.ndarray, va_idx: np.ndarray, shared: Optional[Dict] = None) -> Dict:
+    """
+    训练并评估一折：本折编码 -> 内层切分选 λ -> 等渗校准 -> 全训练集重训 -> 验证集打分
+    
+    Returns:
+        {"fold", "best_lam", "raw": 指标, "cal": 指标}
+    """
+    data = _SHARED if shared is None else shared
+    X, y = data["X"], data["y"]
+    y_tr, y_va = y[tr_idx], y[va_idx]
+    
+    # 类别列在全局编码上按训练折重新编码：训练折出现的类别按排序编号（从 1 开始），
+    # 其余映射为训练折众数编码，与在本折上调用 fit_label_encoders 的结果一致
+    luts = {}
+    for j, n_classes in data["obj_positions"].items():
+        codes = np.asarray(X[tr_idx, j], dtype=np.int64)
+        present, counts = np.unique(codes, return_counts=True)
+        lut = np.full(n_classes, int(np.argmax(counts)) + 1, dtype=float)
+        lut[present] = np.arange(1, len(present) + 1)
+        luts[j] = lut
+    
+    X_tr = _fold_matrix(X, tr_idx, luts)
+    X_va = _fold_matrix(X, va_idx, luts)
+    terms = data["terms"]
+    
+    X_tr_in, X_cal_in, y_tr_in, y_cal_in = train_test_split(
+        X_tr, y_tr, test_size=0.2, random_state=fold, stratify=y_tr
+    )
+    w0, w1 = class_weights(y_tr_in)
+    sw_tr_in = np.where(y_tr_in == 1, w1, w0).astype(float)
+    
+    best_lam, best_model, _ = tune_lambda(
+        X_tr_in, y_tr_in, X_cal_in, y_cal_in, terms,
+        lam_candidates=data["lam_candidates"],
+        weights=sw_tr_in,
+        random_state=data["random_state"],
+        solver=data["solver"]
+    )
+    
+    p_cal = np.clip(best_model.predict_proba(X_cal_in), 1e-6, 1 - 1e-6)
+    with stage("calibration", p_cal, fold=fold):
+        iso = IsotonicRegression(y_min=1e-6, y_max=1 - 1e-6, out_of_bounds="clip")
+        iso.fit(p_cal, y_cal_in)
+    
+    w0_full, w1_full = class_weights(y_tr)
+    sw_tr_full = np.where(y_tr == 1, w1_full, w0_full).astype(float)
+    with stage("gam_fit", X_tr, lam=best_lam, fold=fold, solver=data["solver"]):
+        if data["solver"] == "cached":
+            gam_base = GAMDesign(terms, X_tr, y_tr, weights=sw_tr_full).fit(best_lam)
+        else:
+            gam_base = LogisticGAM(copy.deepcopy(terms), lam=best_lam).fit(X_tr, y_tr, weights=sw_tr_full)
+    
+    p_raw_va = np.clip(gam_base.predict_proba(X_va), 1e-6, 1 - 1e-6)
+    p_cal_va = iso.predict(p_raw_va)
+    
+    return {
+        "fold": fold,
+        "best_lam": best_lam,
+        "raw": _score(y_va, p_raw_va),
+        "cal": _score(y_va, p_cal_va),
+    }
+
+
+class CrossValidator:
+    """分层 K 折交叉验证：各折在进程池中并行，编码后的特征矩阵通过 memmap 共享"""
+    
+    def __init__(
+        self,
+        n_splits: int = 5,
+        lam_candidates: Sequence[float] = GAM_LAM_CANDIDATES,
+        n_splines: int = GAM_N_SPLINES,
+        spline_order: int = GAM_SPLINE_ORDER,
+        n_jobs: int = 1,
+        random_state: int = RANDOM_SEED,
+        tmp_dir: Optional[str] = None,
+        solver: str = GAM_SOLVER
+    ):
+        """
+        Args:
+            n_splits: 折数
+            lam_candidates: 每折内搜索的候选 λ
+            n_splines: 样条数量
+            spline_order: 样条阶数
+            n_jobs: 并行的折数（1 时在当前进程中顺序运行）
+            random_state: 折划分和 λ 搜索的随机种子
+            tmp_dir: 存放共享特征矩阵的目录（None 时使用系统临时目录）
+            solver: GAM 求解器，"cached"（GAMDesign）或 "pygam"（见 tune_lambda）
+        """
+        self.n_splits = n_splits
+        self.lam_candidates = list(lam_candidates)
+        self.n_splines = n_splines
+        self.spline_order = spline_order
+        self.n_jobs = max(1, n_jobs)
+        self.random_state = random_state
+        self.tmp_dir = tmp_dir
+        self.solver = solver
+        
+        self.metrics_raw: Dict[str, List[float]] = {}
+        self.metrics_cal: Dict[str, List[float]] = {}
+        self.best_lams: List[float] = []
+    
+    @staticmethod
+    def encode_matrix(X: pd.DataFrame) -> tuple:
+        """
+        把整张特征表一次性编码为 float 矩阵
+        
+        类别列存全局编码（0..K-1，各折再映射为本折编码），数值列缺失填 0。
+        
+        Args:
+            X: 特征 DataFrame
+        
+        Returns:
+            (特征矩阵, {类别列位置: 全局类别数}, 类别列名列表)
+        """
+        obj_cols = X.select_dtypes(include=["object", "category"]).columns.tolist()
+        mat = np.empty((len(X), X.shape[1]), dtype=float)
+        obj_positions = {}
+        for j, c in enumerate(X.columns):
+            if c in obj_cols:
+                enc = CategoryEncoder()
+                mat[:, j] = enc.fit_transform(X[c])
+                obj_positions[j] = max(len(enc.classes_), 1)
+            else:
+                mat[:, j] = pd.to_numeric(X[c], errors="coerce").fillna(0).to_numpy(dtype=float)
+        return mat, obj_positions, obj_cols
+    
+    @instrumented("cross_validation", data="X")
+    def run(self, X: pd.DataFrame, y: np.ndarray) -> Dict[str, Dict[str, List[float]]]:
+        """
+        运行交叉验证
+        
+        Args:
+            X: 特征 DataFrame（未编码）
+            y: 标签
+        
+        Returns:
+            {"raw": 原始 GAM 各折指标, "cal": 等渗校准后各折指标}
+        """
+        y = np.asarray(y).astype(int)
+        mat, obj_positions, obj_cols = self.encode_matrix(X)
+        terms = build_terms(X.columns.tolist(), obj_cols, self.n_splines, self.spline_order)
+        shared = {
+            "X": mat,
+            "y": y,
+            "obj_positions": obj_positions,
+            "terms": terms,
+            "lam_candidates": self.lam_candidates,
+            "random_state": self.random_state,
+            "solver": self.solver,
+        }
+        
+        skf = StratifiedKFold(n_splits=self.n_splits, shuffle=True, random_state=self.random_state)
+        folds = [(fold, tr_idx, va_idx) for fold, (tr_idx, va_idx) in enumerate(skf.split(mat, y), 1)]
+        
+        if self.n_jobs == 1:
+            results = [_run_fold(*args, shared=shared) for args in folds]
+        else:
+            # 特征矩阵落盘为 .npy，worker 以只读 memmap 打开，避免按折 pickle 副本
+            work_dir = tempfile.mkdtemp(prefix="cv_", dir=self.tmp_dir)
+            try:
+                path = os.path.join(work_dir, "X.npy")
+                np.save(path, mat)
+                del mat
+                shared["X"] = path
+                with ProcessPoolExecutor(
+                    max_workers=min(self.n_jobs, len(folds)),
+                    initializer=_init_worker,
+                    initargs=(shared,)
+                ) as ex:
+                    results = list(ex.map(_run_fold, *zip(*folds)))
+            finally:
+                shutil.rmtree(work_dir, ignore_errors=True)
+        
+        self.metrics_raw = {k: [r["raw"][k] for r in results] for k in METRIC_NAMES}
+        self.metrics_cal = {k: [r["cal"][k] for r in results] for k in METRIC_NAMES}
+        self.best_lams = [r["best_lam"] for r in results]
+        return {"raw": self.metrics_raw, "cal": self.metrics_cal}
+    
+    def summarize(self) -> None:
+        """打印原始模型和校准后模型的交叉验证汇总"""
+        summarize("GAM (raw)", self.metrics_raw)
+        summarize("GAM + Isotonic (calibrated)", self.metrics_cal)
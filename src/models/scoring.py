@@ -0,0 +1,280 @@
+"""
+批量打分 - 加载 (特征流水线, GAM, 等渗校准, 阈值) 打分包，分块流式处理大文件
+"""
+import argparse
+import os
+import pickle
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from ..config import SCORING_BATCH_SIZE, SCORING_ID_COLUMNS
+from ..data.cache import frame_columns, frame_writer, iter_frame_batches
+from ..features.pipeline import FeaturePipeline
+from .compiled_gam import CompiledGAM
+
+# 进程池中每个 worker 持有的打分器（进程启动时传入一次）
+_SHARED: Dict = {}
+
+
+def _init_worker(scorer: "Scorer") -> None:
+    _SHARED["scorer"] = scorer
+
+
+def _score_batch(df: pd.DataFrame) -> pd.DataFrame:
+    return _SHARED["scorer"].score_frame(df)
+
+
+class Scorer:
+    """
+    打分器：特征流水线 -> LogisticGAM.predict_proba -> 等渗校准 -> 阈值判定
+    
+    与 notebook 的口径一致：原始概率裁剪到 [1e-6, 1 - 1e-6] 后再做等渗校准，
+    校准后概率 >= threshold 判为正类。
+    """
+    
+    VERSION = 1
+    
+    def __init__(
+        self,
+        pipeline: FeaturePipeline,
+        gam,
+        iso=None,
+        threshold: float = 0.5,
+        id_columns: Sequence[str] = SCORING_ID_COLUMNS
+    ):
+        """
+        Args:
+            pipeline: 已拟合的 FeaturePipeline
+            gam: 已拟合的 LogisticGAM（或 CompiledGAM）
+            iso: 已拟合的 IsotonicRegression（None 时不校准）
+            threshold: 分类阈值（如 best_threshold 在校准后概率上的结果）
+            id_columns: 原样写入结果的标识列（输入中没有的列忽略）
+        """
+        self.pipeline = pipeline
+        self.gam = gam
+        self.iso = iso
+        self.threshold = float(threshold)
+        self.id_columns = list(id_columns)
+    
+    def compile(self) -> "Scorer":
+        """
+        把 LogisticGAM 编译为 CompiledGAM（结果一致，不再逐批重建样条基矩阵）
+        
+        Returns:
+            self
+        """
+        if not isinstance(self.gam, CompiledGAM):
+            self.gam = CompiledGAM.from_gam(self.gam)
+        return self
+    
+    def predict_proba(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        校准后的违约概率
+        
+        Args:
+            df: 原始 DataFrame（需包含 pipeline.feature_columns）
+        
+        Returns:
+            概率数组
+        """
+        return self._predict(df)[1]
+    
+    def _predict(self, df: pd.DataFrame):
+        X = self.pipeline.transform(df, as_frame=False)
+        raw = np.clip(self.gam.predict_proba(X), 1e-6, 1 - 1e-6)
+        proba = self.iso.predict(raw) if self.iso is not None else raw
+        return raw, proba
+    
+    def score_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        给一个数据块打分
+        
+        Args:
+            df: 原始 DataFrame
+        
+        Returns:
+            标识列 + proba_raw（GAM 原始概率）+ proba（校准后概率）+ prediction（0/1）
+        """
+        raw, proba = self._predict(df)
+        out = df[[c for c in self.id_columns if c in df.columns]].reset_index(drop=True)
+        out["proba_raw"] = raw
+        out["proba"] = proba
+        out["prediction"] = (proba >= self.threshold).astype(np.int8)
+        return out
+    
+    def input_columns(self) -> List[str]:
+        """打分需要从输入文件读取的列"""
+        return self.id_columns + [c for c in self.pipeline.feature_columns if c not in self.id_columns]
+    
+    def iter_file(self, path: str, batch_size: int = SCORING_BATCH_SIZE) -> Iterator[pd.DataFrame]:
+        """
+        分块读取待打分文件（只读取需要的列；CSV 的类别列按字符串读取，与训练时的编码口径一致）
+        
+        Args:
+            path: 输入文件（.parquet / .feather，其他按 CSV）
+            batch_size: 每块行数
+        
+        Yields:
+            DataFrame 数据块
+        """
+        available = set(frame_columns(path))
+        missing = [c for c in self.pipeline.feature_columns if c not in available]
+        if missing:
+            raise KeyError(f"{path} 缺少特征列: {missing}")
+        columns = [c for c in self.input_columns() if c in available]
+        dtype = {c: str for c in self.pipeline.categorical_columns + self.id_columns if c in available}
+        return iter_frame_batches(path, batch_size, columns=columns, dtype=dtype)
+    
+    def score_batches(self, batches: Iterable[pd.DataFrame], n_jobs: int = 1) -> Iterator[pd.DataFrame]:
+        """
+        按输入顺序逐块打分
+        
+        n_jobs > 1 时把数据块分发到进程池（每个 worker 在启动时接收一次打分器），
+        同时在途的数据块不超过 2 * n_jobs，内存占用与文件大小无关。
+        
+        Args:
+            batches: 数据块迭代器
+            n_jobs: 进程数
+        
+        Yields:
+            打分结果数据块
+        """
+        if n_jobs <= 1:
+            for df in batches:
+                yield self.score_frame(df)
+            return
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(self,)) as ex:
+            pending = deque()
+            for df in batches:
+                pending.append(ex.submit(_score_batch, df))
+                if len(pending) >= 2 * n_jobs:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+    
+    def score_file(
+        self,
+        input_path: str,
+        output_path: str,
+        batch_size: int = SCORING_BATCH_SIZE,
+        n_jobs: int = 1
+    ) -> Dict[str, float]:
+        """
+        给整个文件打分，结果按输入顺序分块写出（格式由扩展名决定）
+        
+        Args:
+            input_path: 输入文件
+            output_path: 输出文件（写完后原子替换）
+            batch_size: 每块行数
+            n_jobs: 进程数
+        
+        Returns:
+            {"rows", "batches", "seconds", "rows_per_sec"}
+        """
+        start = time.perf_counter()
+        writer = frame_writer(output_path)
+        rows, batches = 0, 0
+        try:
+            for out in self.score_batches(self.iter_file(input_path, batch_size), n_jobs=n_jobs):
+                writer.write(out)
+                rows += len(out)
+                batches += 1
+                elapsed = time.perf_counter() - start
+                print(f"已打分 {rows} 行 ({rows / max(elapsed, 1e-9):,.0f} 行/秒)")
+            if batches == 0:
+                raise ValueError(f"{input_path} 中没有数据")
+            writer.close()
+        except BaseException:
+            writer.abort()
+            raise
+        
+        seconds = time.perf_counter() - start
+        stats = {
+            "rows": rows,
+            "batches": batches,
+            "seconds": seconds,
+            "rows_per_sec": rows / max(seconds, 1e-9),
+        }
+        print(f"打分完成: {rows} 行, {batches} 批, {seconds:.1f} 秒, "
+              f"{stats['rows_per_sec']:,.0f} 行/秒 -> {output_path}")
+        return stats
+    
+    def save(self, path: str) -> None:
+        """
+        保存打分包（带版本号）
+        
+        Args:
+            path: 文件路径
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        payload = {
+            "type": type(self).__name__,
+            "version": self.VERSION,
+            "pipeline_version": self.pipeline.VERSION,
+            "state": self.__dict__,
+        }
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as fh:
+            pickle.dump(payload, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        print(f"打分包已保存: {path}")
+    
+    @classmethod
+    def load(cls, path: str) -> "Scorer":
+        """
+        加载打分包
+        
+        Args:
+            path: 文件路径
+        
+        Returns:
+            Scorer
+        
+        Raises:
+            ValueError: 文件不是 Scorer 打分包或版本不兼容
+        """
+        with open(path, "rb") as fh:
+            payload = pickle.load(fh)
+        if not isinstance(payload, dict) or payload.get("type") != cls.__name__:
+            raise ValueError(f"{path} 不是 {cls.__name__} 文件")
+        if payload.get("version") != cls.VERSION or payload.get("pipeline_version") != FeaturePipeline.VERSION:
+            raise ValueError(
+                f"{path} 的版本为 {payload.get('version')}/{payload.get('pipeline_version')}，"
+                f"当前支持版本 {cls.VERSION}/{FeaturePipeline.VERSION}，请重新导出"
+            )
+        scorer = cls.__new__(cls)
+        scorer.__dict__.update(payload["state"])
+        return scorer
+
+
+def main(argv: Optional[Sequence[str]] = None) -> Dict[str, float]:
+    """
+    命令行入口，例如每晚给在管组合打分：
+        
+        python -m src.models.scoring --bundle models/scorer.pkl \\
+            --input data/portfolio.parquet --output data/scores.parquet --n-jobs 4
+    """
+    parser = argparse.ArgumentParser(description="CRT 30 天逾期模型批量打分")
+    parser.add_argument("--bundle", required=True, help="Scorer.save 保存的打分包")
+    parser.add_argument("--input", required=True, help="输入文件（.parquet / .feather / .csv）")
+    parser.add_argument("--output", required=True, help="输出文件（格式由扩展名决定）")
+    parser.add_argument("--batch-size", type=int, default=SCORING_BATCH_SIZE, help="每批行数")
+    parser.add_argument("--n-jobs", type=int, default=1, help="打分进程数")
+    parser.add_argument("--compile", action="store_true", help="先把 GAM 编译为 CompiledGAM 再打分")
+    args = parser.parse_args(argv)
+    
+    scorer = Scorer.load(args.bundle)
+    if args.compile:
+        scorer.compile()
+    return scorer.score_file(args.input, args.output, batch_size=args.batch_size, n_jobs=args.n_jobs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""
+GAM 平滑参数 λ 的网格搜索（含大数据模式：子样本选 λ + 分块 IRLS 全量重训）
+"""
+import copy
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from pygam import LogisticGAM
+from sklearn.metrics import log_loss
+from sklearn.model_selection import train_test_split
+
+from ..config import (
+    GAM_CHUNK_SIZE,
+    GAM_LAM_CANDIDATES,
+    GAM_LARGE_SAMPLE_SIZE,
+    GAM_SOLVER,
+    RANDOM_SEED
+)
+from ..utils.gam_fit import ChunkedGAMDesign, GAMDesign
+from ..utils.instrument import instrumented, stage
+
+# 进程池中每个 worker 只接收一次训练/验证数据
+_SHARED: Dict = {}
+
+
+def _init_worker(shared: Dict, random_state: int) -> None:
+    _SHARED.clear()
+    _SHARED.update(shared)
+    np.random.seed(random_state)
+
+
+def _design(data: Dict) -> Tuple[GAMDesign, object]:
+    """本进程内的设计矩阵缓存：训练集设计矩阵和验证集样条基只建一次，各 λ 复用"""
+    if "design" not in data:
+        design = GAMDesign(data["terms"], data["X_tr"], data["y_tr"], weights=data["weights"])
+        data["design"] = (design, design.transform(data["X_val"]))
+    return data["design"]
+
+
+def _fit_path(
+    lams: Sequence[float],
+    warm_start: bool,
+    shared: Optional[Dict] = None
+) -> Tuple[List[Tuple[float, float]], float, LogisticGAM]:
+    """
+    依次拟合一段 λ 路径
+    
+    Args:
+        lams: λ 列表（warm_start 时按此顺序用上一个 λ 的系数做初值）
+        warm_start: 是否热启动
+        shared: 训练数据（None 时使用 worker 中的共享数据）
+    
+    Returns:
+        ([(λ, 验证集 LogLoss)], 本段最优 λ, 本段最优模型)
+    """
+    data = _SHARED if shared is None else shared
+    scores = []
+    best_lam, best_score, best_model = None, np.inf, None
+    prev_coef = None
+    
+    for lam in lams:
+        init = prev_coef if warm_start else None
+        if data.get("solver", "pygam") == "cached":
+            design, B_val = _design(data)
+            with stage("gam_fit", data["X_tr"], lam=lam, solver="cached") as st:
+                m = design.fit(lam, init)
+                st.set(n_iter=m.statistics_["n_iter"], converged=m.statistics_["converged"])
+            p = design.predict_proba(B_val, m.coef_)
+        else:
+            # pygam 会把 lam 和节点写回 terms，每次拟合使用独立副本
+            m = LogisticGAM(copy.deepcopy(data["terms"]), lam=lam)
+            if init is not None:
+                m.coef_ = init.copy()
+            with stage("gam_fit", data["X_tr"], lam=lam, solver="pygam"):
+                m.fit(data["X_tr"], data["y_tr"], weights=data["weights"])
+            p = m.predict_proba(data["X_val"])
+        prev_coef = m.coef_
+        
+        p = np.clip(p, 1e-6, 1 - 1e-6)
+        score = log_loss(data["y_val"], p)
+        scores.append((lam, score))
+        if score < best_score:
+            best_lam, best_score, best_model = lam, score, m
+    
+    return scores, best_lam, best_model
+
+
+@instrumented("tune_lambda", data="X_tr")
+def tune_lambda(
+    X_tr: np.ndarray,
+    y_tr: np.ndarray,
+    X_val: np.ndarray,
+    y_val: np.ndarray,
+    terms,
+    lam_candidates: Sequence[float] = GAM_LAM_CANDIDATES,
+    weights: Optional[np.ndarray] = None,
+    n_jobs: int = 1,
+    warm_start: bool = False,
+    random_state: int = RANDOM_SEED,
+    solver: str = GAM_SOLVER
+) -> Tuple[float, LogisticGAM, Dict[float, float]]:
+    """
+    在验证集上按 LogLoss 选择 LogisticGAM 的 λ
+    
+    n_jobs > 1 时把候选 λ 分发到进程池；warm_start 时先把候选 λ 从大到小排序，
+    切成 n_jobs 段连续路径，每段内用上一个 λ 的系数作为下一个 λ 的初值。
+    结果只依赖输入数据、候选列表、n_jobs 和 random_state，LogLoss 相同时取候选列表中靠前者。
+    
+    solver="cached" 时每个进程只建一次训练集设计矩阵、惩罚矩阵和验证集样条基（见 GAMDesign），
+    各 λ 只做惩罚 IRLS 求解；solver="pygam" 时每个 λ 调用 LogisticGAM.fit。
+    两者目标函数相同，系数差异在 IRLS 收敛容差量级。
+    
+    Args:
+        X_tr: 训练特征
+        y_tr: 训练标签
+        X_val: 验证特征
+        y_val: 验证标签
+        terms: GAM terms（见 build_terms）
+        lam_candidates: 候选 λ
+        weights: 训练样本权重
+        n_jobs: 进程数
+        warm_start: 是否沿排序后的 λ 路径热启动
+        random_state: 随机种子
+        solver: "cached" 或 "pygam"
+    
+    Returns:
+        (best_lam, best_model, {λ: 验证集 LogLoss})，字典按 λ 升序
+    """
+    if solver not in ("cached", "pygam"):
+        raise ValueError(f"未知的 solver: {solver}")
+    np.random.seed(random_state)
+    shared = {
+        "X_tr": X_tr, "y_tr": y_tr, "X_val": X_val, "y_val": y_val,
+        "terms": terms, "weights": weights, "solver": solver,
+    }
+    candidates = list(lam_candidates)
+    n_jobs = max(1, min(n_jobs, len(candidates)))
+    
+    if warm_start:
+        path = sorted(candidates, reverse=True)
+        bounds = np.array_split(np.arange(len(path)), n_jobs)
+        segments = [[path[i] for i in idx] for idx in bounds if len(idx)]
+    else:
+        segments = [[lam] for lam in candidates]
+    
+    if n_jobs == 1:
+        results = [_fit_path(seg, warm_start, shared) for seg in segments]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=n_jobs,
+            initializer=_init_worker,
+            initargs=(shared, random_state)
+        ) as ex:
+            results = list(ex.map(_fit_path, segments, [warm_start] * len(segments)))
+    
+    curve: Dict[float, float] = {}
+    models: Dict[float, LogisticGAM] = {}
+    for scores, seg_lam, seg_model in results:
+        curve.update(scores)
+        models[seg_lam] = seg_model
+    
+    best_lam = min(candidates, key=lambda lam: (curve[lam], candidates.index(lam)))
+    if best_lam in models:
+        best_model = models[best_lam]
+    else:
+        # 段内 LogLoss 并列时段最优可能不是候选列表中靠前的 λ，单独重拟合
+        best_model = _fit_path([best_lam], False, shared)[2]
+    
+    print(f"λ 搜索完成: best_lam={best_lam}, LogLoss={curve[best_lam]:.4f}")
+    return best_lam, best_model, dict(sorted(curve.items()))
+
+
+@instrumented("tune_lambda_large", data="X")
+def tune_lambda_large(
+    X: np.ndarray,
+    y: np.ndarray,
+    terms,
+    lam_candidates: Sequence[float] = GAM_LAM_CANDIDATES,
+    weights: Optional[np.ndarray] = None,
+    sample_size: int = GAM_LARGE_SAMPLE_SIZE,
+    val_size: float = 0.2,
+    chunk_size: int = GAM_CHUNK_SIZE,
+    n_jobs: int = 1,
+    warm_start: bool = False,
+    random_state: int = RANDOM_SEED
+) -> Tuple[float, LogisticGAM, Dict[float, float]]:
+    """
+    大数据模式：在分层子样本上选 λ，再用分块 IRLS 在全量数据上重训
+    
+    子样本按标签分层抽取 sample_size 行（不超过全量），再分层切出 val_size 作验证集，
+    在其上调用 tune_lambda（solver="cached"）；选定 λ 后用 ChunkedGAMDesign 在全部行上拟合，
+    每块 chunk_size 行，完整设计矩阵不驻留内存。节点和类别数按全量数据确定。
+    与全量精确拟合的差异来自 λ 选择（子样本上的验证曲线），给定 λ 时分块 IRLS 与精确解
+    只差浮点累加顺序，可用 utils.gam_fit.coef_drift 评估（见 benchmarks.large_fit）。
+    
+    Args:
+        X: 全量训练特征（可以是只读 memmap）
+        y: 全量训练标签
+        terms: GAM terms（见 build_terms）
+        lam_candidates: 候选 λ
+        weights: 全量样本权重（子样本沿用对应行的权重）
+        sample_size: λ 搜索子样本行数
+        val_size: 子样本中验证集比例
+        chunk_size: 分块 IRLS 每块行数
+        n_jobs: λ 搜索进程数
+        warm_start: λ 搜索是否热启动
+        random_state: 随机种子
+    
+    Returns:
+        (best_lam, 全量模型, {λ: 子样本验证集 LogLoss})；全量模型的 statistics_ 带 n_iter / converged，
+        未收敛时发出 RuntimeWarning
+    """
+    y = np.asarray(y)
+    idx = np.arange(len(y))
+    if sample_size < len(y):
+        idx, _ = train_test_split(idx, train_size=sample_size, random_state=random_state, stratify=y)
+        idx.sort()
+    tr_idx, val_idx = train_test_split(idx, test_size=val_size, random_state=random_state, stratify=y[idx])
+    tr_idx.sort()
+    val_idx.sort()
+    
+    best_lam, _, curve = tune_lambda(
+        np.asarray(X[tr_idx], dtype=float), y[tr_idx],
+        np.asarray(X[val_idx], dtype=float), y[val_idx], terms,
+        lam_candidates=lam_candidates,
+        weights=None if weights is None else np.asarray(weights)[tr_idx],
+        n_jobs=n_jobs,
+        warm_start=warm_start,
+        random_state=random_state,
+        solver="cached"
+    )
+    
+    with stage("gam_fit", X, lam=best_lam, solver="chunked", chunk_size=chunk_size) as st:
+        design = ChunkedGAMDesign(terms, X, y, weights=weights, chunk_size=chunk_size)
+        coef, n_iter, converged = design.solve(best_lam)
+        st.set(n_iter=n_iter, converged=converged)
+    if converged:
+        print(f"分块 IRLS 重训完成: {len(y):,} 行, λ={best_lam}, 迭代 {n_iter} 次")
+    else:
+        warnings.warn(
+            f"分块 IRLS 重训未收敛: {len(y):,} 行, λ={best_lam}，已达到 max_iter={n_iter} 次迭代",
+            RuntimeWarning
+        )
+    model = design.model(best_lam, coef)
+    model.statistics_.update(n_iter=n_iter, converged=converged)
+    return best_lam, model, curve
@@ -1,29 +1,54 @@
 """
 工具函数模块
+
+公开属性在首次访问时才导入所在子模块，例如只使用 kernel_bandwidth 时不会导入 pygam / sklearn。
 """
-from .gam_utils import (
-    kernel_bandwidth,
-    smooth_curves,
-    lock_and_band,
-    is_continuous
-)
-from .model_utils import (
-    fit_label_encoders,
-    transform_with_encoders,
-    build_terms,
-    class_weights,
-    best_threshold
-)
+from typing import TYPE_CHECKING
+
+from .._lazy import lazy_exports
+
+_EXPORTS = {
+    'kernel_bandwidth': '.gam_utils',
+    'smooth_curves': '.gam_utils',
+    'lock_and_band': '.gam_utils',
+    'is_continuous': '.gam_utils',
+    'fit_label_encoders': '.model_utils',
+    'transform_with_encoders': '.model_utils',
+    'build_terms': '.model_utils',
+    'class_weights': '.model_utils',
+    'best_threshold': '.model_utils',
+    'threshold_sweep': '.model_utils',
+    'CategoryEncoder': '.encoders',
+    'ColumnProfile': '.profile',
+    'GAMDesign': '.gam_fit',
+    'ChunkedGAMDesign': '.gam_fit',
+    'coef_drift': '.gam_fit',
+    'configure': '.instrument',
+    'instrumented': '.instrument',
+    'stage': '.instrument',
+    'record_transfer': '.instrument',
+}
+
+__all__ = list(_EXPORTS)
 
-__all__ = [
-    'kernel_bandwidth',
-    'smooth_curves',
-    'lock_and_band',
-    'is_continuous',
-    'fit_label_encoders',
-    'transform_with_encoders',
-    'build_terms',
-    'class_weights',
-    'best_threshold'
-]
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
 
+if TYPE_CHECKING:
+    from .gam_utils import (
+        kernel_bandwidth,
+        smooth_curves,
+        lock_and_band,
+        is_continuous
+    )
+    from .model_utils import (
+        fit_label_encoders,
+        transform_with_encoders,
+        build_terms,
+        class_weights,
+        best_threshold,
+        threshold_sweep
+    )
+    from .encoders import CategoryEncoder
+    from .profile import ColumnProfile
+    from .gam_fit import GAMDesign, ChunkedGAMDesign, coef_drift
+    from .instrument import configure, instrumented, record_transfer, stage
@@ -0,0 +1,123 @@
+"""
+向量化类别编码器
+"""
+import numpy as np
+import pandas as pd
+from typing import Optional
+
+
+def _as_str_array(values) -> np.ndarray:
+    """转成定长 unicode 数组，取值与 str(v) 一致（None -> 'None', NaN -> 'nan'）"""
+    if isinstance(values, (pd.Series, pd.Index)):
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # category 列的缺失值按 None 处理，与 Supabase 返回的 object 列（空值为 None）编码一致
+            values = pd.Series(values).astype(object).where(values.notna(), None)
+        values = values.to_numpy(dtype=object)
+    return np.asarray(values, dtype=object).astype(str)
+
+
+class CategoryEncoder:
+    """
+    类别编码器：对整列做一次 searchsorted 查表，替代逐个单元格调用 LabelEncoder.transform
+    
+    编码 = 类别在排序后 classes_ 中的位置 + offset，与 LabelEncoder(+offset) 完全一致；
+    未见过的类别映射为训练集的众数编码。对象只包含 numpy 数组和整数，可直接 pickle。
+    """
+    
+    def __init__(self, offset: int = 0):
+        """
+        Args:
+            offset: 编码偏移（model_utils 中的编码从 1 开始）
+        """
+        self.offset = offset
+        self.classes_: np.ndarray = np.array([], dtype=str)
+        self.mode_code: int = offset
+    
+    def fit(self, values) -> "CategoryEncoder":
+        """
+        训练编码器
+        
+        Args:
+            values: 类别取值（任意可转字符串的数组）
+        
+        Returns:
+            self
+        """
+        self.fit_transform(values)
+        return self
+    
+    def fit_transform(self, values) -> np.ndarray:
+        """
+        训练编码器并返回训练数据的编码
+        
+        Args:
+            values: 类别取值
+        
+        Returns:
+            int64 编码数组
+        """
+        arr = _as_str_array(values)
+        self.classes_, inverse, counts = np.unique(arr, return_inverse=True, return_counts=True)
+        # argmax 取第一个最大值，即并列众数中编码最小者，与 Series.mode().iloc[0] 一致
+        self.mode_code = int(np.argmax(counts)) + self.offset if len(counts) else self.offset
+        return inverse.astype(np.int64) + self.offset
+    
+    def transform(self, values, unknown_code: Optional[int] = None) -> np.ndarray:
+        """
+        编码新数据
+        
+        Args:
+            values: 类别取值
+            unknown_code: 未见类别的编码（默认为训练集众数编码）
+        
+        Returns:
+            int64 编码数组
+        """
+        arr = _as_str_array(values)
+        unknown_code = self.mode_code if unknown_code is None else unknown_code
+        if len(self.classes_) == 0:
+            return np.full(len(arr), unknown_code, dtype=np.int64)
+        
+        idx = np.searchsorted(self.classes_, arr)
+        idx = np.minimum(idx, len(self.classes_) - 1)
+        found = self.classes_[idx] == arr
+        return np.where(found, idx + self.offset, unknown_code).astype(np.int64)
+    
+    @classmethod
+    def from_value_counts(cls, counts: pd.Series, offset: int = 0) -> "CategoryEncoder":
+        """
+        由类别频数构建编码器（用于分块累计频数后一次性生成）
+        
+        Args:
+            counts: 以类别为索引的频数 Series
+            offset: 编码偏移
+        
+        Returns:
+            CategoryEncoder
+        """
+        enc = cls(offset=offset)
+        keys = _as_str_array(counts.index)
+        order = np.argsort(keys, kind="stable")
+        enc.classes_ = keys[order]
+        sorted_counts = counts.to_numpy()[order]
+        if len(sorted_counts):
+            enc.mode_code = int(np.argmax(sorted_counts)) + offset
+        return enc
+    
+    @classmethod
+    def from_label_encoder(cls, le, offset: int = 0, mode_code: Optional[int] = None) -> "CategoryEncoder":
+        """
+        由已训练的 sklearn LabelEncoder 转换（兼容旧的编码器字典）
+        
+        Args:
+            le: 已训练的 LabelEncoder
+            offset: 编码偏移
+            mode_code: 未见类别的编码
+        
+        Returns:
+            CategoryEncoder
+        """
+        enc = cls(offset=offset)
+        enc.classes_ = np.asarray(le.classes_, dtype=str)
+        enc.mode_code = offset if mode_code is None else int(mode_code)
+        return enc
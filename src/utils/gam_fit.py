@@ -0,0 +1,347 @@
+"""
+GAM 拟合 - 在一个数据划分上缓存样条设计矩阵和惩罚矩阵，各 λ 只做惩罚 IRLS 求解；
+大数据量时按块累加 BᵀWB / BᵀWz，完整设计矩阵不驻留内存
+"""
+import copy
+import warnings
+from typing import Dict, Iterator, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import scipy.sparse as sp
+from pygam import LogisticGAM
+from pygam.utils import check_X
+from scipy.linalg import LinAlgError, cho_factor, cho_solve
+from scipy.special import expit
+
+from ..config import GAM_CHUNK_SIZE
+
+EPS = np.finfo(np.float64).eps
+
+
+def _irls_terms(
+    B: sp.spmatrix,
+    y: np.ndarray,
+    weights: np.ndarray,
+    coef: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, int]:
+    """
+    一块数据对惩罚 IRLS 正规方程的贡献
+    
+    Args:
+        B: 设计矩阵（CSR）
+        y: 标签
+        weights: 样本权重
+        coef: 当前系数
+    
+    Returns:
+        (BᵀWB, BᵀWz, 参与本轮的样本数)
+    """
+    lp = B @ coef
+    mu = expit(lp)
+    var = mu * (1 - mu)
+    # pygam 的 PIRLS 权重为 sqrt(w·μ(1-μ))，小于 sqrt(eps) 或非有限的样本本轮不参与
+    w = weights * var
+    keep = (np.sqrt(w) >= np.sqrt(EPS)) & np.isfinite(w)
+    w = np.where(keep, w, 0.0)
+    z = lp + np.divide(y - mu, var, out=np.zeros_like(mu), where=keep)
+    gram = (B.T @ B.multiply(w[:, None]).tocsr()).toarray()
+    return gram, B.T @ (w * z), int(keep.sum())
+
+
+class GAMDesign:
+    """
+    固定数据划分上的 LogisticGAM 设计矩阵缓存
+    
+    样条基矩阵和各项的单位惩罚矩阵只与 terms、训练数据有关，与 λ 无关：构造时建一次，
+    之后每个 λ 只需组装 λ 加权的惩罚矩阵并做惩罚 IRLS。目标函数与 pygam 相同
+    （惩罚二项偏差 + sqrt(eps) 岭项，权重按 pygam 口径取 float32），pygam 对加权最小二乘
+    做 QR + SVD，这里解正规方程 (BᵀWB + P) β = BᵀWz（Cholesky），收敛条件与 pygam 一致，
+    系数与 LogisticGAM.fit 的差异在收敛容差量级。
+    """
+    
+    def __init__(
+        self,
+        terms,
+        X: np.ndarray,
+        y: np.ndarray,
+        weights: Optional[np.ndarray] = None,
+        max_iter: int = 100,
+        tol: float = 1e-4
+    ):
+        """
+        Args:
+            terms: GAM terms（见 build_terms；不会被修改）
+            X: 训练特征
+            y: 训练标签（0/1）
+            weights: 训练样本权重
+            max_iter: IRLS 最大迭代次数
+            tol: 收敛容差（系数相对变化）
+        
+        Raises:
+            ValueError: terms 含有约束（单调 / 凸性等）
+        """
+        X = check_X(X, verbose=False)
+        self._setup(terms, X, y, weights, max_iter, tol)
+        self.modelmat = self.template._modelmat(X).tocsr()
+    
+    def _setup(
+        self,
+        terms,
+        X: np.ndarray,
+        y: np.ndarray,
+        weights: Optional[np.ndarray],
+        max_iter: int,
+        tol: float
+    ) -> None:
+        """按训练数据编译 terms（节点、类别数），准备标签、权重和单位惩罚矩阵"""
+        template = LogisticGAM(copy.deepcopy(terms), max_iter=max_iter, tol=tol)
+        template._validate_params()
+        template._validate_data_dep_params(X)
+        if template.terms.hasconstraint:
+            raise ValueError("GAMDesign 不支持带约束的 terms")
+        template.statistics_ = {"n_samples": X.shape[0], "m_features": X.shape[1]}
+        self.template = template
+        self.max_iter = max_iter
+        self.tol = tol
+        
+        self.y = np.asarray(y, dtype=np.float64).ravel()
+        # 与 LogisticGAM.fit 一致：样本权重先转为 float32
+        self.weights = (
+            np.ones(len(self.y)) if weights is None
+            else np.asarray(weights).astype("f").ravel().astype(np.float64)
+        )
+        
+        # 每项的单位惩罚矩阵（λ = 1），按系数位置拼成块对角
+        self._blocks = []
+        for i, term in enumerate(template.terms):
+            idx = template.terms.get_coef_indices(i)
+            unit = copy.deepcopy(term)
+            if not unit.isintercept:
+                unit.lam = [1.0] * len(unit.lam)
+            block = np.asarray(sp.csc_matrix(unit.build_penalties()).toarray())
+            self._blocks.append((idx, block, bool(unit.isintercept)))
+        self._initial: Optional[np.ndarray] = None
+    
+    @property
+    def n_coefs(self) -> int:
+        return self.template.terms.n_coefs
+    
+    def _chunks(self) -> Iterator[Tuple[sp.csr_matrix, np.ndarray, np.ndarray]]:
+        """按块给出 (设计矩阵, 标签, 权重)；缓存模式下只有一块"""
+        yield self.modelmat, self.y, self.weights
+    
+    def penalty(self, lam: Union[float, Sequence[float]]) -> np.ndarray:
+        """
+        λ 加权的惩罚矩阵（稠密，含 sqrt(eps) 岭项）
+        
+        Args:
+            lam: 所有项共用的 λ，或按 terms 顺序（不含截距）逐项给出
+        
+        Returns:
+            (n_coefs, n_coefs) 矩阵
+        """
+        penalized = [b for b in self._blocks if not b[2]]
+        lams = np.broadcast_to(np.asarray(lam, dtype=np.float64), (len(penalized),))
+        P = np.diag(np.full(self.n_coefs, np.sqrt(EPS)))
+        for (idx, block, _), value in zip(penalized, lams):
+            P[np.ix_(idx, idx)] += value * block
+        return P
+    
+    def initial_coef(self) -> np.ndarray:
+        """与 pygam 相同的初值：logit 尺度上的无惩罚最小二乘（与 λ 无关，只算一次）"""
+        if self._initial is None:
+            gram = np.diag(np.full(self.n_coefs, np.sqrt(EPS)))
+            rhs = np.zeros(self.n_coefs)
+            for B, y, _ in self._chunks():
+                y = y.copy()
+                y[y == 0] += 0.01
+                y[y == 1] -= 0.01
+                gram += (B.T @ B).toarray()
+                rhs += B.T @ np.log(y / (1 - y))
+            self._initial = np.linalg.solve(gram, rhs)
+        return self._initial
+    
+    def solve(
+        self,
+        lam: Union[float, Sequence[float]],
+        coef: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, int, bool]:
+        """
+        在缓存的设计矩阵上做惩罚 IRLS
+        
+        Args:
+            lam: λ（见 penalty）
+            coef: 初始系数（None 时用 initial_coef；可传入相邻 λ 的解热启动）
+        
+        Returns:
+            (系数, 迭代次数, 是否收敛)
+        """
+        P = self.penalty(lam)
+        coef = (self.initial_coef() if coef is None else np.asarray(coef, dtype=np.float64)).copy()
+        
+        for n_iter in range(1, self.max_iter + 1):
+            A, rhs, kept = P.copy(), np.zeros(self.n_coefs), 0
+            for B, y, weights in self._chunks():
+                gram, b, n = _irls_terms(B, y, weights, coef)
+                A += gram
+                rhs += b
+                kept += n
+            if not kept:
+                raise ValueError("IRLS 发散，所有样本权重为 0")
+            try:
+                coef_new = cho_solve(cho_factor(A, check_finite=False), rhs, check_finite=False)
+            except LinAlgError:
+                coef_new = np.linalg.lstsq(A, rhs, rcond=None)[0]
+            
+            diff = np.linalg.norm(coef - coef_new) / np.linalg.norm(coef_new)
+            coef = coef_new
+            if diff < self.tol:
+                return coef, n_iter, True
+        return coef, self.max_iter, False
+    
+    def model(self, lam: Union[float, Sequence[float]], coef: np.ndarray) -> LogisticGAM:
+        """
+        用给定系数生成可直接 predict / predict_proba 的 LogisticGAM
+        
+        statistics_ 只包含 n_samples / m_features（fit 另外写入 n_iter / converged），
+        不计算 edof、AIC、p 值等统计量。
+        
+        Args:
+            lam: λ
+            coef: 系数
+        
+        Returns:
+            LogisticGAM
+        """
+        gam = copy.deepcopy(self.template)
+        gam.terms.lam = lam
+        gam.coef_ = np.asarray(coef, dtype=np.float64).copy()
+        return gam
+    
+    def fit(
+        self,
+        lam: Union[float, Sequence[float]],
+        coef: Optional[np.ndarray] = None
+    ) -> LogisticGAM:
+        """
+        拟合一个 λ，相当于 LogisticGAM(terms, lam=lam).fit(X, y, weights)
+        
+        迭代次数和是否收敛写入返回模型的 statistics_["n_iter"] / statistics_["converged"]，
+        未收敛时发出 RuntimeWarning。
+        
+        Args:
+            lam: λ
+            coef: 初始系数（热启动）
+        
+        Returns:
+            LogisticGAM（见 model）
+        """
+        coef, n_iter, converged = self.solve(lam, coef)
+        if not converged:
+            warnings.warn(f"GAM IRLS 未收敛: λ={lam}，已达到 max_iter={self.max_iter} 次迭代", RuntimeWarning)
+        gam = self.model(lam, coef)
+        gam.statistics_.update(n_iter=n_iter, converged=converged)
+        return gam
+    
+    def transform(self, X: np.ndarray) -> sp.csr_matrix:
+        """
+        按训练时的节点为新数据建设计矩阵（如验证集，只建一次、各 λ 复用）
+        
+        Args:
+            X: 特征矩阵
+        
+        Returns:
+            稀疏设计矩阵
+        """
+        return self.template._modelmat(X).tocsr()
+    
+    @staticmethod
+    def predict_proba(modelmat: sp.spmatrix, coef: np.ndarray) -> np.ndarray:
+        """
+        在已建好的设计矩阵上计算概率
+        
+        Args:
+            modelmat: transform 的返回值
+            coef: 系数
+        
+        Returns:
+            概率数组
+        """
+        return expit(modelmat @ coef)
+
+
+class ChunkedGAMDesign(GAMDesign):
+    """
+    按块构建设计矩阵的 GAMDesign，用于数百万行的训练集
+    
+    节点和类别数按全量数据确定（与 LogisticGAM.fit 相同）；每轮 IRLS 逐块构建
+    chunk_size 行的样条基并累加 BᵀWB 和 BᵀWz，内存占用与行数无关（只保留原始特征），
+    代价是每轮都要重建各块的样条基。结果与 GAMDesign 只差浮点累加顺序。
+    """
+    
+    def __init__(
+        self,
+        terms,
+        X: np.ndarray,
+        y: np.ndarray,
+        weights: Optional[np.ndarray] = None,
+        chunk_size: int = GAM_CHUNK_SIZE,
+        max_iter: int = 100,
+        tol: float = 1e-4
+    ):
+        """
+        Args:
+            terms: GAM terms（见 build_terms；不会被修改）
+            X: 训练特征（可以是只读 memmap）
+            y: 训练标签（0/1）
+            weights: 训练样本权重
+            chunk_size: 每块行数
+            max_iter: IRLS 最大迭代次数
+            tol: 收敛容差（系数相对变化）
+        
+        Raises:
+            ValueError: terms 含有约束（单调 / 凸性等）
+        """
+        self.X = X
+        self.chunk_size = max(1, int(chunk_size))
+        self._setup(terms, X, y, weights, max_iter, tol)
+    
+    def _chunks(self) -> Iterator[Tuple[sp.csr_matrix, np.ndarray, np.ndarray]]:
+        for start in range(0, len(self.y), self.chunk_size):
+            end = start + self.chunk_size
+            B = self.template._modelmat(np.asarray(self.X[start:end], dtype=np.float64)).tocsr()
+            yield B, self.y[start:end], self.weights[start:end]
+
+
+def coef_drift(
+    reference: LogisticGAM,
+    other: LogisticGAM,
+    X: Optional[np.ndarray] = None
+) -> Dict[str, float]:
+    """
+    两个同结构 GAM 的系数差异（如大数据模式拟合相对精确拟合的漂移）
+    
+    类别项与截距共线，系数在这些不可识别方向上只受 sqrt(eps) 岭项约束，
+    浮点累加顺序不同就可能出现 1e-3 量级的系数差异而预测概率不变，应结合概率差异判断。
+    
+    Args:
+        reference: 参考模型（精确拟合）
+        other: 待比较模型
+        X: 评估概率差异的样本（None 时不计算概率差异）
+    
+    Returns:
+        {"coef_rel_l2": 系数差的 L2 范数 / 参考系数 L2 范数, "coef_max_abs": 系数最大绝对差,
+         "proba_max_abs": 概率最大绝对差, "proba_mean_abs": 概率平均绝对差}
+    """
+    a = np.asarray(reference.coef_, dtype=np.float64)
+    b = np.asarray(other.coef_, dtype=np.float64)
+    if a.shape != b.shape:
+        raise ValueError(f"系数维度不同: {a.shape} vs {b.shape}")
+    drift = {
+        "coef_rel_l2": float(np.linalg.norm(a - b) / np.linalg.norm(a)),
+        "coef_max_abs": float(np.abs(a - b).max()),
+    }
+    if X is not None:
+        diff = np.abs(reference.predict_proba(X) - other.predict_proba(X))
+        drift.update(proba_max_abs=float(diff.max()), proba_mean_abs=float(diff.mean()))
+    return drift
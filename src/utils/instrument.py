@@ -0,0 +1,383 @@
+"""
+阶段计时 - 记录各阶段的墙钟时间、CPU 时间、峰值 RSS、输入 / 输出行数和内存字节数、
+网络传输字节数，输出 JSON lines
+"""
+import functools
+import inspect
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from ..config import INSTRUMENT_PATH, INSTRUMENT_PROFILE_DIR, PROFILE_SAMPLE_INTERVAL
+
+# 全局开关与输出设置；未启用时 stage / instrumented 只做一次字典查找
+_STATE: Dict = {"enabled": False, "path": None, "profiler": None, "records": []}
+_LOCK = threading.Lock()
+# 每个线程各自的阶段栈（用于嵌套关系和峰值 RSS 的向上传递）
+_LOCAL = threading.local()
+
+
+def _proc_status() -> Tuple[Optional[float], Optional[float]]:
+    """当前 RSS 和 RSS 高水位（MB）；没有 /proc 时用 ru_maxrss 作为高水位"""
+    rss = hwm = None
+    try:
+        with open("/proc/self/status") as fh:
+            for line in fh:
+                if line.startswith("VmRSS:"):
+                    rss = int(line.split()[1]) / 1024
+                elif line.startswith("VmHWM:"):
+                    hwm = int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if hwm is None and resource is not None:
+        # Linux 上 ru_maxrss 单位为 KB，macOS 上为字节
+        scale = 1 if sys.platform == "darwin" else 1024
+        hwm = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2**20
+    return rss, hwm
+
+
+def _reset_peak() -> bool:
+    """把 RSS 高水位重置为当前 RSS（Linux 4.0+），不支持时返回 False"""
+    try:
+        with open("/proc/self/clear_refs", "w") as fh:
+            fh.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def frame_size(obj) -> Tuple[Optional[int], Optional[int]]:
+    """
+    数据对象的行数和内存字节数（不是传输量，见 record_transfer）
+    
+    DataFrame / Series 按 memory_usage(deep=False) 计（object 列只计指针，开销为常数），
+    ndarray 按 nbytes 计；元组取第一个元素；其他对象返回 (None, None)。
+    
+    Args:
+        obj: DataFrame / Series / ndarray / 元组
+    
+    Returns:
+        (行数, 内存字节数)
+    """
+    if isinstance(obj, tuple):
+        return frame_size(obj[0]) if obj else (None, None)
+    shape = getattr(obj, "shape", None)
+    if not shape:
+        return None, None
+    if hasattr(obj, "memory_usage"):
+        usage = obj.memory_usage(index=False, deep=False)
+        return int(shape[0]), int(usage.sum() if hasattr(usage, "sum") else usage)
+    nbytes = getattr(obj, "nbytes", None)
+    return int(shape[0]), None if nbytes is None else int(nbytes)
+
+
+class _NullStage:
+    """未启用时返回的空阶段，所有操作都是空操作"""
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+    
+    def set(self, **fields) -> None:
+        pass
+    
+    def output(self, obj) -> None:
+        pass
+    
+    def add_bytes(self, n: int) -> None:
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class Stage:
+    """
+    一个阶段的指标记录，在 with 块内可补充输出和自定义字段：
+        
+        with stage("encode", df) as st:
+            out = encode(df)
+            st.output(out)
+            st.set(n_categories=len(encs))
+    """
+    
+    def __init__(self, name: str, data=None, fields: Optional[Dict] = None):
+        self.name = name
+        self.fields = dict(fields or {})
+        self.rows_in, self.mem_bytes_in = frame_size(data) if data is not None else (None, None)
+        self.rows_out = self.mem_bytes_out = None
+        # 网络传输字节数（见 record_transfer），未记录传输的阶段为 None
+        self.bytes: Optional[int] = None
+        self._peak = 0.0
+        self._profile = None
+    
+    def set(self, **fields) -> None:
+        """添加自定义字段（写入记录的 fields）"""
+        self.fields.update(fields)
+    
+    def output(self, obj) -> None:
+        """记录输出数据的行数和内存字节数"""
+        self.rows_out, self.mem_bytes_out = frame_size(obj)
+    
+    def add_bytes(self, n: int) -> None:
+        """累加网络传输字节数"""
+        self.bytes = (self.bytes or 0) + int(n)
+    
+    def __enter__(self) -> "Stage":
+        stack = getattr(_LOCAL, "stack", None)
+        if stack is None:
+            stack = _LOCAL.stack = []
+        _, hwm = _proc_status()
+        if stack and hwm is not None:
+            # 重置高水位前先把当前高水位计入外层阶段
+            stack[-1]._peak = max(stack[-1]._peak, hwm)
+        self.parent = stack[-1].name if stack else None
+        self.depth = len(stack)
+        self.peak_scope = "stage" if _reset_peak() else "process"
+        stack.append(self)
+        
+        profiler = _STATE["profiler"]
+        if profiler is not None and self.depth == 0:
+            self._profile = profiler(self.name)
+            self._profile.__enter__()
+        
+        self.start = time.time()
+        self.rss_before, _ = _proc_status()
+        self._cpu0 = time.process_time()
+        self._t0 = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        wall = time.perf_counter() - self._t0
+        cpu = time.process_time() - self._cpu0
+        if self._profile is not None:
+            self._profile.__exit__(exc_type, exc, tb)
+        rss, hwm = _proc_status()
+        peak = max(self._peak, hwm or 0.0) or None
+        
+        stack = _LOCAL.stack
+        stack.pop()
+        if stack and peak is not None:
+            stack[-1]._peak = max(stack[-1]._peak, peak)
+        if stack and self.bytes is not None:
+            stack[-1].add_bytes(self.bytes)
+        
+        _emit({
+            "stage": self.name,
+            "parent": self.parent,
+            "depth": self.depth,
+            "pid": os.getpid(),
+            "start": self.start,
+            "wall_s": wall,
+            "cpu_s": cpu,
+            "rss_before_mb": self.rss_before,
+            "rss_after_mb": rss,
+            "peak_rss_mb": peak,
+            "peak_rss_scope": self.peak_scope,
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "bytes": self.bytes,
+            "mem_bytes_in": self.mem_bytes_in,
+            "mem_bytes_out": self.mem_bytes_out,
+            "status": "ok" if exc_type is None else "error",
+            "error": None if exc_type is None else f"{exc_type.__name__}: {exc}",
+            "fields": self.fields,
+        })
+        return False
+
+
+def _emit(record: Dict) -> None:
+    path = _STATE["path"]
+    if path is None:
+        with _LOCK:
+            _STATE["records"].append(record)
+        return
+    # 每条记录单独追加一行，进程池中的 worker 可以写同一个文件
+    line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+    with _LOCK:
+        with open(path, "a", encoding="utf-8") as fh:
+            fh.write(line)
+
+
+def stage(name: str, data=None, **fields):
+    """
+    记录一个阶段（上下文管理器）；未启用时返回空阶段，开销可忽略
+    
+    Args:
+        name: 阶段名
+        data: 输入数据（记录其行数和内存字节数，见 frame_size）
+        **fields: 自定义字段（如 lam、fold）
+    
+    Returns:
+        Stage（未启用时为空阶段）
+    """
+    if not _STATE["enabled"]:
+        return _NULL_STAGE
+    return Stage(name, data, fields)
+
+
+def record_transfer(rows: List[Dict]) -> None:
+    """
+    把一页 API 响应的大小计入当前线程最内层的阶段（字段 bytes，嵌套阶段向外累加）
+    
+    客户端不保留原始响应体，按紧凑 JSON（UTF-8，未压缩）重新序列化的长度计，
+    与 PostgREST 返回的响应体大小一致；未启用或当前线程没有阶段时不做序列化。
+    
+    Args:
+        rows: 一页响应的行字典列表
+    """
+    if not _STATE["enabled"]:
+        return
+    stack = getattr(_LOCAL, "stack", None)
+    if not stack:
+        return
+    payload = json.dumps(rows, ensure_ascii=False, separators=(",", ":"), default=str)
+    stack[-1].add_bytes(len(payload.encode("utf-8")))
+
+
+def instrumented(name: Optional[str] = None, data: Optional[str] = None) -> Callable:
+    """
+    装饰器：启用时把每次调用记录为一个阶段，返回值为 DataFrame / ndarray
+    （或以其开头的元组）时记录输出行数和内存字节数；未启用时直接调用原函数
+    
+    Args:
+        name: 阶段名（默认为函数的限定名）
+        data: 作为输入数据记录的参数名
+    """
+    def decorate(func: Callable) -> Callable:
+        stage_name = name or func.__qualname__
+        signature = inspect.signature(func) if data else None
+        
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _STATE["enabled"]:
+                return func(*args, **kwargs)
+            obj = None
+            if signature is not None:
+                obj = signature.bind_partial(*args, **kwargs).arguments.get(data)
+            with Stage(stage_name, obj) as st:
+                result = func(*args, **kwargs)
+                st.output(result)
+            return result
+        
+        return wrapper
+    return decorate
+
+
+class SamplingProfiler:
+    """
+    采样分析器：后台线程每隔 interval 秒采样一次目标线程的调用栈，
+    结束时按折叠栈格式（"外层;...;内层 次数"，可用 flamegraph.pl / speedscope 查看）写出
+    """
+    
+    def __init__(self, path: str, interval: float = PROFILE_SAMPLE_INTERVAL):
+        """
+        Args:
+            path: 输出文件
+            interval: 采样间隔（秒）
+        """
+        self.path = path
+        self.interval = interval
+        self.counts: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def _run(self, target: int) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)})")
+                frame = frame.f_back
+            if stack:
+                self.counts[";".join(reversed(stack))] += 1
+    
+    def __enter__(self) -> "SamplingProfiler":
+        self._thread = threading.Thread(target=self._run, args=(threading.get_ident(),), daemon=True)
+        self._thread.start()
+        return self
+    
+    def __exit__(self, *exc) -> bool:
+        self._stop.set()
+        self._thread.join()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            for stack, count in self.counts.most_common():
+                fh.write(f"{stack} {count}\n")
+        os.replace(tmp_path, self.path)
+        return False
+
+
+def sampling_profiler(profile_dir: str, interval: float = PROFILE_SAMPLE_INTERVAL) -> Callable:
+    """
+    生成 configure(profiler=...) 使用的钩子：每个最外层阶段输出 <阶段名>-<pid>-<时间戳>.folded
+    
+    Args:
+        profile_dir: 输出目录
+        interval: 采样间隔（秒）
+    """
+    def factory(name: str) -> SamplingProfiler:
+        safe = re.sub(r"[^\w.-]+", "_", name)
+        path = os.path.join(profile_dir, f"{safe}-{os.getpid()}-{int(time.time() * 1000)}.folded")
+        return SamplingProfiler(path, interval)
+    return factory
+
+
+def configure(
+    path: Optional[str] = None,
+    enabled: bool = True,
+    profile_dir: Optional[str] = None,
+    profiler: Optional[Callable] = None,
+    interval: float = PROFILE_SAMPLE_INTERVAL
+) -> None:
+    """
+    启用 / 关闭阶段计时
+    
+    也可通过环境变量 CRT_INSTRUMENT_PATH / CRT_PROFILE_DIR 在导入时启用（进程池 worker 会继承）。
+    
+    Args:
+        path: JSON lines 输出文件（None 时记录保存在内存，见 records()）
+        enabled: 是否启用
+        profile_dir: 对最外层阶段运行 SamplingProfiler，折叠栈文件写入该目录
+        profiler: 自定义分析钩子（优先于 profile_dir）：profiler(阶段名) 返回上下文管理器
+        interval: 采样间隔（秒）
+    """
+    if path:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+    if profiler is None and profile_dir:
+        profiler = sampling_profiler(profile_dir, interval)
+    _STATE.update(enabled=enabled, path=path or None, profiler=profiler if enabled else None)
+
+
+def records() -> List[Dict]:
+    """内存中的阶段记录（未设置输出文件时）"""
+    with _LOCK:
+        return list(_STATE["records"])
+
+
+def clear_records() -> None:
+    """清空内存中的阶段记录"""
+    with _LOCK:
+        _STATE["records"].clear()
+
+
+if INSTRUMENT_PATH or INSTRUMENT_PROFILE_DIR:
+    configure(INSTRUMENT_PATH, profile_dir=INSTRUMENT_PROFILE_DIR)
@@ -3,15 +3,14 @@
 """
 import numpy as np
 import pandas as pd
-from sklearn.preprocessing import LabelEncoder
-from sklearn.metrics import roc_curve, f1_score
-from pygam import s, f
-from typing import Tuple, Dict
+from typing import Tuple, Dict, Optional
+
+from .encoders import CategoryEncoder
 
 
 def fit_label_encoders(X: pd.DataFrame) -> Tuple[pd.DataFrame, Dict, list, Dict]:
     """
-    训练 Label Encoders
+    训练 Label Encoders（编码从 1 开始）
     
     Args:
         X: DataFrame
@@ -19,17 +18,16 @@ def fit_label_encoders(X: pd.DataFrame) -> Tuple[pd.DataFrame, Dict, list, Dict]
     Returns:
         (编码后的DataFrame, 编码器字典, 类别列列表, 众数字典)
     """
-    obj_cols = X.select_dtypes(include=["object"]).columns.tolist()
+    obj_cols = X.select_dtypes(include=["object", "category"]).columns.tolist()
     encs = {}
     modes = {}
     X2 = X.copy()
     
     for c in obj_cols:
-        le = LabelEncoder()
-        tr_codes = le.fit_transform(X2[c].astype(str)) + 1
-        X2[c] = tr_codes
-        encs[c] = le
-        modes[c] = int(pd.Series(tr_codes).mode().iloc[0])
+        enc = CategoryEncoder(offset=1)
+        X2[c] = enc.fit_transform(X2[c])
+        encs[c] = enc
+        modes[c] = enc.mode_code
     
     return X2, encs, obj_cols, modes
 
@@ -45,9 +43,9 @@ def transform_with_encoders(
     
     Args:
         X: DataFrame
-        encs: 编码器字典
+        encs: 编码器字典（CategoryEncoder，或旧版 sklearn LabelEncoder）
         obj_cols: 类别列列表
-        modes: 众数字典
+        modes: 众数字典（未见类别的编码）
     
     Returns:
         编码后的 DataFrame
@@ -55,15 +53,10 @@ def transform_with_encoders(
     X2 = X.copy()
     
     for c in obj_cols:
-        le = encs[c]
-        mode_code = modes[c]
-        classes = set(le.classes_)
-        
-        def map_one(s):
-            s = str(s)
-            return int(le.transform([s])[0]) + 1 if s in classes else mode_code
-        
-        X2[c] = X2[c].astype(str).map(map_one).astype(int)
+        enc = encs[c]
+        if not isinstance(enc, CategoryEncoder):
+            enc = CategoryEncoder.from_label_encoder(enc, offset=1, mode_code=modes[c])
+        X2[c] = enc.transform(X2[c], unknown_code=modes[c])
     
     return X2
 
@@ -81,6 +74,9 @@ def build_terms(cols: list, obj_cols: list, n_splines: int = 8, spline_order: in
     Returns:
         GAM terms
     """
+    # pygam 只在构建 terms 时导入，只用编码 / 阈值函数的任务不加载 pygam
+    from pygam import s, f
+    
     terms = None
     for i, c in enumerate(cols):
         t = f(i) if c in obj_cols else s(i, n_splines=n_splines, spline_order=spline_order)
@@ -104,6 +100,68 @@ def class_weights(y: np.ndarray) -> Tuple[float, float]:
     return w0, w1
 
 
+def threshold_sweep(
+    y_true: np.ndarray,
+    proba: np.ndarray,
+    sample_weight: Optional[np.ndarray] = None
+) -> Dict[str, np.ndarray]:
+    """
+    一次排序扫描所有阈值，计算每个阈值下的混淆矩阵和常用指标
+    
+    阈值取值与 roc_curve(drop_intermediate=False) 一致：首个为 inf（全部判负），
+    之后为降序的去重预测概率；预测为正的规则为 proba >= 阈值。
+    分母为 0 时 precision / recall / F1 取 0（与 f1_score 默认行为一致）。
+    
+    Args:
+        y_true: 真实标签（0/1）
+        proba: 预测概率
+        sample_weight: 样本权重
+    
+    Returns:
+        字典，键为 thresholds, tp, fp, fn, tn, precision, recall, f1, fpr, tpr, youden_j，
+        每个值都是与 thresholds 等长的数组
+    """
+    y_true = np.asarray(y_true).ravel() == 1
+    proba = np.asarray(proba, dtype=float).ravel()
+    weight = np.ones(len(proba)) if sample_weight is None else np.asarray(sample_weight, dtype=float)
+    
+    order = np.argsort(-proba, kind="mergesort")
+    proba, y_true, weight = proba[order], y_true[order], weight[order]
+    
+    # 每个去重概率值的最后一个位置，即以该值为阈值时判正的样本截止处
+    last = np.r_[np.flatnonzero(np.diff(proba)), len(proba) - 1] if len(proba) else np.array([], dtype=int)
+    tp = np.r_[0.0, np.cumsum(weight * y_true)[last]]
+    fp = np.r_[0.0, np.cumsum(weight * ~y_true)[last]]
+    thresholds = np.r_[np.inf, proba[last]]
+    
+    pos = tp[-1] if len(tp) else 0.0
+    neg = fp[-1] if len(fp) else 0.0
+    fn = pos - tp
+    tn = neg - fp
+    
+    def _ratio(num, den):
+        return np.divide(num, den, out=np.zeros_like(num), where=den > 0)
+    
+    precision = _ratio(tp, tp + fp)
+    recall = _ratio(tp, np.full_like(tp, pos))
+    f1 = _ratio(2 * tp, 2 * tp + fp + fn)
+    fpr = _ratio(fp, np.full_like(fp, neg))
+    
+    return {
+        "thresholds": thresholds,
+        "tp": tp,
+        "fp": fp,
+        "fn": fn,
+        "tn": tn,
+        "precision": precision,
+        "recall": recall,
+        "f1": f1,
+        "fpr": fpr,
+        "tpr": recall,
+        "youden_j": recall - fpr,
+    }
+
+
 def best_threshold(y_true: np.ndarray, proba: np.ndarray) -> Tuple[float, float]:
     """
     找到最佳阈值（基于 F1 Score）
@@ -115,8 +173,6 @@ def best_threshold(y_true: np.ndarray, proba: np.ndarray) -> Tuple[float, float]
     Returns:
         (best_threshold, best_f1)
     """
-    fpr, tpr, thr = roc_curve(y_true, proba)
-    f1s = [f1_score(y_true, (proba >= t).astype(int)) for t in thr]
-    j = int(np.argmax(f1s))
-    return float(thr[j]), float(f1s[j])
-
+    sweep = threshold_sweep(y_true, proba)
+    j = int(np.argmax(sweep["f1"]))
+    return float(sweep["thresholds"][j]), float(sweep["f1"][j])
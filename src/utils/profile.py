@@ -0,0 +1,448 @@
+"""
+列统计画像 - 单遍扫描、可分块累计、可合并
+"""
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .encoders import _as_str_array
+
+
+class QuantileSketch:
+    """
+    可合并的分位数草图（t-digest 思路）
+    
+    数据压缩为按均值排序的加权质心，按 k1 尺度函数 k(q) = δ/(2π)·asin(2q-1) 分组，
+    两端的质心更细、中间更粗，质心数约为 compression / 2。更新和合并都是
+    "拼接质心 -> 排序 -> 向量化分组"，与数据到达顺序和分块方式基本无关。
+    """
+    
+    def __init__(self, compression: int = 1000):
+        """
+        Args:
+            compression: 压缩参数 δ（越大越精确，中位数附近单个质心约覆盖 π/δ 的分位区间）
+        """
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+    
+    @property
+    def n(self) -> float:
+        return float(self.weights.sum())
+    
+    def update(self, values: np.ndarray, weights: Optional[np.ndarray] = None) -> "QuantileSketch":
+        """加入一批非缺失数值（可带权重）"""
+        values = np.asarray(values, dtype=float)
+        weights = np.ones(len(values)) if weights is None else np.asarray(weights, dtype=float)
+        if len(values):
+            self._compress(np.r_[self.means, values], np.r_[self.weights, weights])
+        return self
+    
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        """合并另一个草图"""
+        if len(other.means):
+            self._compress(np.r_[self.means, other.means], np.r_[self.weights, other.weights])
+        return self
+    
+    def _compress(self, means: np.ndarray, weights: np.ndarray) -> None:
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+        cum = np.cumsum(weights)
+        q_left = (cum - weights) / cum[-1]
+        k = self.compression / (2 * np.pi) * np.arcsin(2 * q_left - 1)
+        groups = np.floor(k - k[0]).astype(np.int64)
+        groups = np.unique(groups, return_inverse=True)[1]
+        w = np.bincount(groups, weights)
+        self.means = np.bincount(groups, weights * means) / w
+        self.weights = w
+    
+    def quantile(self, q: float, vmin: Optional[float] = None, vmax: Optional[float] = None) -> float:
+        """
+        估计分位数
+        
+        Args:
+            q: 分位点 (0~1)
+            vmin: 数据最小值（已知时作为插值端点）
+            vmax: 数据最大值
+        
+        Returns:
+            分位数估计（无数据时为 NaN）
+        """
+        if len(self.means) == 0:
+            return np.nan
+        total = self.weights.sum()
+        centers = np.cumsum(self.weights) - self.weights / 2
+        xs, ys = centers, self.means
+        if vmin is not None:
+            xs, ys = np.r_[0.0, xs], np.r_[vmin, ys]
+        if vmax is not None:
+            xs, ys = np.r_[xs, total], np.r_[ys, vmax]
+        return float(np.interp(q * total, xs, ys))
+
+
+class _ColumnStats:
+    """
+    单列的部分聚合：行数、缺失数、非缺失取值频数
+    
+    数值列的不同取值数超过 max_distinct 时转为草图模式：不再保存频数，改为
+    流式矩（n, 均值, M2, 最小值, 最大值，按 Chan 公式合并）加 QuantileSketch，
+    内存与行数无关。
+    """
+    
+    def __init__(self, max_distinct: Optional[int] = None):
+        self.max_distinct = max_distinct
+        self.n_rows = 0
+        self.n_missing = 0
+        self.is_numeric = True
+        self.is_object = False
+        self.counts = pd.Series(dtype="int64")
+        # 缺失值的字符串形式频数（'nan' / 'None'），用于类别编码
+        self.missing_repr: Dict[str, int] = {}
+        # 草图模式下的状态
+        self.sketched = False
+        self.moments: Tuple[float, float, float, float, float] = (0.0, 0.0, 0.0, np.inf, -np.inf)
+        self.sketch: Optional[QuantileSketch] = None
+        self.distinct_lower = 0
+    
+    def update(self, series: pd.Series, is_object: bool) -> None:
+        missing = series.isna()
+        n_missing = int(missing.sum())
+        self.n_rows += len(series)
+        self.n_missing += n_missing
+        self.is_object = self.is_object or is_object
+        self.is_numeric = self.is_numeric and (
+            pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype)
+        )
+        
+        if n_missing and is_object:
+            for key, cnt in zip(*np.unique(_as_str_array(series[missing]), return_counts=True)):
+                self.missing_repr[key] = self.missing_repr.get(key, 0) + int(cnt)
+        
+        if self.sketched and self.is_numeric:
+            values = series[~missing].to_numpy(dtype=float)
+            self.moments = self._merge_moments(self.moments, self._moments_of(values))
+            self.sketch.update(values)
+            return
+        
+        counts = series.value_counts(dropna=True)
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # category 列的 value_counts 包含未出现的类别，且索引为 CategoricalIndex
+            counts = counts[counts > 0]
+            counts.index = counts.index.astype(object)
+        if len(counts):
+            self._add_counts(counts)
+    
+    def _add_counts(self, counts: pd.Series) -> None:
+        if len(self.counts) == 0:
+            self.counts = counts.astype("int64")
+        else:
+            self.counts = self.counts.add(counts, fill_value=0).astype("int64")
+        if (self.max_distinct is not None and self.is_numeric and not self.sketched
+                and len(self.counts) > self.max_distinct):
+            self._to_sketch()
+    
+    @staticmethod
+    def _moments_of(values: np.ndarray, weights: Optional[np.ndarray] = None) -> tuple:
+        if len(values) == 0:
+            return (0.0, 0.0, 0.0, np.inf, -np.inf)
+        weights = np.ones(len(values)) if weights is None else weights
+        n = float(weights.sum())
+        mean = float((weights * values).sum() / n)
+        m2 = float((weights * np.square(values - mean)).sum())
+        return (n, mean, m2, float(values.min()), float(values.max()))
+    
+    @staticmethod
+    def _merge_moments(a: tuple, b: tuple) -> tuple:
+        n_a, mean_a, m2_a, min_a, max_a = a
+        n_b, mean_b, m2_b, min_b, max_b = b
+        n = n_a + n_b
+        if n == 0:
+            return a
+        delta = mean_b - mean_a
+        mean = mean_a + delta * n_b / n
+        m2 = m2_a + m2_b + delta ** 2 * n_a * n_b / n
+        return (n, mean, m2, min(min_a, min_b), max(max_a, max_b))
+    
+    def _to_sketch(self) -> None:
+        """频数转为流式矩 + 分位数草图"""
+        keys, cnt = self._numeric()
+        self.moments = self._moments_of(keys, cnt)
+        self.sketch = QuantileSketch().update(keys, cnt)
+        self.distinct_lower = len(self.counts)
+        self.counts = pd.Series(dtype="int64")
+        self.sketched = True
+    
+    def merge(self, other: "_ColumnStats") -> None:
+        self.n_rows += other.n_rows
+        self.n_missing += other.n_missing
+        self.is_numeric = self.is_numeric and other.is_numeric
+        self.is_object = self.is_object or other.is_object
+        for key, cnt in other.missing_repr.items():
+            self.missing_repr[key] = self.missing_repr.get(key, 0) + cnt
+        
+        if not (self.sketched or other.sketched):
+            if len(other.counts):
+                self._add_counts(other.counts)
+            return
+        
+        if not self.sketched:
+            self._to_sketch()
+        if other.sketched:
+            self.moments = self._merge_moments(self.moments, other.moments)
+            self.sketch.merge(other.sketch)
+            self.distinct_lower = max(self.distinct_lower, other.distinct_lower)
+        elif len(other.counts):
+            keys, cnt = other._numeric()
+            self.moments = self._merge_moments(self.moments, self._moments_of(keys, cnt))
+            self.sketch.update(keys, cnt)
+            self.distinct_lower = max(self.distinct_lower, len(other.counts))
+    
+    def _numeric(self):
+        keys = self.counts.index.to_numpy(dtype=float)
+        order = np.argsort(keys, kind="stable")
+        return keys[order], self.counts.to_numpy(dtype=float)[order]
+    
+    def nunique(self) -> int:
+        """不同取值数（草图模式下为下界）"""
+        return self.distinct_lower if self.sketched else len(self.counts)
+    
+    def mean(self) -> float:
+        if self.sketched:
+            return self.moments[1]
+        if not self.is_numeric or len(self.counts) == 0:
+            return np.nan
+        keys, cnt = self._numeric()
+        return float((keys * cnt).sum() / cnt.sum())
+    
+    def variance(self) -> float:
+        """总体方差（ddof=0，与 VarianceThreshold 一致）"""
+        if self.sketched:
+            return self.moments[2] / self.moments[0]
+        if not self.is_numeric or len(self.counts) == 0:
+            return np.nan
+        keys, cnt = self._numeric()
+        mean = (keys * cnt).sum() / cnt.sum()
+        return float((cnt * np.square(keys - mean)).sum() / cnt.sum())
+    
+    def median(self) -> float:
+        """与 Series.median 相同：偶数个取中间两个值的平均（草图模式下为估计值）"""
+        if self.sketched:
+            return self.sketch.quantile(0.5, vmin=self.moments[3], vmax=self.moments[4])
+        if not self.is_numeric or len(self.counts) == 0:
+            return np.nan
+        keys, cnt = self._numeric()
+        cum = np.cumsum(cnt)
+        n = int(cum[-1])
+        lo = keys[np.searchsorted(cum, (n - 1) // 2, side="right")]
+        hi = keys[np.searchsorted(cum, n // 2, side="right")]
+        return float((lo + hi) / 2)
+    
+    def mode(self):
+        """与 Series.mode().iloc[0] 相同：出现次数最多的取值中排序最小者（草图模式下为 NaN）"""
+        if len(self.counts) == 0:
+            return np.nan
+        top = self.counts.index[self.counts.to_numpy() == self.counts.max()].tolist()
+        try:
+            return sorted(top)[0]
+        except TypeError:
+            return top[0]
+    
+    def minimum(self):
+        if self.sketched:
+            return self.moments[3]
+        if len(self.counts) == 0:
+            return np.nan
+        try:
+            return min(self.counts.index)
+        except TypeError:
+            return np.nan
+    
+    def maximum(self):
+        if self.sketched:
+            return self.moments[4]
+        if len(self.counts) == 0:
+            return np.nan
+        try:
+            return max(self.counts.index)
+        except TypeError:
+            return np.nan
+
+
+class ColumnProfile:
+    """
+    列统计画像：一次扫描得到每列的缺失率、方差、最小/最大值、中位数、众数和不同取值数
+    
+    每列只保存行数、缺失数和非缺失取值频数，这些部分聚合可以逐块累计，也可以直接合并，
+    各统计量都由频数推出。FeatureSelector 和 DataPreprocessor 的各个步骤都从画像中读取，
+    不再各自扫描数据。
+    
+    设置 max_distinct 后，不同取值超过该数的数值列改用流式矩和分位数草图，
+    画像内存不随行数增长，适合逐块扫描全量数据；此时这些列的中位数为估计值，
+    nunique 为下界，众数为 NaN。
+    """
+    
+    def __init__(self, max_distinct: Optional[int] = None):
+        """
+        Args:
+            max_distinct: 数值列保留精确频数的最大不同取值数（None 时始终精确）
+        """
+        self.max_distinct = max_distinct
+        self.columns: List[str] = []
+        self.stats: Dict[str, _ColumnStats] = {}
+    
+    def update(self, chunk: pd.DataFrame) -> "ColumnProfile":
+        """
+        累计一个数据块
+        
+        Args:
+            chunk: DataFrame 数据块
+        
+        Returns:
+            self
+        """
+        obj_cols = set(chunk.select_dtypes(include=["object", "category"]).columns)
+        for col in chunk.columns:
+            if col not in self.stats:
+                self.columns.append(col)
+                self.stats[col] = _ColumnStats(self.max_distinct)
+            self.stats[col].update(chunk[col], col in obj_cols)
+        return self
+    
+    def merge(self, other: "ColumnProfile") -> "ColumnProfile":
+        """
+        合并另一份画像（例如并行扫描不同分块得到的画像）
+        
+        Args:
+            other: ColumnProfile
+        
+        Returns:
+            self
+        """
+        for col in other.columns:
+            if col not in self.stats:
+                self.columns.append(col)
+                self.stats[col] = _ColumnStats(self.max_distinct)
+            self.stats[col].merge(other.stats[col])
+        return self
+    
+    @classmethod
+    def from_frame(
+        cls,
+        df: pd.DataFrame,
+        chunk_size: Optional[int] = None,
+        max_distinct: Optional[int] = None
+    ) -> "ColumnProfile":
+        """
+        由整表构建画像
+        
+        Args:
+            df: DataFrame
+            chunk_size: 分块行数（None 时整表一块）
+            max_distinct: 见 ColumnProfile
+        
+        Returns:
+            ColumnProfile
+        """
+        profile = cls(max_distinct)
+        if chunk_size is None or len(df) <= chunk_size:
+            return profile.update(df)
+        for start in range(0, len(df), chunk_size):
+            profile.update(df.iloc[start:start + chunk_size])
+        return profile
+    
+    @classmethod
+    def from_chunks(
+        cls,
+        chunks: Iterable[pd.DataFrame],
+        max_distinct: Optional[int] = None
+    ) -> "ColumnProfile":
+        """
+        由数据块迭代器构建画像
+        
+        Args:
+            chunks: DataFrame 数据块迭代器
+            max_distinct: 见 ColumnProfile
+        
+        Returns:
+            ColumnProfile
+        """
+        profile = cls(max_distinct)
+        for chunk in chunks:
+            profile.update(chunk)
+        return profile
+    
+    def _collect(self, fn, columns: Optional[List[str]] = None) -> pd.Series:
+        columns = self.columns if columns is None else columns
+        return pd.Series({col: fn(self.stats[col]) for col in columns}, index=columns, dtype=object)
+    
+    def missing_rate(self, columns: Optional[List[str]] = None) -> pd.Series:
+        """缺失率"""
+        return self._collect(lambda s: s.n_missing / s.n_rows if s.n_rows else np.nan, columns).astype(float)
+    
+    def n_missing(self, columns: Optional[List[str]] = None) -> pd.Series:
+        """缺失数"""
+        return self._collect(lambda s: s.n_missing, columns).astype("int64")
+    
+    def nunique(self, columns: Optional[List[str]] = None) -> pd.Series:
+        """不同非缺失取值数（与 Series.nunique 一致；草图模式的列为下界）"""
+        return self._collect(lambda s: s.nunique(), columns).astype("int64")
+    
+    def mean(self, columns: Optional[List[str]] = None) -> pd.Series:
+        """均值（非数值列为 NaN）"""
+        return self._collect(lambda s: s.mean(), columns).astype(float)
+    
+    def variance(self, columns: Optional[List[str]] = None) -> pd.Series:
+        """总体方差（非数值列为 NaN）"""
+        return self._collect(lambda s: s.variance(), columns).astype(float)
+    
+    def median(self, columns: Optional[List[str]] = None) -> pd.Series:
+        """中位数（非数值列为 NaN）"""
+        return self._collect(lambda s: s.median(), columns).astype(float)
+    
+    def mode(self, columns: Optional[List[str]] = None) -> pd.Series:
+        """众数"""
+        return self._collect(lambda s: s.mode(), columns)
+    
+    def minimum(self, columns: Optional[List[str]] = None) -> pd.Series:
+        """最小值"""
+        return self._collect(lambda s: s.minimum(), columns)
+    
+    def maximum(self, columns: Optional[List[str]] = None) -> pd.Series:
+        """最大值"""
+        return self._collect(lambda s: s.maximum(), columns)
+    
+    def object_columns(self) -> List[str]:
+        """至少在一个数据块中为 object / category 类型的列"""
+        return [col for col in self.columns if self.stats[col].is_object]
+    
+    def category_counts(self, col: str) -> pd.Series:
+        """
+        类别列按字符串取值的频数（缺失值计为 'nan' / 'None'），用于构建 CategoryEncoder
+        
+        Args:
+            col: 列名
+        
+        Returns:
+            以字符串取值为索引的频数 Series
+        """
+        stats = self.stats[col]
+        counts = stats.counts
+        if len(counts):
+            counts = counts.groupby(_as_str_array(counts.index)).sum()
+        missing = pd.Series(stats.missing_repr, dtype="int64")
+        if len(missing):
+            counts = missing if len(counts) == 0 else counts.add(missing, fill_value=0).astype("int64")
+        return counts
+    
+    def summary(self) -> pd.DataFrame:
+        """各列统计量汇总表"""
+        return pd.DataFrame({
+            "missing_rate": self.missing_rate(),
+            "nunique": self.nunique(),
+            "mean": self.mean(),
+            "variance": self.variance(),
+            "min": self.minimum(),
+            "median": self.median(),
+            "max": self.maximum(),
+            "mode": self.mode(),
+        })